@@ -0,0 +1,42 @@
+# accounts/middleware.py
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    """Valide le JWT (SimpleJWT) et retourne l'utilisateur associé"""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authentifie les connexions WebSocket avec le token d'accès JWT
+    passé en paramètre de requête : ws://.../ws/progress/?token=<access>
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+
+        if token:
+            scope['user'] = await get_user_from_token(token)
+
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    """JWT en priorité, avec repli sur l'authentification par session"""
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -1,7 +1,9 @@
 from django.urls import re_path
 
+from cvs.consumers import ProgressConsumer
+
 # Liste des modèles de routage WebSocket
 websocket_urlpatterns = [
-    # Ajoutez ici vos modèles d'URL WebSocket
-    # Exemple : re_path(r'ws/some_path/$', consumers.YourConsumer.as_asgi()),
+    # Progression des uploads multiples et des classements (auth JWT : ?token=...)
+    re_path(r'ws/progress/$', ProgressConsumer.as_asgi()),
 ]
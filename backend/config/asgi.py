@@ -10,20 +10,24 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 import django
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import accounts.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 django.setup()
 
+# Initialiser Django avant d'importer le routage (les consumers utilisent les modèles)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from accounts.middleware import JWTAuthMiddlewareStack  # noqa: E402
+import accounts.routing  # noqa: E402
+
 # Configuration ASGI pour gérer à la fois HTTP et WebSockets
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "http": django_asgi_app,
+    "websocket": JWTAuthMiddlewareStack(
         URLRouter(
             accounts.routing.websocket_urlpatterns
         )
     ),
-})
\ No newline at end of file
+})
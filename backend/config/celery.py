@@ -1,11 +1,38 @@
+import json
+import logging
 import os
-from celery import Celery
+from celery import Celery, Task
+from celery.signals import celeryd_init, worker_process_init
+from celery.utils.text import str_to_list
 from django.conf import settings
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-app = Celery('config')
+logger = logging.getLogger(__name__)
+
+
+class ResultTooLarge(ValueError):
+    pass
+
+
+class BoundedResultTask(Task):
+    """Refuse les résultats dont le JSON dépasse settings.TASK_RESULT_MAX_BYTES"""
+
+    def __call__(self, *args, **kwargs):
+        result = super().__call__(*args, **kwargs)
+        limit = getattr(settings, 'TASK_RESULT_MAX_BYTES', None)
+        if limit and not self.ignore_result and result is not None:
+            size = len(json.dumps(result, default=str).encode('utf-8'))
+            if size > limit:
+                raise ResultTooLarge(
+                    f"Résultat de {self.name} trop volumineux ({size} octets > {limit}) : "
+                    f"stocker le document et renvoyer son identifiant"
+                )
+        return result
+
+
+app = Celery('config', task_cls=BoundedResultTask)
 
 # Using a string here means the worker doesn't have to serialize
 # the configuration object to child processes.
@@ -14,6 +41,56 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+# ============================================
+# PROFILS DE WORKER PAR FILE
+# ============================================
+
+_preload_analyzer = False
+
+
+@celeryd_init.connect
+def configure_worker(sender=None, conf=None, options=None, **kwargs):
+    """
+    Applique le profil de la première file consommée (processus principal, avant
+    le fork des enfants) ; les options explicites de la ligne de commande priment
+    """
+    global _preload_analyzer
+    profiles = settings.TASK_QUEUE_PROFILES
+    queues = str_to_list((options or {}).get('queues')) or [conf.task_default_queue]
+    profile = profiles.get(queues[0], profiles[conf.task_default_queue])
+
+    conf.worker_concurrency = profile['CONCURRENCY']
+    conf.worker_prefetch_multiplier = profile['PREFETCH_MULTIPLIER']
+    conf.worker_max_tasks_per_child = profile['MAX_TASKS_PER_CHILD']
+    if profile.get('PROC_ALIVE_TIMEOUT'):
+        # Le préchargement (preload_analyzer) a lieu avant que l'enfant ne se déclare prêt
+        conf.worker_proc_alive_timeout = profile['PROC_ALIVE_TIMEOUT']
+    _preload_analyzer = any(profiles.get(queue, {}).get('PRELOAD_ANALYZER') for queue in queues)
+    logger.info(
+        f"⚙️  Worker {sender} : files {', '.join(queues)}, concurrence {profile['CONCURRENCY']}, "
+        f"prefetch {profile['PREFETCH_MULTIPLIER']}, analyseur {'préchargé' if _preload_analyzer else 'non chargé'}, "
+        f"démarrage des enfants {conf.worker_proc_alive_timeout} s max"
+    )
+
+
+@worker_process_init.connect
+def preload_analyzer(**kwargs):
+    """
+    Chaque processus d'un worker CPU charge et préchauffe l'analyseur avant sa première tâche.
+
+    Dans l'enfant et non dans le parent avant le fork : MLCVAnalyzer démarre un thread de
+    rechargement et ouvre des connexions Redis, qui ne survivent pas au fork. Le profil
+    'cpu' relève worker_proc_alive_timeout (PROC_ALIVE_TIMEOUT) pour couvrir cette durée.
+    """
+    if not _preload_analyzer:
+        return
+    from nlp_service.analyzer import warm_up_analyzer
+    try:
+        warm_up_analyzer()
+    except Exception as e:
+        logger.error(f"❌ Préchargement de l'analyseur impossible: {e}")
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -58,6 +58,13 @@ def liveness_check(request):
 
 def readiness_check(request):
     """
-    Readiness check - checks if app is ready to serve traffic
+    Readiness check - ready once the analyzer is loaded and warmed up
+    (nlp_service.readiness). The first probe starts the warm-up if
+    NLP_WARMUP_ON_STARTUP did not; 503 while loading.
     """
-    return JsonResponse({"status": "ready"}, status=200)
\ No newline at end of file
+    from nlp_service.readiness import readiness, start_warm_up
+
+    ready, details = readiness()
+    if not ready:
+        start_warm_up()
+    return JsonResponse(details, status=200 if ready else 503)
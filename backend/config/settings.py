@@ -40,11 +40,32 @@ INSTALLED_APPS = [
     'corsheaders',
     'accounts',
     'cvs',
+    'nlp_service',
 ]
 
-# Configuration ASGI de base (sans WebSockets)
+# Configuration ASGI (HTTP + WebSockets)
 ASGI_APPLICATION = 'config.asgi.application'
 
+# Channel layer : Redis en production, mémoire pour le développement et les tests
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CHANNEL_LAYER_BACKEND = os.environ.get('CHANNEL_LAYER_BACKEND', 'redis' if REDIS_URL else 'memory')
+
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL or 'redis://redis:6379/0'],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
 MIDDLEWARE = [
     'django_prometheus.middleware.PrometheusBeforeMiddleware',  # Doit être en premier
     'django.middleware.security.SecurityMiddleware',
@@ -53,8 +74,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'nlp_service.profiling.profiling_middleware',  # Profils à la demande (NLP_PROFILING)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cvs.admission.admission_middleware',  # 429 rapides sur les endpoints lourds
+    'nlp_service.stages.stage_endpoint_middleware',  # Label endpoint des métriques par étape
     'django_prometheus.middleware.PrometheusAfterMiddleware',  # Doit être en dernier
 ]
 
@@ -90,6 +114,94 @@ DATABASES = {
     }
 }
 
+# Cache : Redis partagé si REDIS_URL est défini, sinon mémoire locale
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'recrutai',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache de l'analyseur NLP (nlp_service/cache.py) : LRU local + cache partagé
+NLP_CACHE = {
+    'ENABLED': os.environ.get('NLP_CACHE_ENABLED', 'True') == 'True',
+    'LOCAL_MAX_ENTRIES': int(os.environ.get('NLP_CACHE_LOCAL_MAX_ENTRIES', 1024)),
+    'LOCAL_MAX_BYTES': int(os.environ.get('NLP_CACHE_LOCAL_MAX_BYTES', 64 * 1024 * 1024)),
+    # Le tier partagé n'a d'intérêt que si le cache Django est commun aux workers (Redis)
+    'SHARED_ALIAS': 'default' if REDIS_URL else None,
+    'TIMEOUT': int(os.environ.get('NLP_CACHE_TIMEOUT', 24 * 3600)),
+}
+
+# spaCy : pipeline réduit à la NER, textes tronqués à MAX_CHARS caractères.
+# Traitements en masse : nlp.pipe par lots de BATCH_SIZE sur N_PROCESS processus
+NLP_SPACY = {
+    'MODEL': os.environ.get('NLP_SPACY_MODEL', 'fr_core_news_sm'),
+    'MAX_CHARS': int(os.environ.get('NLP_SPACY_MAX_CHARS', 20000)),
+    'BATCH_SIZE': int(os.environ.get('NLP_SPACY_BATCH_SIZE', 32)),
+    'N_PROCESS': int(os.environ.get('NLP_SPACY_N_PROCESS', 1)),
+}
+
+# Service d'inférence séparé (manage.py inference_server) : avec ADDRESS, les workers
+# web envoient les analyses sur cette socket Unix au lieu de charger les modèles
+NLP_INFERENCE = {
+    'ADDRESS': os.environ.get('NLP_INFERENCE_SOCKET', ''),
+    'WORKERS': int(os.environ.get('NLP_INFERENCE_WORKERS', 2)),
+    'AUTHKEY': os.environ.get('NLP_INFERENCE_AUTHKEY', SECRET_KEY),
+    'TIMEOUT': float(os.environ.get('NLP_INFERENCE_TIMEOUT', 120)),
+}
+
+# Exécuteur borné des vues async (cvs/async_views.py) : 'thread' ou 'process'
+NLP_EXECUTOR = {
+    'KIND': os.environ.get('NLP_EXECUTOR_KIND', 'thread'),
+    'WORKERS': int(os.environ.get('NLP_EXECUTOR_WORKERS', 4)),
+}
+
+# Micro-batching des scores ML : les appels concurrents (threads de l'exécuteur async)
+# arrivés en MAX_WAIT_MS sont vectorisés ensemble, par lots d'au plus MAX_BATCH_SIZE
+NLP_BATCHING = {
+    'ENABLED': os.environ.get('NLP_BATCHING_ENABLED', 'False') == 'True',
+    'MAX_BATCH_SIZE': int(os.environ.get('NLP_BATCHING_MAX_BATCH_SIZE', 32)),
+    'MAX_WAIT_MS': float(os.environ.get('NLP_BATCHING_MAX_WAIT_MS', 5)),
+}
+
+# Histogrammes de latence par étape de l'analyse et par endpoint (nlp_service/stages.py)
+NLP_STAGE_METRICS = os.environ.get('NLP_STAGE_METRICS', 'True') == 'True'
+
+# Profilage des requêtes (nlp_service/profiling.py) : en-tête X-Profile des utilisateurs
+# staff ou échantillon SAMPLE_RATE ; profils dans DIR (hors MEDIA_ROOT), listés dans l'admin
+NLP_PROFILING = {
+    'ENABLED': os.environ.get('NLP_PROFILING_ENABLED', 'False') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('NLP_PROFILING_SAMPLE_RATE', 0)),
+    'HEADER': 'X-Profile',
+    'DIR': os.environ.get('NLP_PROFILING_DIR', str(BASE_DIR / 'profiles')),
+    'INTERVAL_MS': float(os.environ.get('NLP_PROFILING_INTERVAL_MS', 5)),
+    'MAX_PROFILES': int(os.environ.get('NLP_PROFILING_MAX_PROFILES', 500)),
+}
+
+# Construction de l'analyseur au démarrage du worker (sinon à la première requête)
+NLP_WARMUP_ON_STARTUP = os.environ.get('NLP_WARMUP_ON_STARTUP', 'False') == 'True'
+
+# Composants à charger avant que /health/ready/ ne réponde 200 (ml_model, spacy, lexicon, cache...) ;
+# les autres peuvent manquer (mode dégradé)
+NLP_READINESS_REQUIRED = tuple(filter(None, os.environ.get('NLP_READINESS_REQUIRED', '').split(',')))
+
+# Registre de modèles versionnés (volume partagé) et rechargement à chaud
+NLP_MODEL_REGISTRY = {
+    'ROOT': os.environ.get('NLP_MODEL_REGISTRY_DIR', str(BASE_DIR / 'nlp_service' / 'models' / 'registry')),
+    'WATCH': os.environ.get('NLP_MODEL_WATCH', 'True') == 'True',
+    'WATCH_INTERVAL': float(os.environ.get('NLP_MODEL_WATCH_INTERVAL', 5)),
+    'CHANNEL': 'recrutai:nlp:model-promoted',
+}
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Pour le développement uniquement
 CORS_ALLOW_CREDENTIALS = True
@@ -114,6 +226,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile',
 ]
 
 # Configuration pour les fichiers volumineux
@@ -128,6 +241,24 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Quotas des endpoints d'analyse par rôle (cvs/throttling.py), '<scope>_<rôle>'
+    'DEFAULT_THROTTLE_RATES': {
+        'analysis_candidat': os.environ.get('THROTTLE_ANALYSIS_CANDIDAT', '30/min'),
+        'analysis_recruteur': os.environ.get('THROTTLE_ANALYSIS_RECRUTEUR', '120/min'),
+        'bulk_analysis_recruteur': os.environ.get('THROTTLE_BULK_ANALYSIS_RECRUTEUR', '20/min'),
+    },
+}
+
+# Contrôle d'admission des endpoints lourds (cvs/admission.py), par processus :
+# au-delà de MAX_CONCURRENT requêtes en cours (PER_USER par utilisateur), QUEUE_DEPTH
+# requêtes attendent au plus QUEUE_TIMEOUT secondes ; les autres reçoivent 429 + Retry-After
+API_ADMISSION = {
+    'ENABLED': os.environ.get('API_ADMISSION_ENABLED', 'True') == 'True',
+    'MAX_CONCURRENT': int(os.environ.get('API_ADMISSION_MAX_CONCURRENT', 4)),
+    'PER_USER': int(os.environ.get('API_ADMISSION_PER_USER', 2)),
+    'QUEUE_DEPTH': int(os.environ.get('API_ADMISSION_QUEUE_DEPTH', 16)),
+    'QUEUE_TIMEOUT': float(os.environ.get('API_ADMISSION_QUEUE_TIMEOUT', 5)),
+    'RETRY_AFTER': int(os.environ.get('API_ADMISSION_RETRY_AFTER', 5)),
 }
 
 AUTH_USER_MODEL = 'accounts.User'
@@ -203,3 +334,52 @@ CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://redis:6
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+
+# Files : 'cpu' (extraction PDF, analyse, scoring), 'io' (emails, stockage), 'default' (le reste).
+# Routage par nom de tâche ; une tâche peut aussi fixer sa file (@shared_task(queue=...))
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    '*.tasks.extract_*': {'queue': 'cpu'},
+    '*.tasks.analyze_*': {'queue': 'cpu'},
+    '*.tasks.score_*': {'queue': 'cpu'},
+    '*.tasks.rank_*': {'queue': 'cpu'},
+    '*.tasks.send_*': {'queue': 'io'},
+    '*.tasks.notify_*': {'queue': 'io'},
+    '*.tasks.store_*': {'queue': 'io'},
+}
+
+# Résultats compressés et expirés ; au-delà de TASK_RESULT_MAX_BYTES (JSON), la tâche échoue
+# (ResultTooLarge) au lieu de remplir Redis : renvoyer un identifiant, pas le document
+CELERY_RESULT_COMPRESSION = 'gzip'
+CELERY_RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', 24 * 3600))
+TASK_RESULT_MAX_BYTES = int(os.environ.get('CELERY_RESULT_MAX_BYTES', 256 * 1024))
+
+# Réglages des workers selon la file consommée (celery -A config worker -Q cpu) :
+# le profil de la première file de -Q s'applique, les options de la ligne de commande priment.
+# Seuls les workers CPU chargent l'analyseur au démarrage de chaque processus.
+TASK_QUEUE_PROFILES = {
+    'cpu': {
+        'CONCURRENCY': int(os.environ.get('CELERY_CPU_CONCURRENCY', os.cpu_count() or 2)),
+        'PREFETCH_MULTIPLIER': 1,  # tâches longues : pas de réservation derrière une analyse
+        'MAX_TASKS_PER_CHILD': int(os.environ.get('CELERY_CPU_MAX_TASKS_PER_CHILD', 500)),
+        'PRELOAD_ANALYZER': True,
+        # Délai avant que Celery ne tue un processus enfant qui ne s'est pas déclaré prêt
+        # (4 s par défaut) : couvre le préchauffage (~3-5 s sans spaCy, 10-20 s avec
+        # fr_core_news_sm et un CPU partagé), à chaque démarrage et à chaque recyclage
+        'PROC_ALIVE_TIMEOUT': float(os.environ.get('CELERY_CPU_PROC_ALIVE_TIMEOUT', 60)),
+    },
+    'io': {
+        'CONCURRENCY': int(os.environ.get('CELERY_IO_CONCURRENCY', 16)),
+        'PREFETCH_MULTIPLIER': 8,
+        'MAX_TASKS_PER_CHILD': None,
+        'PRELOAD_ANALYZER': False,
+        'PROC_ALIVE_TIMEOUT': None,  # défaut Celery
+    },
+    'default': {
+        'CONCURRENCY': int(os.environ.get('CELERY_DEFAULT_CONCURRENCY', 4)),
+        'PREFETCH_MULTIPLIER': 4,
+        'MAX_TASKS_PER_CHILD': None,
+        'PRELOAD_ANALYZER': False,
+        'PROC_ALIVE_TIMEOUT': None,  # défaut Celery
+    },
+}
@@ -10,6 +10,8 @@ from rest_framework_simplejwt.views import (
 )
 from django_prometheus import exports
 
+from .health_views import liveness_check, readiness_check
+
 def health_check(request):
     """Health check endpoint"""
     return JsonResponse({'status': 'healthy', 'service': 'backend'})
@@ -32,6 +34,8 @@ api_patterns = [
 urlpatterns = [
     # Health check
     path('health/', health_check, name='health'),
+    path('health/live/', liveness_check, name='health-live'),
+    path('health/ready/', readiness_check, name='health-ready'),
     
     # Admin
     path('admin/', admin.site.urls),
@@ -0,0 +1,307 @@
+# cvs/admission.py
+"""
+Contrôle d'admission des endpoints d'analyse (analyses unitaires, classement,
+upload multiple).
+
+Quelques recruteurs classant toute la base, ou beaucoup d'utilisateurs
+analysant en même temps, suffisaient à monopoliser le worker. admission_middleware borne, par processus :
+
+- le nombre de requêtes lourdes en cours (MAX_CONCURRENT) ;
+- le nombre de requêtes lourdes par utilisateur, en cours ou en attente (PER_USER) ;
+- la file d'attente (QUEUE_DEPTH requêtes, QUEUE_TIMEOUT secondes au plus).
+
+Au-delà, la réponse est immédiate : 429 avec un en-tête Retry-After.
+
+Le middleware fonctionne en async (Daphne) comme en sync (WSGI). Sous Daphne,
+il agit avant que la vue DRF n'occupe le thread sync partagé : une requête
+refusée ou en attente ne bloque personne. Les quotas dans le temps (par rôle,
+partagés entre processus par le cache) sont dans cvs/throttling.py.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from asgiref.sync import iscoroutinefunction
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+)
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_DEFAULTS = {
+    'ENABLED': True,
+    'MAX_CONCURRENT': 4,
+    'PER_USER': 2,
+    'QUEUE_DEPTH': 16,
+    'QUEUE_TIMEOUT': 5.0,
+    'RETRY_AFTER': 5,
+    'URL_NAMES': (
+        'analyze-job-with-cv',
+        'recruteur-analyze-single',
+        'recruteur-rank',
+        'recruteur-upload-multiple',
+        'async-analyze-job-with-cv',
+        'async-recruteur-analyze-single',
+        'async-recruteur-rank',
+        'async-recruteur-upload-multiple',
+    ),
+}
+
+
+def admission_settings():
+    """settings.API_ADMISSION complété par les valeurs par défaut"""
+    from django.conf import settings
+
+    config = {**ADMISSION_DEFAULTS, **getattr(settings, 'API_ADMISSION', {})}
+    config['URL_NAMES'] = frozenset(config['URL_NAMES'])
+    return config
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """Requête en file : réveillée par un Event (thread) ou un Future (boucle asyncio)"""
+
+    def __init__(self, key, loop=None):
+        self.key = key
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionController:
+    """
+    Places d'exécution partagées par les endpoints lourds d'un processus.
+
+    Une place libérée est donnée directement au premier de la file (FIFO) :
+    une nouvelle requête ne peut pas doubler celles qui attendent.
+    """
+
+    def __init__(self, max_concurrent, per_user, queue_depth, queue_timeout, retry_after):
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_user = per_user
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self._per_key = Counter()
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = admission_settings()
+        return cls(
+            config['MAX_CONCURRENT'], config['PER_USER'], config['QUEUE_DEPTH'],
+            config['QUEUE_TIMEOUT'], config['RETRY_AFTER'],
+        )
+
+    def _enter(self, key, loop=None):
+        """Admet (None), met en file (_Waiter) ou refuse (AdmissionRejected)"""
+        with self._lock:
+            if self.per_user and self._per_key[key] >= self.per_user:
+                raise AdmissionRejected('user', self.retry_after)
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self._per_key[key] += 1
+                ADMISSION_IN_FLIGHT.set(self.active)
+                return None
+            if len(self._waiters) >= self.queue_depth:
+                raise AdmissionRejected('queue_full', self.retry_after)
+
+            waiter = _Waiter(key, loop)
+            self._waiters.append(waiter)
+            self._per_key[key] += 1
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+            return waiter
+
+    def _abandon(self, waiter):
+        """Fin d'attente sans réveil ; False si la place a été donnée entre-temps"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            self._release_key(waiter.key)
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+            return True
+
+    def _release_key(self, key):
+        self._per_key[key] -= 1
+        if self._per_key[key] <= 0:
+            del self._per_key[key]
+
+    def release(self, key):
+        with self._lock:
+            self._release_key(key)
+            if self._waiters:
+                # La place passe directement au suivant : active ne change pas
+                self._waiters.popleft().wake()
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+            else:
+                self.active -= 1
+                ADMISSION_IN_FLIGHT.set(self.active)
+
+    def acquire(self, key):
+        """Version bloquante (thread) ; retourne le temps passé en file"""
+        waiter = self._enter(key)
+        if waiter is None:
+            return 0.0
+        start = time.perf_counter()
+        if not waiter.event.wait(self.queue_timeout) and self._abandon(waiter):
+            raise AdmissionRejected('timeout', self.retry_after)
+        return time.perf_counter() - start
+
+    async def aacquire(self, key):
+        """Version async : l'attente ne bloque pas la boucle d'événements"""
+        waiter = self._enter(key, asyncio.get_running_loop())
+        if waiter is None:
+            return 0.0
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                raise AdmissionRejected('timeout', self.retry_after)
+        except asyncio.CancelledError:
+            # Client déconnecté pendant l'attente : rendre la place si elle a été donnée
+            if not self._abandon(waiter):
+                self.release(key)
+            raise
+        return time.perf_counter() - start
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController.from_settings()
+    return _controller
+
+
+def admission_key(request):
+    """Utilisateur du token JWT (validé, sans accès base), sinon adresse IP"""
+    header = request.headers.get('Authorization', '')
+    parts = header.split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        from rest_framework_simplejwt.exceptions import TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+        try:
+            return f"user:{AccessToken(parts[1])[api_settings.USER_ID_CLAIM]}"
+        except (TokenError, KeyError):
+            pass
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    return f"ip:{forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')}"
+
+
+def controlled_endpoint(request, url_names):
+    """Nom de l'URL si la requête vise un endpoint lourd, sinon None"""
+    if request.method != 'POST':
+        return None
+    try:
+        url_name = resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+    return url_name if url_name in url_names else None
+
+
+def rejection_response(endpoint, error):
+    ADMISSION_REJECTED.labels(endpoint, error.reason).inc()
+    logger.warning(f"⛔ Requête refusée sur {endpoint} ({error.reason})")
+    response = JsonResponse(
+        {
+            'error': "Trop d'analyses en cours, réessayez dans quelques secondes",
+            'reason': error.reason,
+            'retry_after': error.retry_after,
+        },
+        status=429,
+    )
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def record_wait(endpoint, waited):
+    if waited:
+        ADMISSION_QUEUED.labels(endpoint).inc()
+        ADMISSION_QUEUE_WAIT.labels(endpoint).observe(waited)
+
+
+@sync_and_async_middleware
+def admission_middleware(get_response):
+    config = admission_settings()
+    if not config['ENABLED']:
+        return get_response
+    url_names = config['URL_NAMES']
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            endpoint = controlled_endpoint(request, url_names)
+            if endpoint is None:
+                return await get_response(request)
+
+            controller, key = get_controller(), admission_key(request)
+            try:
+                waited = await controller.aacquire(key)
+            except AdmissionRejected as e:
+                return rejection_response(endpoint, e)
+            record_wait(endpoint, waited)
+            try:
+                return await get_response(request)
+            finally:
+                controller.release(key)
+    else:
+        def middleware(request):
+            endpoint = controlled_endpoint(request, url_names)
+            if endpoint is None:
+                return get_response(request)
+
+            controller, key = get_controller(), admission_key(request)
+            try:
+                waited = controller.acquire(key)
+            except AdmissionRejected as e:
+                return rejection_response(endpoint, e)
+            record_wait(endpoint, waited)
+            try:
+                return get_response(request)
+            finally:
+                controller.release(key)
+
+    return middleware
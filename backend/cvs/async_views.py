@@ -0,0 +1,558 @@
+# cvs/async_views.py
+"""
+Versions async des endpoints upload / analyse / classement / historique.
+
+Servies par Daphne sans passer par l'adaptateur sync (un thread à la fois) :
+les accès base utilisent l'ORM async, et chaque appel à l'analyseur part dans
+l'exécuteur borné de nlp_service.executor. Pendant qu'une analyse tourne, la
+boucle d'événements continue de servir les autres requêtes.
+
+Les réponses reprennent celles des vues DRF de cvs/views.py (sans la
+pagination du classement) et sont montées sous /api/v1/cvs/async/...
+Authentification : JWT (en-tête Authorization).
+"""
+import asyncio
+import functools
+import json
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from accounts.middleware import get_user_from_token
+from nlp_service.executor import run_analyzer
+
+from .models import CV, AnalysisResult
+from .progress import ProgressReporter
+from .serializers import CVSerializer
+from .throttling import AnalysisRoleThrottle, BulkAnalysisRoleThrottle
+from .views import (
+    best_score_per_candidate,
+    candidate_identity,
+    create_or_get_candidate,
+    extract_name_and_email_from_text,
+    history_entry,
+    latest_analysis_per_cv,
+    user_history_entry,
+)
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+MAX_CVS_PER_CANDIDATE = 5
+MAX_RANKED_CVS = 10
+
+
+# ============================================
+# OUTILS
+# ============================================
+
+def async_api_view(methods, throttle_classes=()):
+    """
+    Équivalent async de @api_view + IsAuthenticated (+ @throttle_classes) : méthode
+    autorisée, utilisateur JWT dans request.user, quotas DRF, exemption CSRF (API par token).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Méthode « {request.method} » non autorisée.'}, status=405)
+
+            user = await authenticate(request)
+            if user is None:
+                return JsonResponse({'detail': "Informations d'authentification non fournies."}, status=401)
+            request.user = user
+
+            throttled = await check_throttles(request, throttle_classes)
+            if throttled is not None:
+                return throttled
+            return await view(request, *args, **kwargs)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+@sync_to_async
+def check_throttles(request, throttle_classes):
+    """Réponse 429 (Retry-After) si un quota DRF est dépassé, sinon None"""
+    waits = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            waits.append(throttle.wait())
+    if not waits:
+        return None
+
+    wait = max((w for w in waits if w is not None), default=None)
+    response = JsonResponse({'detail': Throttled(wait).detail}, status=429)
+    if wait is not None:
+        response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+async def authenticate(request):
+    """Utilisateur du token 'Authorization: Bearer <access>', ou None"""
+    header = request.headers.get('Authorization', '')
+    parts = header.split()
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None
+    user = await get_user_from_token(parts[1])
+    return user if user.is_authenticated else None
+
+
+def request_data(request):
+    """Corps JSON ou formulaire de la requête"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+
+def respond(data, status=200):
+    return JsonResponse(data, status=status, safe=False)
+
+
+# ============================================
+# CANDIDAT
+# ============================================
+
+@async_api_view(['POST'])
+async def upload_cv_candidat(request):
+    """Candidat upload son CV (extraction et compétences dans l'exécuteur)"""
+    if request.user.role != 'candidat':
+        return respond({'error': 'Accès refusé'}, status=403)
+
+    file = request.FILES.get('file')
+    if not file:
+        return respond({'error': 'Aucun fichier fourni'}, status=400)
+    if not file.name.lower().endswith('.pdf'):
+        return respond({'error': 'Seuls les fichiers PDF sont acceptés'}, status=400)
+
+    try:
+        # Vérifier la limite de 5 CVs
+        user_cvs = CV.objects.filter(candidat=request.user).order_by('uploaded_at')
+        if await user_cvs.acount() >= MAX_CVS_PER_CANDIDATE:
+            cv_to_delete = await user_cvs.afirst()
+            await AnalysisResult.objects.filter(cv=cv_to_delete).adelete()
+            await cv_to_delete.adelete()
+
+        extracted_text = await run_analyzer('extract_text_from_pdf', file)
+        if not extracted_text or not extracted_text.strip():
+            return respond({'error': 'PDF vide ou illisible'}, status=400)
+
+        name, email = extract_name_and_email_from_text(extracted_text)
+        skills_dict, experience = await asyncio.gather(
+            run_analyzer('extract_skills', extracted_text),
+            run_analyzer('extract_experience_years', extracted_text),
+        )
+
+        cv = await CV.objects.acreate(
+            candidat=request.user,
+            file=file,
+            extracted_text=extracted_text,
+            parsed_data={
+                'skills': list(skills_dict.keys()),
+                'skills_with_weights': skills_dict,
+                'experience_years': experience,
+                'extracted_name': name,
+                'extracted_email': email
+            }
+        )
+        cv_data = await sync_to_async(lambda: CVSerializer(cv).data)()
+
+        return respond({
+            'message': 'CV téléchargé avec succès. Veuillez effectuer une analyse pour voir les résultats.',
+            'cv': cv_data,
+            'analysis': None
+        }, status=201)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'upload du CV: {str(e)}", exc_info=True)
+        return respond({'error': f'Une erreur est survenue lors du traitement du CV: {str(e)}'}, status=500)
+
+
+@async_api_view(['POST'], throttle_classes=[AnalysisRoleThrottle])
+async def analyze_job_with_cv(request, cv_id):
+    """Analyser une offre d'emploi avec un CV existant du candidat"""
+    job_description = request_data(request).get('job_description')
+    if not job_description:
+        return respond({'error': 'Le texte de l\'offre d\'emploi est requis'}, status=400)
+
+    try:
+        cv = await CV.objects.select_related('candidat').aget(id=cv_id, candidat=request.user)
+    except CV.DoesNotExist:
+        return respond({'error': 'CV non trouvé ou vous n\'avez pas la permission d\'y accéder'}, status=404)
+
+    if not cv.extracted_text or not cv.extracted_text.strip():
+        return respond({'error': 'Le texte extrait du CV est vide et ne peut pas être analysé'}, status=400)
+
+    try:
+        analysis_result = await run_analyzer('analyze', cv.extracted_text, job_description)
+    except Exception as e:
+        logger.error(f'Erreur lors de l\'analyse du CV {cv_id}: {str(e)}', exc_info=True)
+        return respond({'error': f'Erreur lors de l\'analyse du CV: {str(e)}'}, status=500)
+
+    try:
+        await AnalysisResult.objects.acreate(
+            cv=cv,
+            job_offer_text=job_description,
+            compatibility_score=analysis_result.get('match_score', 0),
+            matched_keywords=analysis_result.get('matched_skills', []),
+            missing_keywords=analysis_result.get('missing_skills', []),
+            summary=analysis_result.get('analysis_summary', ''),
+            analyzed_by=request.user
+        )
+    except Exception as e:
+        # L'analyse a réussi, même si la sauvegarde a échoué
+        logger.error(f'Erreur lors de la sauvegarde du résultat: {str(e)}')
+
+    return respond({
+        'cv_id': cv.id,
+        'match_score': analysis_result.get('match_score', 0),
+        'matching_skills': analysis_result.get('matched_skills', []),
+        'missing_skills': analysis_result.get('missing_skills', []),
+        'summary': analysis_result.get('analysis_summary', ''),
+        'advice': analysis_result.get('advice', ''),
+        'created_at': timezone.now().isoformat(),
+        'cv_file_name': cv.file_name,
+        'candidat_name': f"{cv.candidat.first_name} {cv.candidat.last_name}".strip() or "Candidat inconnu"
+    })
+
+
+# ============================================
+# RECRUTEUR
+# ============================================
+
+async def _save_uploaded_cv(file, extracted_text, skills_dict, experience):
+    name, email = extract_name_and_email_from_text(extracted_text)
+    candidat = await sync_to_async(create_or_get_candidate)(name, email, file.name)
+    parsed_data = {
+        'skills': list(skills_dict.keys()),
+        'skills_with_weights': skills_dict,
+        'experience_years': experience,
+        'extracted_name': name,
+        'extracted_email': email,
+        'file_name': file.name,
+    }
+
+    cv = await CV.objects.filter(candidat=candidat, extracted_text__icontains=extracted_text[:200]).afirst()
+    if cv:
+        cv.file = file
+        cv.parsed_data = {**parsed_data, 'updated_at': timezone.now().isoformat()}
+        await cv.asave()
+    else:
+        cv = await CV.objects.acreate(
+            candidat=candidat,
+            file=file,
+            extracted_text=extracted_text,
+            parsed_data={**parsed_data, 'created_at': timezone.now().isoformat()}
+        )
+
+    return {
+        'cv_id': cv.id,
+        'file_name': file.name,
+        'candidat_name': name,
+        'candidat_email': email,
+        'skills': parsed_data['skills'][:10],
+        'experience_years': experience,
+        'text_length': len(extracted_text)
+    }
+
+
+@async_api_view(['POST'], throttle_classes=[BulkAnalysisRoleThrottle])
+async def upload_cvs_recruteur(request):
+    """Upload multiple : extraction des PDFs en parallèle, compétences par lots"""
+    if request.user.role != 'recruteur':
+        return respond({'error': 'Accès refusé'}, status=403)
+
+    files = request.FILES.getlist('files')
+    if not files:
+        return respond({'error': 'Aucun fichier fourni'}, status=400)
+
+    errors = []
+    progress = ProgressReporter(request.user.id, 'upload', len(files), request.POST.get('job_id'))
+    await progress.astart()
+
+    pdfs = [file for file in files if file.name.lower().endswith('.pdf')]
+    for file in files:
+        if file not in pdfs:
+            errors.append(f"{file.name}: Format non supporté (PDF uniquement)")
+            await progress.astep(file.name)
+
+    async def extract(file):
+        try:
+            return await run_analyzer('extract_text_from_pdf', file)
+        except Exception as e:
+            logger.error(f" Erreur upload {file.name}: {str(e)}")
+            return e
+
+    # Un fichier écarté est terminé dès l'extraction ; les autres après l'écriture de leur CV
+    extracted = []
+    for file, text in zip(pdfs, await asyncio.gather(*(extract(file) for file in pdfs))):
+        if isinstance(text, Exception):
+            errors.append(f"{file.name}: Erreur de traitement - {str(text)}")
+        elif not text or len(text.strip()) < 50:
+            errors.append(f"{file.name}: PDF vide ou illisible")
+        else:
+            extracted.append((file, text))
+            continue
+        await progress.astep(file.name)
+
+    try:
+        texts = [text for _, text in extracted]
+        skills_by_cv, experiences = await asyncio.gather(
+            run_analyzer('extract_skills_batch', texts),
+            asyncio.gather(*(run_analyzer('extract_experience_years', text) for text in texts)),
+        )
+
+        uploaded_cvs = []
+        for (file, text), skills_dict, experience in zip(extracted, skills_by_cv, experiences):
+            try:
+                uploaded_cvs.append(await _save_uploaded_cv(file, text, skills_dict, experience))
+            except Exception as e:
+                logger.error(f" Erreur upload {file.name}: {str(e)}")
+                errors.append(f"{file.name}: Erreur de traitement - {str(e)}")
+            await progress.astep(file.name)
+
+        await progress.acomplete(uploaded=len(uploaded_cvs), errors=len(errors))
+
+        return respond({
+            'message': f'{len(uploaded_cvs)} CV(s) uploadé(s) avec succès',
+            'job_id': progress.job_id,
+            'uploaded_cvs': uploaded_cvs,
+            'errors': errors
+        }, status=201 if uploaded_cvs else 400)
+    except Exception as e:
+        logger.error(f"Erreur inattendue dans upload_cvs_recruteur: {str(e)}", exc_info=True)
+        await progress.afail(str(e))
+        return respond({
+            'error': 'Une erreur est survenue lors du traitement de la requête',
+            'details': str(e)
+        }, status=500)
+
+
+@async_api_view(['POST'], throttle_classes=[AnalysisRoleThrottle])
+async def analyze_recruteur_single(request):
+    """Recruteur : Analyser 1 seul CV vs offre"""
+    if request.user.role != 'recruteur':
+        return respond({'error': 'Accès refusé'}, status=403)
+
+    data = request_data(request)
+    cv_id = data.get('cv_id')
+    job_text = (data.get('job_offer_text') or '').strip()
+    if not cv_id or not job_text:
+        return respond({'error': 'cv_id et job_offer_text requis'}, status=400)
+
+    try:
+        cv = await CV.objects.select_related('candidat').aget(id=cv_id)
+    except (CV.DoesNotExist, ValueError):
+        return respond({'error': 'CV non trouvé'}, status=404)
+
+    (score, matched, missing), summary = await asyncio.gather(
+        run_analyzer('calculate_compatibility', cv.extracted_text, job_text),
+        run_analyzer('summarize_cv', cv.extracted_text),
+    )
+
+    await AnalysisResult.objects.acreate(
+        cv=cv,
+        job_offer_text=job_text,
+        compatibility_score=score,
+        matched_keywords=matched,
+        missing_keywords=missing,
+        summary=summary,
+        analyzed_by=request.user
+    )
+
+    return respond({
+        'cv_id': cv.id,
+        'candidat_name': cv.parsed_data.get('extracted_name', cv.candidat.get_full_name()),
+        'candidat_email': cv.parsed_data.get('extracted_email', cv.candidat.email),
+        'compatibility_score': score,
+        'matched_keywords': matched,
+        'missing_keywords': missing,
+        'summary': summary
+    })
+
+
+@async_api_view(['POST'], throttle_classes=[BulkAnalysisRoleThrottle])
+async def rank_cvs_recruteur(request):
+    """Recruteur : Classer des CVs vs offre, analyses des CVs en parallèle"""
+    if request.user.role != 'recruteur':
+        return respond({'error': 'Accès refusé: rôle recruteur requis'}, status=403)
+
+    data = request_data(request)
+    job_text = (data.get('job_offer_text') or '').strip()
+    if not job_text:
+        return respond({'error': 'Le champ job_offer_text est requis'}, status=400)
+
+    cv_ids = data.get('cv_ids') or []
+    if all(cv_id is None for cv_id in cv_ids):
+        clean_cv_ids = [cv_id async for cv_id in CV.objects.values_list('id', flat=True)]
+    else:
+        clean_cv_ids = []
+        for cv_id in cv_ids:
+            try:
+                if cv_id is not None:
+                    clean_cv_ids.append(int(cv_id))
+            except (ValueError, TypeError):
+                logger.warning(f"ID de CV invalide ignoré: {cv_id}")
+
+    if not clean_cv_ids:
+        return respond({
+            'error': 'Aucun CV disponible pour l\'analyse',
+            'details': 'Veuillez fournir des IDs de CV valides ou importer des CVs',
+            'cv_ids_fournis': cv_ids,
+            'cv_ids_valides': clean_cv_ids
+        }, status=400)
+    clean_cv_ids = clean_cv_ids[:MAX_RANKED_CVS]
+
+    cvs = [cv async for cv in CV.objects.filter(id__in=clean_cv_ids).select_related('candidat').order_by('id')]
+    found_ids = [cv.id for cv in cvs]
+    not_found = [cv_id for cv_id in clean_cv_ids if cv_id not in found_ids]
+    if not cvs:
+        return respond({
+            'error': 'Aucun CV trouvé avec les IDs fournis',
+            'cv_ids_recherches': clean_cv_ids,
+            'cv_ids_non_trouves': clean_cv_ids,
+            'cv_ids_trouves': []
+        }, status=404)
+
+    cvs = [cv for cv in cvs if cv.extracted_text]
+    # Un CV par analyse, plus l'écriture groupée des résultats (abulk_create) en dernière étape
+    progress = ProgressReporter(request.user.id, 'ranking', len(cvs) + 1, data.get('job_id'))
+    await progress.astart()
+
+    async def analyze(cv):
+        try:
+            (score, matched, missing), summary = await asyncio.gather(
+                run_analyzer('calculate_compatibility', cv.extracted_text, job_text),
+                run_analyzer('summarize_cv', cv.extracted_text),
+            )
+            return score, matched, missing, summary
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse du CV {cv.id}: {str(e)}", exc_info=True)
+            return None
+        finally:
+            await progress.astep(str(cv.id))
+
+    try:
+        results = await asyncio.gather(*(analyze(cv) for cv in cvs))
+
+        analyses = []
+        valid_rankings = []
+        for cv, result in zip(cvs, results):
+            if result is None:
+                continue
+            score, matched, missing, summary = result
+            analyses.append(AnalysisResult(
+                cv=cv,
+                job_offer_text=job_text,
+                compatibility_score=score,
+                matched_keywords=matched,
+                missing_keywords=missing,
+                summary=summary,
+                analyzed_by=request.user
+            ))
+            name, email, candidat_id = candidate_identity(cv)
+            valid_rankings.append({
+                'cv_id': cv.id,
+                'cv_filename': cv.file.name.split('/')[-1] if cv.file else 'Aucun fichier',
+                'candidat_name': name,
+                'candidat_email': email,
+                'candidat_id': candidat_id,
+                'score': score,
+                'matched_keywords': matched,
+                'missing_keywords': missing,
+                'summary': summary,
+                'source': 'CV' + (' (candidat existant)' if cv.candidat else ' (nouveau candidat)')
+            })
+        await AnalysisResult.objects.abulk_create(analyses)
+        await progress.astep('enregistrement', saved=len(analyses))
+
+        if not valid_rankings:
+            await progress.afail('Aucun CV valide pour analyse')
+            return respond({
+                'error': 'Aucun CV valide pour analyse',
+                'details': 'Les CVs ne contiennent pas de texte analysable'
+            }, status=400)
+
+        error_rankings = [{
+            'cv_id': missing_id,
+            'candidat_name': 'Non trouvé',
+            'candidat_email': '',
+            'candidat_id': None,
+            'score': 0.0,
+            'error': 'CV non trouvé',
+            'matched_keywords': [],
+            'missing_keywords': []
+        } for missing_id in not_found]
+
+        valid_rankings.sort(key=lambda x: x['score'], reverse=True)
+        unique_rankings = best_score_per_candidate(valid_rankings)
+        await progress.acomplete(total_candidates=len(unique_rankings), errors=len(error_rankings))
+
+        return respond({
+            'cv_ids_demandes': clean_cv_ids,
+            'cv_ids_trouves': found_ids,
+            'cv_ids_manquants': not_found,
+            'total_cvs_trouves': len(found_ids),
+            'message': f"{len(unique_rankings)} candidat(s) unique(s) analysé(s) avec succès" +
+                       (f", {len(error_rankings)} CV(s) en erreur" if error_rankings else "") +
+                       f" (sur {len(valid_rankings) + len(error_rankings)} CVs au total)",
+            'total_cvs_analyses': len(valid_rankings),
+            'total_candidates': len(unique_rankings),
+            'total_cvs_en_erreur': len(error_rankings),
+            'note': 'Uniquement le meilleur score par candidat est affiché. Les doublons sont regroupés.',
+            'job_id': progress.job_id,
+            'rankings': unique_rankings + error_rankings
+        })
+    except Exception as e:
+        logger.error(f"Erreur inattendue dans rank_cvs_recruteur: {str(e)}", exc_info=True)
+        await progress.afail(str(e))
+        return respond({
+            'error': 'Une erreur est survenue lors du traitement de la requête',
+            'details': str(e)
+        }, status=500)
+
+
+# ============================================
+# HISTORIQUE
+# ============================================
+
+@async_api_view(['GET'])
+async def get_analysis_history(request):
+    """Historique des analyses de l'utilisateur connecté (dernière analyse par CV)"""
+    if request.user.role == 'recruteur':
+        analyses = AnalysisResult.objects.filter(analyzed_by=request.user)
+    else:
+        analyses = AnalysisResult.objects.filter(cv__candidat=request.user)
+    analyses = latest_analysis_per_cv(analyses).select_related('cv', 'cv__candidat', 'analyzed_by')
+
+    results = [history_entry(analysis) async for analysis in analyses]
+    results.sort(key=lambda x: x['created_at'], reverse=True)
+    return respond(results)
+
+
+@async_api_view(['GET'])
+async def get_user_analysis_history(request, user_id):
+    """Historique d'analyse d'un utilisateur (recruteurs et administrateurs)"""
+    if request.user.role != 'recruteur' and not request.user.is_staff:
+        return respond(
+            {'error': 'Accès non autorisé. Seuls les recruteurs peuvent voir les historiques des autres utilisateurs.'},
+            status=403
+        )
+
+    try:
+        target_user = await User.objects.aget(id=user_id)
+    except User.DoesNotExist:
+        return respond({'error': 'Utilisateur non trouvé'}, status=404)
+
+    analyses = AnalysisResult.objects.filter(cv__candidat=target_user).select_related('cv').order_by('-created_at')
+    return respond([user_history_entry(analysis, target_user) async for analysis in analyses])
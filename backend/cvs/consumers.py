@@ -0,0 +1,53 @@
+# cvs/consumers.py
+import logging
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .progress import progress_group
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket de progression des tâches longues (upload multiple, classement).
+
+    Le client s'authentifie avec son JWT (?token=...) puis peut envoyer :
+    - {"action": "subscribe", "job_id": "..."} pour ne suivre que certaines tâches
+    - {"action": "unsubscribe", "job_id": "..."}
+    Sans abonnement explicite, tous les événements de l'utilisateur sont transmis.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = progress_group(user.id)
+        self.job_ids = set()
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        job_id = content.get('job_id')
+
+        if action == 'subscribe' and job_id:
+            self.job_ids.add(str(job_id))
+            await self.send_json({'event': 'subscribed', 'job_id': str(job_id)})
+        elif action == 'unsubscribe' and job_id:
+            self.job_ids.discard(str(job_id))
+            await self.send_json({'event': 'unsubscribed', 'job_id': str(job_id)})
+        else:
+            await self.send_json({'event': 'error', 'error': 'Action inconnue ou job_id manquant'})
+
+    async def progress_event(self, event):
+        payload = event['payload']
+        if self.job_ids and payload.get('job_id') not in self.job_ids:
+            return
+        await self.send_json(payload)
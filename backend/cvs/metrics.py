@@ -0,0 +1,38 @@
+# cvs/metrics.py
+"""
+Métriques Prometheus de l'API CVs (registre par défaut, exposé par /api/v1/metrics/).
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# ============================================
+# CONTRÔLE D'ADMISSION (cvs/admission.py)
+# ============================================
+
+ADMISSION_REJECTED = Counter(
+    'recrutai_admission_rejected_total',
+    "Requêtes refusées (429) par endpoint et motif (user / queue_full / timeout)",
+    ['endpoint', 'reason'],
+)
+
+ADMISSION_QUEUED = Counter(
+    'recrutai_admission_queued_total',
+    "Requêtes mises en file d'attente faute de place libre",
+    ['endpoint'],
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    'recrutai_admission_queue_wait_seconds',
+    "Attente en file avant admission",
+    ['endpoint'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'recrutai_admission_in_flight',
+    "Requêtes admises en cours sur les endpoints lourds",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'recrutai_admission_queue_depth',
+    "Requêtes en attente d'admission",
+)
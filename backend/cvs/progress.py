@@ -0,0 +1,100 @@
+# cvs/progress.py
+"""
+Publication des événements de progression (upload multiple, classement)
+vers les WebSockets de l'utilisateur via le channel layer.
+"""
+import logging
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def progress_group(user_id) -> str:
+    """Nom du groupe Channels qui reçoit les événements d'un utilisateur"""
+    return f"progress_user_{user_id}"
+
+
+def new_job_id() -> str:
+    """Génère un identifiant de tâche unique"""
+    return uuid.uuid4().hex
+
+
+class ProgressReporter:
+    """
+    Envoie les événements started / progress / completed / failed d'une tâche.
+
+    Les erreurs du channel layer (Redis indisponible, etc.) sont journalisées
+    mais n'interrompent jamais le traitement de la requête. Les vues async
+    utilisent les variantes astart / astep / acomplete / afail.
+
+    step() est appelé quand un élément est terminé (résultat écrit en base ou
+    élément écarté), pour que done == total ne précède aucune écriture.
+    """
+
+    def __init__(self, user_id, kind: str, total: int, job_id: str = None):
+        self.user_id = user_id
+        self.kind = kind
+        self.total = total
+        self.job_id = str(job_id) if job_id else new_job_id()
+        self.done = 0
+        self._layer = get_channel_layer()
+
+    def start(self):
+        self._send('started')
+
+    def step(self, item: str = None, **extra):
+        """Signale qu'un élément de plus est terminé"""
+        self.done += 1
+        self._send('progress', item=item, **extra)
+
+    def complete(self, **summary):
+        self._send('completed', **summary)
+
+    def fail(self, error: str):
+        self._send('failed', error=error)
+
+    async def astart(self):
+        await self._asend('started')
+
+    async def astep(self, item: str = None, **extra):
+        self.done += 1
+        await self._asend('progress', item=item, **extra)
+
+    async def acomplete(self, **summary):
+        await self._asend('completed', **summary)
+
+    async def afail(self, error: str):
+        await self._asend('failed', error=error)
+
+    def _message(self, event: str, **data):
+        payload = {
+            'event': event,
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'done': self.done,
+            'total': self.total,
+            'percent': round(self.done * 100 / self.total, 1) if self.total else 100.0,
+            'timestamp': timezone.now().isoformat(),
+            **data,
+        }
+        return {'type': 'progress.event', 'payload': payload}
+
+    def _send(self, event: str, **data):
+        if self._layer is None:
+            return
+        try:
+            async_to_sync(self._layer.group_send)(progress_group(self.user_id), self._message(event, **data))
+        except Exception as e:
+            logger.warning(f"Impossible d'envoyer l'événement de progression {event} ({self.job_id}): {e}")
+
+    async def _asend(self, event: str, **data):
+        if self._layer is None:
+            return
+        try:
+            await self._layer.group_send(progress_group(self.user_id), self._message(event, **data))
+        except Exception as e:
+            logger.warning(f"Impossible d'envoyer l'événement de progression {event} ({self.job_id}): {e}")
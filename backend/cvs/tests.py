@@ -1,3 +1,340 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.middleware import JWTAuthMiddlewareStack
+from accounts.routing import websocket_urlpatterns
+
+from . import admission
+from .admission import AdmissionController, AdmissionRejected
+from .models import CV
+from .progress import ProgressReporter
+from .throttling import AnalysisRoleThrottle, BulkAnalysisRoleThrottle
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class ProgressConsumerTests(TransactionTestCase):
+    """WebSocket ws/progress/ : authentification JWT, abonnements, filtrage des événements"""
+
+    def setUp(self):
+        self.application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        self.recruteur = User.objects.create_user(
+            username='recruteur', email='recruteur@example.com', password='secret', role='recruteur'
+        )
+        self.autre = User.objects.create_user(
+            username='autre', email='autre@example.com', password='secret', role='recruteur'
+        )
+
+    async def connect(self, token):
+        communicator = WebsocketCommunicator(self.application, f'/ws/progress/?token={token}')
+        connected, code = await communicator.connect()
+        return communicator, connected, code
+
+    async def test_jwt_invalide_refuse(self):
+        communicator, connected, code = await self.connect('pas-un-jwt')
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_sans_token_refuse(self):
+        communicator = WebsocketCommunicator(self.application, '/ws/progress/')
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_subscribe_unsubscribe(self):
+        communicator, connected, _ = await self.connect(AccessToken.for_user(self.recruteur))
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({'action': 'subscribe', 'job_id': 'job-a'})
+        self.assertEqual(await communicator.receive_json_from(), {'event': 'subscribed', 'job_id': 'job-a'})
+
+        await communicator.send_json_to({'action': 'unsubscribe', 'job_id': 'job-a'})
+        self.assertEqual(await communicator.receive_json_from(), {'event': 'unsubscribed', 'job_id': 'job-a'})
+
+        await communicator.send_json_to({'action': 'subscribe'})
+        self.assertEqual((await communicator.receive_json_from())['event'], 'error')
+        await communicator.disconnect()
+
+    async def test_evenements_de_l_utilisateur_uniquement(self):
+        communicator, connected, _ = await self.connect(AccessToken.for_user(self.recruteur))
+        self.assertTrue(connected)
+
+        await ProgressReporter(self.autre.id, 'upload', 2, job_id='job-autre').astep('cv.pdf')
+        self.assertTrue(await communicator.receive_nothing())
+
+        await ProgressReporter(self.recruteur.id, 'upload', 2, job_id='job-a').astep('cv.pdf')
+        payload = await communicator.receive_json_from()
+        self.assertEqual((payload['event'], payload['job_id'], payload['done'], payload['total']),
+                         ('progress', 'job-a', 1, 2))
+        await communicator.disconnect()
+
+    async def test_abonnement_filtre_les_autres_taches(self):
+        communicator, connected, _ = await self.connect(AccessToken.for_user(self.recruteur))
+        self.assertTrue(connected)
+        await communicator.send_json_to({'action': 'subscribe', 'job_id': 'job-a'})
+        await communicator.receive_json_from()
+
+        await ProgressReporter(self.recruteur.id, 'ranking', 1, job_id='job-b').astart()
+        self.assertTrue(await communicator.receive_nothing())
+
+        await ProgressReporter(self.recruteur.id, 'ranking', 1, job_id='job-a').acomplete(total_candidates=1)
+        payload = await communicator.receive_json_from()
+        self.assertEqual((payload['event'], payload['job_id']), ('completed', 'job-a'))
+        await communicator.disconnect()
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition non atteinte")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(TestCase):
+    """Places, file FIFO et refus du contrôle d'admission"""
+
+    def test_refus_par_utilisateur(self):
+        controller = AdmissionController(4, 1, 4, 0.1, 3)
+        controller.acquire('user:1')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('user:1')
+        self.assertEqual((ctx.exception.reason, ctx.exception.retry_after), ('user', 3))
+        controller.acquire('user:2')
+
+    def test_file_pleine_et_timeout(self):
+        controller = AdmissionController(1, 0, 0, 0.05, 3)
+        controller.acquire('user:1')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('user:2')
+        self.assertEqual(ctx.exception.reason, 'queue_full')
+
+        controller = AdmissionController(1, 0, 1, 0.05, 3)
+        controller.acquire('user:1')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('user:2')
+        self.assertEqual(ctx.exception.reason, 'timeout')
+        self.assertEqual(len(controller._waiters), 0)
+
+    def test_file_fifo(self):
+        controller = AdmissionController(1, 0, 4, 2.0, 3)
+        controller.acquire('user:0')
+        admitted = []
+
+        def request(key):
+            controller.acquire(key)
+            admitted.append(key)
+
+        threads = []
+        for index, key in enumerate(['user:1', 'user:2', 'user:3']):
+            thread = threading.Thread(target=request, args=(key,))
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: len(controller._waiters) == index + 1)
+
+        for expected, previous in zip(['user:1', 'user:2', 'user:3'], ['user:0', 'user:1', 'user:2']):
+            controller.release(previous)
+            wait_until(lambda: expected in admitted)
+            self.assertEqual(admitted[-1], expected)
+            self.assertEqual(controller.active, 1)
+        for thread in threads:
+            thread.join()
+        controller.release('user:3')
+        self.assertEqual(controller.active, 0)
+        self.assertEqual(admitted, ['user:1', 'user:2', 'user:3'])
+
+    async def test_file_fifo_async(self):
+        controller = AdmissionController(1, 0, 4, 2.0, 3)
+        await controller.aacquire('user:0')
+        admitted = []
+
+        async def request(key):
+            await controller.aacquire(key)
+            admitted.append(key)
+
+        tasks = []
+        for index, key in enumerate(['user:1', 'user:2']):
+            tasks.append(asyncio.ensure_future(request(key)))
+            while len(controller._waiters) != index + 1:
+                await asyncio.sleep(0)
+
+        controller.release('user:0')
+        await tasks[0]
+        self.assertEqual(admitted, ['user:1'])
+        controller.release('user:1')
+        await tasks[1]
+        self.assertEqual(admitted, ['user:1', 'user:2'])
+
+
+class AdmissionMiddlewareTests(TestCase):
+    """429 + Retry-After sur les endpoints d'analyse, en sync comme en async"""
+
+    def setUp(self):
+        self.recruteur = User.objects.create_user(
+            username='recruteur', email='recruteur@example.com', password='secret', role='recruteur'
+        )
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.recruteur)}'}
+        self.key = f'user:{self.recruteur.id}'
+
+    def controller(self, max_concurrent, per_user, queue_depth):
+        return mock.patch.object(admission, '_controller', AdmissionController(
+            max_concurrent, per_user, queue_depth, 0.05, 7
+        ))
+
+    def assertRejected(self, response, reason):
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(response.json()['reason'], reason)
+
+    def test_analyses_unitaires_controlees(self):
+        for name in ('analyze-job-with-cv', 'recruteur-analyze-single',
+                     'async-analyze-job-with-cv', 'async-recruteur-analyze-single'):
+            self.assertIn(name, admission.admission_settings()['URL_NAMES'])
+
+    def test_au_dela_de_per_user(self):
+        with self.controller(4, 1, 4) as controller:
+            controller.acquire(self.key)
+            response = self.client.post(reverse('recruteur-analyze-single'), {}, **self.headers)
+        self.assertRejected(response, 'user')
+
+    def test_au_dela_de_max_concurrent(self):
+        with self.controller(1, 2, 0) as controller:
+            controller.acquire('user:autre')
+            response = self.client.post(reverse('analyze-job-with-cv', args=[1]), {}, **self.headers)
+        self.assertRejected(response, 'queue_full')
+
+    async def test_au_dela_de_max_concurrent_async(self):
+        with self.controller(1, 2, 1) as controller:
+            await controller.aacquire('user:autre')
+            response = await AsyncClient().post(
+                reverse('async-recruteur-analyze-single'), {},
+                headers={'Authorization': self.headers['HTTP_AUTHORIZATION']},
+            )
+        self.assertRejected(response, 'timeout')
+
+    async def test_au_dela_de_per_user_async(self):
+        with self.controller(4, 1, 4) as controller:
+            await controller.aacquire(self.key)
+            response = await AsyncClient().post(
+                reverse('async-analyze-job-with-cv', args=[1]), {},
+                headers={'Authorization': self.headers['HTTP_AUTHORIZATION']},
+            )
+        self.assertRejected(response, 'user')
+
+
+class RoleRateThrottleTests(TestCase):
+    """Taux choisi selon '<scope>_<rôle>'"""
+
+    RATES = {
+        'analysis_candidat': '1/min',
+        'analysis_recruteur': '3/min',
+        'bulk_analysis_recruteur': '2/min',
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = APIView()
+
+    def request_for(self, role):
+        user = User(id={'candidat': 1, 'recruteur': 2}.get(role, 3), username=role, role=role)
+        request = self.view.initialize_request(self.factory.post('/'))
+        request.user = user
+        return request
+
+    def allowed(self, throttle_class, role, count):
+        with mock.patch.object(throttle_class, 'THROTTLE_RATES', self.RATES):
+            return [throttle_class().allow_request(self.request_for(role), self.view) for _ in range(count)]
+
+    def test_taux_par_role(self):
+        self.assertEqual(self.allowed(AnalysisRoleThrottle, 'candidat', 2), [True, False])
+        self.assertEqual(self.allowed(AnalysisRoleThrottle, 'recruteur', 4), [True, True, True, False])
+        self.assertEqual(self.allowed(BulkAnalysisRoleThrottle, 'recruteur', 3), [True, True, False])
+
+    def test_scope_du_role(self):
+        throttle = AnalysisRoleThrottle()
+        with mock.patch.object(AnalysisRoleThrottle, 'THROTTLE_RATES', self.RATES):
+            throttle.allow_request(self.request_for('recruteur'), self.view)
+        self.assertEqual((throttle.role_scope_name, throttle.rate), ('analysis_recruteur', '3/min'))
+
+    def test_role_sans_taux_non_limite(self):
+        self.assertEqual(self.allowed(BulkAnalysisRoleThrottle, 'candidat', 5), [True] * 5)
+
+
+class ProgressFailureTests(TransactionTestCase):
+    """Une erreur inattendue clôt la tâche de progression (failed) au lieu de la laisser en cours"""
+
+    def setUp(self):
+        self.recruteur = User.objects.create_user(
+            username='recruteur', email='recruteur@example.com', password='secret', role='recruteur'
+        )
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.recruteur)}'}
+        self.cv = CV.objects.create(candidat=self.recruteur, file='cvs/cv.pdf', extracted_text='Python Django')
+        self.payload = {'job_offer_text': 'Développeur Python', 'cv_ids': [self.cv.id], 'job_id': 'job-a'}
+
+    async def fake_run_analyzer(self, method, *args, **kwargs):
+        return {
+            'calculate_compatibility': (0.5, ['python'], []),
+            'summarize_cv': 'Résumé',
+            'extract_text_from_pdf': 'Python Django ' * 10,
+            'extract_experience_years': 2,
+        }[method]
+
+    def test_classement_sync(self):
+        fake_analyzer = mock.Mock()
+        fake_analyzer.calculate_compatibility.return_value = (0.5, ['python'], [])
+        fake_analyzer.summarize_cv.return_value = 'Résumé'
+        with mock.patch('cvs.views.analyzer', fake_analyzer), \
+                mock.patch('cvs.views.best_score_per_candidate', side_effect=RuntimeError('boom')), \
+                mock.patch.object(ProgressReporter, 'fail') as fail:
+            response = self.client.post(reverse('recruteur-rank'), self.payload,
+                                        content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 500)
+        fail.assert_called_once_with('boom')
+
+    def test_classement_sync_erreur_avant_la_tache(self):
+        with mock.patch.object(ProgressReporter, 'fail') as fail:
+            response = self.client.post(reverse('recruteur-rank'), {**self.payload, 'page': 'abc'},
+                                        content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 500)
+        fail.assert_not_called()
+
+    async def test_classement_async_ecriture_en_echec(self):
+        with mock.patch('cvs.async_views.run_analyzer', self.fake_run_analyzer), \
+                mock.patch('django.db.models.query.QuerySet.abulk_create', side_effect=DatabaseError('disque plein')), \
+                mock.patch.object(ProgressReporter, 'afail') as afail:
+            response = await AsyncClient().post(reverse('async-recruteur-rank'), self.payload, content_type='application/json',
+                                                headers={'Authorization': self.headers['HTTP_AUTHORIZATION']})
+        self.assertEqual(response.status_code, 500)
+        afail.assert_awaited_once_with('disque plein')
+
+    async def test_upload_async_competences_en_echec(self):
+        async def run_analyzer(method, *args, **kwargs):
+            if method == 'extract_skills_batch':
+                raise RuntimeError('exécuteur indisponible')
+            return await self.fake_run_analyzer(method, *args, **kwargs)
+
+        upload = SimpleUploadedFile('cv.pdf', b'%PDF-1.4', content_type='application/pdf')
+        with mock.patch('cvs.async_views.run_analyzer', run_analyzer), \
+                mock.patch.object(ProgressReporter, 'afail') as afail:
+            response = await AsyncClient().post(reverse('async-recruteur-upload-multiple'), {'files': [upload]},
+                                                headers={'Authorization': self.headers['HTTP_AUTHORIZATION']})
+        self.assertEqual(response.status_code, 500)
+        afail.assert_awaited_once_with('exécuteur indisponible')
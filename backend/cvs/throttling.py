@@ -0,0 +1,47 @@
+# cvs/throttling.py
+"""
+Quotas DRF des endpoints d'analyse, selon le rôle de l'utilisateur.
+
+Le taux est lu dans REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] sous la clé
+'<scope>_<rôle>' (ex. 'analysis_recruteur') ; sans taux pour un rôle, pas de
+limite. Les compteurs sont dans le cache Django (Redis en production), donc
+communs à tous les workers. Dépassement : 429 avec Retry-After (DRF).
+"""
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class RoleRateThrottle(SimpleRateThrottle):
+    """Quota par utilisateur (par IP si anonyme), taux choisi selon son rôle"""
+    scope = None
+
+    def __init__(self):
+        # Le taux dépend de l'utilisateur : résolu dans allow_request
+        self.rate = None
+
+    def role_scope(self, request):
+        user = request.user
+        role = getattr(user, 'role', '') if user and user.is_authenticated else 'anon'
+        return f"{self.scope}_{role or 'anon'}"
+
+    def allow_request(self, request, view):
+        self.role_scope_name = self.role_scope(request)
+        self.rate = self.THROTTLE_RATES.get(self.role_scope_name)
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.role_scope_name, 'ident': ident}
+
+
+class AnalysisRoleThrottle(RoleRateThrottle):
+    """Analyses unitaires : 'analysis_<rôle>'"""
+    scope = 'analysis'
+
+
+class BulkAnalysisRoleThrottle(RoleRateThrottle):
+    """Classement et upload multiple : 'bulk_analysis_<rôle>'"""
+    scope = 'bulk_analysis'
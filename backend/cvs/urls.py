@@ -1,7 +1,7 @@
 # cvs/urls.py
 import logging
 from django.urls import path
-from . import views
+from . import async_views, views
 
 logger = logging.getLogger(__name__)
 
@@ -60,4 +60,14 @@ urlpatterns = [
     
     # TEST
     path('test-analyzer/', views.test_analyzer, name='test-analyzer'),
+
+    # ASYNC (ORM async + exécuteur borné pour l'analyseur, servies par Daphne)
+    path('async/candidat/upload/', async_views.upload_cv_candidat, name='async-candidat-upload'),
+    path('async/candidat/analyze-job/<int:cv_id>/', async_views.analyze_job_with_cv, name='async-analyze-job-with-cv'),
+    path('async/recruteur/upload/', async_views.upload_cvs_recruteur, name='async-recruteur-upload-multiple'),
+    path('async/recruteur/analyze-single/', async_views.analyze_recruteur_single, name='async-recruteur-analyze-single'),
+    path('async/recruteur/rank/', async_views.rank_cvs_recruteur, name='async-recruteur-rank'),
+    path('async/recruteur/analysis/user/<int:user_id>/', async_views.get_user_analysis_history,
+         name='async-user-analysis-history'),
+    path('async/history/', async_views.get_analysis_history, name='async-analysis-history'),
 ]
\ No newline at end of file
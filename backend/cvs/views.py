@@ -3,23 +3,29 @@
 import os
 import re
 from django.utils import timezone
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
+from django.db.models import OuterRef, Subquery
 import logging
 import re
 from typing import Tuple
 
 from .models import CV, AnalysisResult
 from .serializers import CVSerializer, AnalysisResultSerializer
-from nlp_service.analyzer import MLCVAnalyzer
+from .progress import ProgressReporter
+from .throttling import AnalysisRoleThrottle, BulkAnalysisRoleThrottle
+from django.utils.functional import SimpleLazyObject
+from nlp_service.analyzer import get_analyzer
+from nlp_service.normalization import squash_spaces
 
 logger = logging.getLogger(__name__)
-analyzer = MLCVAnalyzer()
+# Construit à la première utilisation (ou par le préchauffage de NlpServiceConfig.ready)
+analyzer = SimpleLazyObject(get_analyzer)
 User = get_user_model()
 
 # ============================================
@@ -32,7 +38,7 @@ def extract_name_and_email_from_text(text: str) -> Tuple[str, str]:
     """
     # Nettoyer le texte en gardant les retours à la ligne pour l'analyse
     text = text.replace('\r', '\n').replace('\n\n', '\n')
-    clean_text = ' '.join(text.split())
+    clean_text = squash_spaces(text)
     
     # 1. Extraction EMAIL (version améliorée)
     email = ""
@@ -188,8 +194,139 @@ def create_or_get_candidate(name: str, email: str, filename: str):
 # VUES PRINCIPALES
 # ============================================
 
+def candidate_identity(cv):
+    """
+    Nom, email et identifiant à afficher pour un CV (cv.candidat doit être chargé)
+    """
+    # 1. Essayer d'abord le nom extrait du CV
+    name = cv.parsed_data.get('extracted_name', '')
+    
+    # 2. Si non trouvé, essayer le nom du candidat lié
+    if not name and cv.candidat:
+        name = cv.candidat.get_full_name()
+    
+    # 3. Si toujours pas trouvé, extraire du nom de fichier
+    if not name and cv.file:
+        # Enlever l'extension et les caractères spéciaux
+        filename = os.path.splitext(os.path.basename(cv.file.name))[0]
+        # Supprimer les suffixes aléatoires ajoutés par Django (après le dernier _)
+        if '_' in filename:
+            filename = filename.rsplit('_', 1)[0]
+        # Remplacer les séparateurs par des espaces et formater correctement le nom
+        name_parts = []
+        for part in re.split(r'[\s_\-]+', filename):
+            if not part.strip() or any(c.isdigit() for c in part):
+                continue
+            # Mettre en majuscule la première lettre et le reste en minuscules
+            part = part.strip().lower()
+            if part in ['cv', 'resume', 'curriculum', 'vitae']:
+                continue
+            # Gestion des noms composés (ex: Ben-Hadj-Hassine)
+            if '-' in part:
+                part = '-'.join([p.capitalize() for p in part.split('-')])
+            else:
+                part = part.capitalize()
+            name_parts.append(part)
+        
+        name = ' '.join(name_parts)
+    
+    # 4. Si toujours rien, utiliser une valeur par défaut
+    if not name:
+        name = f"Candidat {cv.id}"
+    
+    # Extraction de l'email avec priorité sur l'email extrait, puis sur l'email du candidat
+    email = cv.parsed_data.get('extracted_email', '')
+    if not email and cv.candidat and cv.candidat.email:
+        email = cv.candidat.email
+    if not email:
+        email = f"candidat_{cv.id}@example.com"
+    
+    # Nettoyage de l'email
+    email = email.strip().lower()
+    
+    # Utiliser l'ID du CV comme identifiant unique si pas de candidat
+    candidat_id = cv.candidat.id if cv.candidat else f"cv_{cv.id}"
+    
+    return name, email, candidat_id
+
+
+def best_score_per_candidate(valid_rankings):
+    """Regroupe les classements par email et ne garde que le meilleur score par candidat"""
+    best_scores = {}
+    for ranking in valid_rankings:
+        email = ranking.get('candidat_email', '').lower()
+        if not email:
+            continue
+            
+        # Si le candidat n'est pas encore dans le dictionnaire ou si on a un meilleur score
+        if email not in best_scores or ranking['score'] > best_scores[email]['score']:
+            # Ajouter la liste des fichiers pour ce candidat
+            if email in best_scores:
+                # Si on a déjà un CV pour ce candidat, on ajoute le fichier à la liste
+                if 'files' not in ranking:
+                    ranking['files'] = []
+                if 'files' in best_scores[email]:
+                    ranking['files'].extend(best_scores[email]['files'])
+                ranking['files'].append(best_scores[email]['cv_filename'])
+            best_scores[email] = ranking
+    
+    # Convertir le dictionnaire en liste triée par score décroissant
+    unique_rankings = list(best_scores.values())
+    unique_rankings.sort(key=lambda x: x['score'], reverse=True)
+    
+    return unique_rankings
+
+
+def latest_analysis_per_cv(analyses):
+    """
+    Dernière analyse de chaque CV parmi le queryset (sous-requête corrélée,
+    portable : DISTINCT ON n'existe que sous PostgreSQL)
+    """
+    latest = analyses.filter(cv_id=OuterRef('cv_id')).order_by('-created_at', '-id').values('id')[:1]
+    return analyses.filter(id=Subquery(latest))
+
+
+def history_entry(analysis):
+    """Entrée d'historique pour le frontend (cv, cv__candidat et analyzed_by chargés)"""
+    return {
+        'id': analysis.id,
+        'cv_id': analysis.cv.id if analysis.cv else None,
+        'cv_file_name': analysis.cv.file_name if analysis.cv else 'CV inconnu',
+        'match_score': analysis.compatibility_score,
+        'created_at': analysis.created_at,
+        'summary': analysis.summary or 'Aucun résumé disponible',
+        'matched_skills': analysis.matched_keywords or [],
+        'missing_skills': analysis.missing_keywords or [],
+        'job_offer_text': analysis.job_offer_text or 'Aucune offre spécifiée',
+        'user_id': analysis.cv.candidat.id if analysis.cv and analysis.cv.candidat else None,
+        'user_name': analysis.cv.candidat.get_full_name() if analysis.cv and analysis.cv.candidat else 'Utilisateur inconnu',
+        'analyzed_by': {
+            'id': analysis.analyzed_by.id if analysis.analyzed_by else None,
+            'name': analysis.analyzed_by.get_full_name() if analysis.analyzed_by else 'Système'
+        } if analysis.analyzed_by else None
+    }
+
+
+def user_history_entry(analysis, target_user):
+    """Entrée de l'historique d'un candidat consulté par un recruteur (cv chargé)"""
+    return {
+        'id': analysis.id,
+        'cv_id': analysis.cv.id if analysis.cv else None,
+        'cv_file_name': analysis.cv.file_name if analysis.cv else 'CV inconnu',
+        'match_score': analysis.compatibility_score,
+        'created_at': analysis.created_at,
+        'summary': analysis.summary or 'Aucun résumé disponible',
+        'matched_skills': analysis.matched_keywords or [],
+        'missing_skills': analysis.missing_keywords or [],
+        'job_offer_text': analysis.job_offer_text or 'Aucune offre spécifiée',
+        'user_id': target_user.id,
+        'user_name': target_user.get_full_name() or target_user.email,
+    }
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AnalysisRoleThrottle])
 def analyze_job_with_cv(request, cv_id):
     """
     Analyser une offre d'emploi avec un CV existant
@@ -387,6 +524,7 @@ def upload_cv_candidat(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([BulkAnalysisRoleThrottle])
 @parser_classes([MultiPartParser, FormParser])
 def upload_cvs_recruteur(request):
     """Version CORRIGÉE de l'upload multiple"""
@@ -400,7 +538,14 @@ def upload_cvs_recruteur(request):
     uploaded_cvs = []
     errors = []
 
+    # Progression diffusée sur le WebSocket ws/progress/ (job_id fourni par le client ou généré)
+    progress = ProgressReporter(request.user.id, 'upload', len(files), request.data.get('job_id'))
+    progress.start()
+
+    # 1. Extraction du texte de chaque PDF
+    extracted = []
     for file in files:
+        errors_before = len(errors)
         try:
             # Vérification du type de fichier
             if not file.name.lower().endswith('.pdf'):
@@ -412,14 +557,34 @@ def upload_cvs_recruteur(request):
             if not extracted_text or len(extracted_text.strip()) < 50:
                 errors.append(f"{file.name}: PDF vide ou illisible")
                 continue
+            extracted.append((file, extracted_text))
+
+        except Exception as e:
+            logger.error(f" Erreur upload {file.name}: {str(e)}")
+            errors.append(f"{file.name}: Erreur de traitement - {str(e)}")
+        finally:
+            # Fichier écarté : terminé ici ; les autres le sont après leur création (étape 3)
+            if len(errors) > errors_before:
+                progress.step(file.name)
 
+    # 2. Compétences de tous les CVs en un seul passage spaCy (nlp.pipe par lots)
+    try:
+        skills_by_cv = analyzer.extract_skills_batch([text for _, text in extracted])
+    except Exception as e:
+        logger.error(f" Erreur extraction des compétences par lots: {str(e)}")
+        skills_by_cv = [None] * len(extracted)
+
+    # 3. Création des candidats et des CVs
+    for (file, extracted_text), skills_dict in zip(extracted, skills_by_cv):
+        try:
             # EXTRACTION CORRECTE du nom et email
             name, email = extract_name_and_email_from_text(extracted_text)
             
             logger.info(f" Fichier {file.name} -> Nom: {name}, Email: {email}")
 
             # Extraction des compétences
-            skills_dict = analyzer.extract_skills(extracted_text)
+            if skills_dict is None:
+                skills_dict = analyzer.extract_skills(extracted_text)
             skills_list = list(skills_dict.keys())  # Convertir en liste de compétences
             experience = analyzer.extract_experience_years(extracted_text)
 
@@ -477,15 +642,20 @@ def upload_cvs_recruteur(request):
         except Exception as e:
             logger.error(f" Erreur upload {file.name}: {str(e)}")
             errors.append(f"{file.name}: Erreur de traitement - {str(e)}")
+        progress.step(file.name)
+
+    progress.complete(uploaded=len(uploaded_cvs), errors=len(errors))
 
     return Response({
         'message': f'{len(uploaded_cvs)} CV(s) uploadé(s) avec succès',
+        'job_id': progress.job_id,
         'uploaded_cvs': uploaded_cvs,
         'errors': errors
     }, status=201 if uploaded_cvs else 400)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AnalysisRoleThrottle])
 def analyze_recruteur_single(request):
     """Recruteur : Analyser 1 seul CV vs offre"""
     if request.user.role != 'recruteur':
@@ -533,6 +703,7 @@ logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([BulkAnalysisRoleThrottle])
 def rank_cvs_recruteur(request):
     """
     Recruteur : Classer des CVs spécifiques vs offre (ordre décroissant)
@@ -541,6 +712,8 @@ def rank_cvs_recruteur(request):
     logger.info(f"Utilisateur: {request.user} (rôle: {getattr(request.user, 'role', 'non défini')})")
     logger.info(f"Headers: {dict(request.headers)}")
     
+    # Créé juste avant l'analyse : une erreur pendant la validation n'a pas de tâche à clore
+    progress = None
     try:
         # Vérifier si les données sont bien du JSON
         if not request.data:
@@ -689,10 +862,15 @@ def rank_cvs_recruteur(request):
         # Création d'un ensemble pour suivre les CVs déjà traités
         processed_cv_ids = set()
         
+        # Progression diffusée sur le WebSocket ws/progress/
+        progress = ProgressReporter(request.user.id, 'ranking', len(cvs), request.data.get('job_id'))
+        progress.start()
+        
         for cv in cvs:
             # Vérification des doublons
             if cv.id in processed_cv_ids:
                 logger.warning(f"CV {cv.id} déjà traité, ignoré")
+                progress.step(str(cv.id))
                 continue
                 
             try:
@@ -721,55 +899,7 @@ def rank_cvs_recruteur(request):
                 )
                 logger.info(f"Analyse enregistrée avec l'ID {analysis.id} pour le CV {cv.id}")
                 
-                # Extraction des informations du candidat
-                # 1. Essayer d'abord le nom extrait du CV
-                name = cv.parsed_data.get('extracted_name', '')
-                
-                # 2. Si non trouvé, essayer le nom du candidat lié
-                if not name and cv.candidat:
-                    name = cv.candidat.get_full_name()
-                
-                # 3. Si toujours pas trouvé, extraire du nom de fichier
-                if not name and cv.file:
-                    # Enlever l'extension et les caractères spéciaux
-                    filename = os.path.splitext(os.path.basename(cv.file.name))[0]
-                    # Supprimer les suffixes aléatoires ajoutés par Django (après le dernier _)
-                    if '_' in filename:
-                        filename = filename.rsplit('_', 1)[0]
-                    # Remplacer les séparateurs par des espaces et formater correctement le nom
-                    name_parts = []
-                    for part in re.split(r'[\s_\-]+', filename):
-                        if not part.strip() or any(c.isdigit() for c in part):
-                            continue
-                        # Mettre en majuscule la première lettre et le reste en minuscules
-                        part = part.strip().lower()
-                        if part in ['cv', 'resume', 'curriculum', 'vitae']:
-                            continue
-                        # Gestion des noms composés (ex: Ben-Hadj-Hassine)
-                        if '-' in part:
-                            part = '-'.join([p.capitalize() for p in part.split('-')])
-                        else:
-                            part = part.capitalize()
-                        name_parts.append(part)
-                    
-                    name = ' '.join(name_parts)
-                
-                # 4. Si toujours rien, utiliser une valeur par défaut
-                if not name:
-                    name = f"Candidat {cv.id}"
-                
-                # Extraction de l'email avec priorité sur l'email extrait, puis sur l'email du candidat
-                email = cv.parsed_data.get('extracted_email', '')
-                if not email and cv.candidat and cv.candidat.email:
-                    email = cv.candidat.email
-                if not email:
-                    email = f"candidat_{cv.id}@example.com"
-                
-                # Nettoyage de l'email
-                email = email.strip().lower()
-                
-                # Utiliser l'ID du CV comme identifiant unique si pas de candidat
-                candidat_id = cv.candidat.id if cv.candidat else f"cv_{cv.id}"
+                name, email, candidat_id = candidate_identity(cv)
                 
                 logger.info(f"CV {cv.id} analysé - Score: {score:.2f}")
 
@@ -797,9 +927,13 @@ def rank_cvs_recruteur(request):
             except Exception as e:
                 logger.error(f"Erreur lors de l'analyse du CV {cv.id}: {str(e)}", exc_info=True)
                 continue
+            finally:
+                # Après l'enregistrement de l'analyse (ou l'échec du CV)
+                progress.step(str(cv.id))
 
         if not rankings:
             logger.warning("Aucun CV n'a pu être analysé avec succès")
+            progress.fail('Aucun CV valide pour analyse')
             return Response({
                 'error': 'Aucun CV valide pour analyse',
                 'details': 'Les CVs ne contiennent pas de texte analysable'
@@ -813,27 +947,7 @@ def rank_cvs_recruteur(request):
         valid_rankings.sort(key=lambda x: x['score'], reverse=True)
         
         # Grouper par email et ne garder que le meilleur score par candidat
-        best_scores = {}
-        for ranking in valid_rankings:
-            email = ranking.get('candidat_email', '').lower()
-            if not email:
-                continue
-                
-            # Si le candidat n'est pas encore dans le dictionnaire ou si on a un meilleur score
-            if email not in best_scores or ranking['score'] > best_scores[email]['score']:
-                # Ajouter la liste des fichiers pour ce candidat
-                if email in best_scores:
-                    # Si on a déjà un CV pour ce candidat, on ajoute le fichier à la liste
-                    if 'files' not in ranking:
-                        ranking['files'] = []
-                    if 'files' in best_scores[email]:
-                        ranking['files'].extend(best_scores[email]['files'])
-                    ranking['files'].append(best_scores[email]['cv_filename'])
-                best_scores[email] = ranking
-        
-        # Convertir le dictionnaire en liste triée par score décroissant
-        unique_rankings = list(best_scores.values())
-        unique_rankings.sort(key=lambda x: x['score'], reverse=True)
+        unique_rankings = best_score_per_candidate(valid_rankings)
         
         # Combiner avec les erreurs
         rankings = unique_rankings + error_rankings
@@ -852,9 +966,12 @@ def rank_cvs_recruteur(request):
         logger.info(f"Analyse terminée - {len(unique_rankings)} candidats uniques sur {len(valid_rankings)} CVs analysés" + 
                    (f" (dont {len(error_rankings)} en erreur)" if error_rankings else ""))
         
+        progress.complete(total_candidates=len(unique_rankings), errors=len(error_rankings))
+        
         # Préparation de la réponse finale
         response_data = {
             **response_meta,
+            'job_id': progress.job_id,
             'rankings': rankings
         }
         
@@ -874,6 +991,8 @@ def rank_cvs_recruteur(request):
         
     except Exception as e:
         logger.error(f"Erreur inattendue dans rank_cvs_recruteur: {str(e)}", exc_info=True)
+        if progress is not None:
+            progress.fail(str(e))
         return Response({
             'error': 'Une erreur est survenue lors du traitement de la requête',
             'details': str(e)
@@ -922,35 +1041,19 @@ def get_analysis_history(request):
     """
     if request.user.role == 'recruteur':
         # Pour les recruteurs, on montre la dernière analyse effectuée pour chaque CV
-        analyses = AnalysisResult.objects.filter(
+        analyses = latest_analysis_per_cv(AnalysisResult.objects.filter(
             analyzed_by=request.user
-        ).select_related('cv', 'cv__candidat').order_by('cv_id', '-created_at').distinct('cv_id')
+        )).select_related('cv', 'cv__candidat')
     else:
         # Pour les candidats, on montre la dernière analyse pour chacun de leurs CVs
-        analyses = AnalysisResult.objects.filter(
+        analyses = latest_analysis_per_cv(AnalysisResult.objects.filter(
             cv__candidat=request.user
-        ).select_related('cv', 'cv__candidat').order_by('cv_id', '-created_at').distinct('cv_id')
+        )).select_related('cv', 'cv__candidat')
     
     # Sérializer les résultats avec les champs nécessaires pour le frontend
     results = []
     for analysis in analyses:
-        results.append({
-            'id': analysis.id,
-            'cv_id': analysis.cv.id if analysis.cv else None,
-            'cv_file_name': analysis.cv.file_name if analysis.cv else 'CV inconnu',
-            'match_score': analysis.compatibility_score,
-            'created_at': analysis.created_at,
-            'summary': analysis.summary or 'Aucun résumé disponible',
-            'matched_skills': analysis.matched_keywords or [],
-            'missing_skills': analysis.missing_keywords or [],
-            'job_offer_text': analysis.job_offer_text or 'Aucune offre spécifiée',
-            'user_id': analysis.cv.candidat.id if analysis.cv and analysis.cv.candidat else None,
-            'user_name': analysis.cv.candidat.get_full_name() if analysis.cv and analysis.cv.candidat else 'Utilisateur inconnu',
-            'analyzed_by': {
-                'id': analysis.analyzed_by.id if analysis.analyzed_by else None,
-                'name': analysis.analyzed_by.get_full_name() if analysis.analyzed_by else 'Système'
-            } if analysis.analyzed_by else None
-        })
+        results.append(history_entry(analysis))
     
     # Trier les résultats par date de création décroissante
     results.sort(key=lambda x: x['created_at'], reverse=True)
@@ -983,19 +1086,7 @@ def get_user_analysis_history(request, user_id):
         # Sérialiser les résultats
         results = []
         for analysis in analyses:
-            results.append({
-                'id': analysis.id,
-                'cv_id': analysis.cv.id if analysis.cv else None,
-                'cv_file_name': analysis.cv.file_name if analysis.cv else 'CV inconnu',
-                'match_score': analysis.compatibility_score,
-                'created_at': analysis.created_at,
-                'summary': analysis.summary or 'Aucun résumé disponible',
-                'matched_skills': analysis.matched_keywords or [],
-                'missing_skills': analysis.missing_keywords or [],
-                'job_offer_text': analysis.job_offer_text or 'Aucune offre spécifiée',
-                'user_id': target_user.id,
-                'user_name': target_user.get_full_name() or target_user.email,
-            })
+            results.append(user_history_entry(analysis, target_user))
         
         return Response(results)
         
@@ -7,7 +7,9 @@ bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
+# Avec le service d'inférence (NLP_INFERENCE_SOCKET), les workers web ne chargent pas
+# les modèles : leur nombre se règle indépendamment de NLP_INFERENCE_WORKERS
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
 worker_class = "sync"
 worker_connections = 1000
 timeout = 120
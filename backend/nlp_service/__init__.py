@@ -1,4 +1,12 @@
 # nlp_service/__init__.py
-from .analyzer import MLCVAnalyzer
+# Export paresseux : importer un sous-module (cache, benchmarks...) ne charge pas l'analyseur
 
-__all__ = ['MLCVAnalyzer']
\ No newline at end of file
+
+def __getattr__(name):
+    if name == 'MLCVAnalyzer':
+        from .analyzer import MLCVAnalyzer
+        return MLCVAnalyzer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['MLCVAnalyzer']
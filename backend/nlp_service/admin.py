@@ -1,3 +1,47 @@
 from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'endpoint', 'duration_ms', 'status_code',
+                    'trigger', 'kind', 'user', 'download_link')
+    list_filter = ('trigger', 'kind', 'endpoint', 'method')
+    search_fields = ('path', 'endpoint', 'user__username')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    readonly_fields = [field.name for field in RequestProfile._meta.fields] + ['download_link']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:profile_id>/download/', self.admin_site.admin_view(self.download),
+                 name='nlp_service_requestprofile_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='Fichier')
+    def download_link(self, obj):
+        if not obj.file:
+            return '-'
+        url = reverse('admin:nlp_service_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.file_name)
+
+    def download(self, request, profile_id):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        try:
+            handle = profile.file.open('rb')
+        except FileNotFoundError:
+            raise Http404("Fichier de profil introuvable")
+        return FileResponse(handle, as_attachment=True, filename=profile.file_name)
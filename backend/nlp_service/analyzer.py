@@ -1,75 +1,197 @@
 # nlp_service/analyzer.py 
-import spacy
-from PyPDF2 import PdfReader
-from sentence_transformers import SentenceTransformer, util
-import numpy as np
+# Les dépendances lourdes (spaCy, PyPDF2, modèle ML) sont importées à la première
+# utilisation : importer ce module ne coûte presque rien au démarrage des workers.
+import contextlib
+import contextvars
+import csv
 import re
+from collections import namedtuple
 from typing import Dict, List, Tuple
 import logging
-import torch
 import math
-import pandas as pd
 import os
-import joblib
+import hashlib
+import threading
+import time
+
+from .batching import MicroBatcher
+from .cache import cached, get_cache
+from .ner import cap_text, doc_entities, load_ner_pipeline, pipe_entities, spacy_settings
+from .normalization import display_text, match_text, squash_spaces
+from .inference_server import RemoteAnalyzer, remote_address
+from .readiness import FAILED, READY, SKIPPED, record_component, startup_component
+from .registry import ModelRegistry, local_version, start_reloader
+from .stages import timed_stage
 
 # Configuration du logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Modèle ML servi et sa version, remplacés ensemble par une seule affectation
+ServedModel = namedtuple('ServedModel', ['matcher', 'version'])
+
+# (analyseur, ServedModel) figé pour l'appel en cours, voir MLCVAnalyzer.model_snapshot
+_pinned_model = contextvars.ContextVar('nlp_pinned_model', default=None)
+
 class MLCVAnalyzer:
     def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2'):
         try:
             logger.info("Initialisation de l'analyseur de CV...")
             
-            # Charger le modèle ML pré-entraîné
-            self.ml_matcher = self._load_ml_model()
+            # Charger le modèle ML pré-entraîné (version active du registre si présente)
+            self._served = self._load_ml_model()
+            
+            # Rechargement à chaud quand une nouvelle version est promue ; pas avec un
+            # modèle imposé par NLP_MODEL_PATH, que le registre ne doit pas remplacer
+            if os.environ.get('NLP_MODEL_PATH'):
+                logger.info("Modèle imposé par NLP_MODEL_PATH : pas de rechargement depuis le registre")
+                self._model_reloader = None
+            else:
+                self._model_reloader = start_reloader(self._swap_ml_model, current_version=self.model_version)
+            
+            # Regroupement des scores ML concurrents (NLP_BATCHING), None si désactivé
+            self._score_batcher = MicroBatcher.from_settings(self._ml_match_scores, name='match_score')
             
-            # Charger spaCy pour le français
+            # Charger spaCy pour le français (composants NER uniquement)
+            start = time.perf_counter()
+            self.ner_config = None
             try:
-                self.nlp = spacy.load("fr_core_news_sm")
+                self.nlp = load_ner_pipeline()
+                # Dans les clés de cache des résultats qui dépendent de la NER
+                ner_settings = spacy_settings()
+                self.ner_config = (ner_settings['MODEL'], ner_settings['MAX_CHARS'])
+                record_component('spacy', READY, time.perf_counter() - start)
                 logger.info("✅ Modèle spaCy français chargé")
-            except OSError:
+            except (ImportError, OSError) as e:
                 logger.warning("spaCy non disponible, utilisation de méthodes simples")
+                record_component('spacy', SKIPPED, time.perf_counter() - start, str(e))
                 self.nlp = None
             
             # Charger les compétences depuis le dataset
-            self._skills_set = self._load_skills_from_dataset()
+            with startup_component('lexicon'):
+                self._skills_set = self._load_skills_from_dataset()
             logger.info(f"✅ {len(self._skills_set)} compétences chargées depuis le dataset")
                 
         except Exception as e:
             logger.error(f"❌ Erreur critique lors de l'initialisation: {e}")
             raise
 
-    def _load_ml_model(self):
+    @property
+    def ml_matcher(self):
+        return self.model_snapshot_value().matcher
+
+    @property
+    def model_version(self):
+        return self.model_snapshot_value().version
+
+    def model_snapshot_value(self) -> ServedModel:
+        """Modèle figé par model_snapshot dans l'appel en cours, sinon le modèle servi"""
+        pinned = _pinned_model.get()
+        if pinned is not None and pinned[0] is self:
+            return pinned[1]
+        return self._served
+
+    @contextlib.contextmanager
+    def model_snapshot(self):
+        """
+        Fige le modèle servi pour la durée du bloc (appels imbriqués compris) :
+        un rechargement concurrent n'est pas vu à moitié, la version de la clé
+        de cache est celle du modèle qui calcule.
+        """
+        pinned = _pinned_model.get()
+        if pinned is not None and pinned[0] is self:
+            yield pinned[1]
+            return
+        served = self._served
+        token = _pinned_model.set((self, served))
+        try:
+            yield served
+        finally:
+            _pinned_model.reset(token)
+
+    def _load_ml_model(self) -> ServedModel:
         """Charge le modèle ML pré-entraîné depuis train_model.py"""
         try:
-            # Chercher le modèle dans différents chemins
-            model_paths = [
-                'models/cv_job_matcher.pkl',
-                os.path.join(os.path.dirname(__file__), 'models/cv_job_matcher.pkl'),
-                os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models/cv_job_matcher.pkl'),
-            ]
-            
-            model_path = None
-            for path in model_paths:
-                if os.path.exists(path):
-                    model_path = path
-                    break
+            model_path, version = self._find_model_path()
             
             if model_path:
-                # Importer dynamiquement la classe CVJobMatcher
-                # Import from the same package
-                from .train_model import CVJobMatcher
-                ml_model = CVJobMatcher.load_model(model_path)
-                logger.info("✅ Modèle ML chargé avec succès")
-                return ml_model
+                start = time.perf_counter()
+                ml_model = self._load_matcher(model_path)
+                load_time = time.perf_counter() - start
+                
+                record_component('ml_model', READY, load_time)
+                
+                # Inférence factice pour que la première vraie requête ne paie pas le démarrage à froid
+                warmup_time = ml_model.warm_up()
+                record_component('ml_warm_up', READY, warmup_time)
+                logger.info(
+                    f"✅ Modèle ML chargé avec succès ({model_path}) "
+                    f"en {load_time*1000:.0f} ms, warm-up {warmup_time*1000:.0f} ms"
+                )
+                return ServedModel(ml_model, version)
             else:
                 logger.warning("❌ Modèle ML non trouvé, utilisation de l'analyse basique")
-                return None
+                record_component('ml_model', SKIPPED, error='modèle non trouvé')
+                return ServedModel(None, None)
                 
         except Exception as e:
             logger.error(f"❌ Erreur lors du chargement du modèle ML: {e}")
-            return None
+            record_component('ml_model', FAILED, error=str(e))
+            return ServedModel(None, None)
+
+    @staticmethod
+    def _load_matcher(path):
+        """Export NumPy (.npz, sans scikit-learn) ou modèle CVJobMatcher (artefact / pickle)"""
+        if path.endswith('.npz'):
+            from .numpy_inference import NumpyMatcher
+            return NumpyMatcher.load(path)
+        
+        # Importer dynamiquement la classe CVJobMatcher
+        from .train_model import CVJobMatcher
+        return CVJobMatcher.load_model(path)
+
+    def _swap_ml_model(self, version, path):
+        """Charge et préchauffe une nouvelle version (thread d'arrière-plan) puis la met en service"""
+        start = time.perf_counter()
+        ml_model = self._load_matcher(path)
+        ml_model.warm_up()
+        
+        # Une seule affectation (atomique) : les appels en cours gardent leur snapshot de l'ancien modèle
+        self._served = ServedModel(ml_model, version)
+        logger.info(f"🔄 Modèle ML rechargé : version {version} en {(time.perf_counter() - start)*1000:.0f} ms")
+
+    def _find_model_path(self):
+        """
+        Cherche le modèle : variable NLP_MODEL_PATH, puis version active du registre,
+        puis artefacts (dossier avec manifest.json, chargé en mmap), export NumPy (.npz),
+        puis pickles historiques.
+
+        Returns:
+            (chemin ou None, version) : version du registre, ou empreinte du
+            fichier (local_version) pour un modèle chargé hors registre
+        """
+        registry = ModelRegistry.from_settings()
+        if not os.environ.get('NLP_MODEL_PATH') and registry.active_path():
+            return registry.active_path(), registry.active_version()
+        
+        base_dirs = [
+            '',
+            os.path.dirname(__file__),
+            os.path.dirname(os.path.dirname(__file__)),
+        ]
+        model_paths = [os.environ.get('NLP_MODEL_PATH', '')]
+        model_paths += [os.path.join(d, 'models/cv_job_matcher') for d in base_dirs]
+        model_paths += [os.path.join(d, 'models/cv_job_matcher.npz') for d in base_dirs]
+        model_paths += [os.path.join(d, 'models/cv_job_matcher.pkl') for d in base_dirs]
+        
+        for path in model_paths:
+            if not path:
+                continue
+            if os.path.isdir(path) and os.path.exists(os.path.join(path, 'manifest.json')):
+                return path, local_version(path)
+            if os.path.isfile(path):
+                return path, local_version(path)
+        return None, None
 
     def _load_skills_from_dataset(self) -> set:
         """Charge les compétences depuis le dataset UpdatedResumeDataSet.csv"""
@@ -93,12 +215,13 @@ class MLCVAnalyzer:
                 logger.warning("Dataset non trouvé")
                 return set()
             
-            # Lire le dataset
-            df = pd.read_csv(dataset_path, encoding='latin-1')
-            logger.info(f"Dataset chargé: {len(df)} entrées")
+            # Lire le dataset (module csv : pandas n'est pas nécessaire ici)
+            with open(dataset_path, encoding='latin-1', newline='') as f:
+                rows = list(csv.DictReader(f))
+            logger.info(f"Dataset chargé: {len(rows)} entrées")
             
             # Extraire les compétences de chaque CV
-            for idx, row in df.iterrows():
+            for row in rows:
                 resume_text = str(row['Resume']).lower()
                 skills_from_cv = self._extract_skills_from_resume_text(resume_text)
                 skills_set.update(skills_from_cv)
@@ -119,7 +242,7 @@ class MLCVAnalyzer:
         if not text:
             return skills
         
-        text = re.sub(r'\s+', ' ', text).strip().lower()
+        text = squash_spaces(text).lower()
         
         # Patterns pour sections de compétences
         skill_patterns = [
@@ -210,11 +333,42 @@ class MLCVAnalyzer:
                 
         return True
 
+    @timed_stage('pdf')
     def extract_text_from_pdf(self, pdf_file) -> str:
+        """Extrait le texte d'un PDF, mis en cache selon l'empreinte du contenu du fichier"""
+        cache = get_cache()
+        pdf_bytes = self._read_pdf_bytes(pdf_file) if cache is not None else None
+        if not pdf_bytes:
+            return self._extract_text_from_pdf(pdf_file)
+
+        return cache.get_or_compute(
+            'cv_text',
+            (hashlib.sha1(pdf_bytes).hexdigest(),),
+            lambda: self._extract_text_from_pdf(pdf_file)
+        )
+
+    def _read_pdf_bytes(self, pdf_file):
+        """Lit le contenu brut du PDF (fichier uploadé ou chemin) sans consommer le flux"""
+        try:
+            if hasattr(pdf_file, 'read'):
+                pdf_file.seek(0)
+                data = pdf_file.read()
+                pdf_file.seek(0)
+                return data
+            if isinstance(pdf_file, str) and os.path.exists(pdf_file):
+                with open(pdf_file, 'rb') as f:
+                    return f.read()
+        except Exception as e:
+            logger.warning(f"Lecture du PDF pour le cache impossible: {e}")
+        return None
+
+    def _extract_text_from_pdf(self, pdf_file) -> str:
         """Extrait le texte d'un PDF avec gestion améliorée des erreurs et formats"""
         text = ""
         
         try:
+            from PyPDF2 import PdfReader
+            
             # Gestion du fichier (fichier uploadé ou chemin)
             file_obj = None
             if hasattr(pdf_file, 'read'):
@@ -296,31 +450,12 @@ class MLCVAnalyzer:
             return ""
     
     def _clean_extracted_text(self, text: str) -> str:
-        """Nettoie le texte extrait du PDF"""
-        if not text:
-            return ""
-        
-        # Remplacer les sauts de ligne multiples par un seul espace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Supprimer les caractères non imprimables
-        text = ''.join(char for char in text if char.isprintable() or char.isspace())
-        
-        # Supprimer les espaces multiples
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        """Nettoie le texte extrait du PDF (vue d'affichage de normalization)"""
+        return display_text(text)
 
     def _clean_text(self, text: str) -> str:
-        """Nettoie le texte pour l'analyse"""
-        if not text:
-            return ""
-        
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z0-9àâäéèêëîïôöùûüÿçÀÂÄÉÈÊËÎÏÔÖÙÛÜŸÇ\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        """Nettoie le texte pour l'analyse (vue de recherche de normalization)"""
+        return match_text(text)
 
     def extract_skills(self, text: str) -> Dict[str, float]:
         """Extrait les compétences techniques"""
@@ -347,6 +482,8 @@ class MLCVAnalyzer:
         
         return skills_found
 
+    @timed_stage('experience')
+    @cached('experience')
     def extract_experience_years(self, text: str) -> int:
         """
         Extrait les années d'expérience à partir du texte du CV avec une détection avancée.
@@ -492,6 +629,8 @@ class MLCVAnalyzer:
         
         return 0  # Aucune expérience détectée
 
+    @timed_stage('compatibility')
+    @cached('compatibility', model_dependent=True, ner_dependent=True)
     def calculate_compatibility(self, cv_text: str, job_description: str, pdf_file=None) -> Tuple[float, List[str], List[str]]:
         """Calcule la compatibilité entre CV et offre"""
         logger.info("🎯 Début du calcul de compatibilité")
@@ -533,7 +672,7 @@ class MLCVAnalyzer:
             ml_score = 0
             if self.ml_matcher:
                 try:
-                    ml_score = self.ml_matcher.calculate_match_score(cv_clean, job_clean)
+                    ml_score = self._ml_match_score(cv_clean, job_clean)
                     logger.info(f"🤖 Score ML: {ml_score}%")
                     
                     # Si le score ML est très bas, vérifier si c'est dû à une mauvaise extraction
@@ -597,6 +736,34 @@ class MLCVAnalyzer:
             job_skills = self.extract_skills(job_description) if job_description else {}
             return 10.0, [], list(job_skills.keys())
 
+    @timed_stage('ml_match_score')
+    def _ml_match_score(self, cv_clean: str, job_clean: str) -> float:
+        """Score du modèle ML, via le micro-batcher si activé"""
+        # Le thread du batcher ne voit pas le snapshot de l'appel : le modèle voyage avec la paire
+        ml_matcher = self.ml_matcher
+        if self._score_batcher is not None:
+            return self._score_batcher((ml_matcher, cv_clean, job_clean))
+        return ml_matcher.calculate_match_score(cv_clean, job_clean)
+
+    def _ml_match_scores(self, items: List[Tuple[object, str, str]]) -> List[float]:
+        """
+        Lot du micro-batcher : une vectorisation par modèle pour toutes ses paires (cv, offre).
+        Un lot ne mélange deux modèles que pendant un rechargement.
+        """
+        groups = {}
+        for index, (ml_matcher, cv_clean, job_clean) in enumerate(items):
+            group = groups.setdefault(id(ml_matcher), (ml_matcher, [], []))
+            group[1].append(index)
+            group[2].append((cv_clean, job_clean))
+
+        scores = [None] * len(items)
+        for ml_matcher, indexes, pairs in groups.values():
+            for index, score in zip(indexes, ml_matcher.calculate_match_scores(pairs)):
+                scores[index] = score
+        return scores
+
+    @timed_stage('analysis')
+    @cached('analysis', model_dependent=True, ner_dependent=True)
     def analyze(self, cv_text: str, job_description: str, pdf_file=None) -> Dict:
         """
         Analyse complète d'un CV par rapport à une offre
@@ -621,9 +788,9 @@ class MLCVAnalyzer:
                 
                 # Si pas de compétences trouvées, essayer avec le texte brut
                 if not cv_skills and cv_text:
-                    cv_skills = self.extract_skills(cv_text.lower())
+                    cv_skills = self.extract_skills(cv_text)
                 if not job_skills and job_description:
-                    job_skills = self.extract_skills(job_description.lower())
+                    job_skills = self.extract_skills(job_description)
                     
             except Exception as e:
                 logger.error(f"Erreur extraction compétences: {e}")
@@ -755,6 +922,32 @@ class MLCVAnalyzer:
             
         return False
 
+    @cached('entities', ner_dependent=True)
+    def extract_entities(self, text: str) -> List[Tuple[str, str]]:
+        """Entités nommées utiles (ORG, PRODUCT...) d'un texte nettoyé, mises en cache par texte"""
+        if not self.nlp or not text:
+            return []
+        return doc_entities(self.nlp(cap_text(text)))
+
+    def extract_entities_batch(self, texts: List[str], batch_size: int = None,
+                               n_process: int = None) -> List[List[Tuple[str, str]]]:
+        """Version par lots d'extract_entities (nlp.pipe), même cache par texte"""
+        if not self.nlp:
+            return [[] for _ in texts]
+
+        def compute(batch):
+            return pipe_entities(self.nlp, batch, batch_size=batch_size, n_process=n_process)
+
+        cache = get_cache()
+        if cache is None:
+            return compute(list(texts))
+        # Mêmes clés que @cached('entities', ner_dependent=True)
+        return cache.get_or_compute_many(
+            'entities', [(self.ner_config, text) for text in texts], lambda parts: compute([p[-1] for p in parts])
+        )
+
+    @timed_stage('skills')
+    @cached('skills', ner_dependent=True)
     def extract_skills(self, text: str) -> Dict[str, float]:
         """
         Extrait et pèse les compétences techniques d'un texte de CV
@@ -771,6 +964,48 @@ class MLCVAnalyzer:
 
         # Nettoyer le texte
         text_clean = self._clean_text(text)
+
+        entities = []
+        if self.nlp:
+            try:
+                entities = self.extract_entities(text_clean)
+            except Exception as e:
+                logger.warning(f"Erreur lors de l'extraction des entités avec spaCy: {e}")
+        return self._score_skills(text_clean, entities)
+
+    @timed_stage('skills_batch')
+    def extract_skills_batch(self, texts: List[str], batch_size: int = None,
+                             n_process: int = None) -> List[Dict[str, float]]:
+        """
+        Version par lots d'extract_skills pour l'upload multiple et la réanalyse :
+        la NER de tout le lot passe par nlp.pipe au lieu d'un appel spaCy par CV.
+        """
+        def compute(parts):
+            batch = [text for (_, text) in parts]
+            valid = [i for i, text in enumerate(batch) if text and isinstance(text, str)]
+            cleaned = [self._clean_text(batch[i]) for i in valid]
+
+            entities = [[] for _ in cleaned]
+            if self.nlp:
+                try:
+                    entities = self.extract_entities_batch(cleaned, batch_size, n_process)
+                except Exception as e:
+                    logger.warning(f"Erreur lors de l'extraction des entités avec spaCy: {e}")
+
+            results = [{} for _ in batch]
+            for i, text_clean, ents in zip(valid, cleaned, entities):
+                results[i] = self._score_skills(text_clean, ents)
+            return results
+
+        # Mêmes clés que @cached('skills', ner_dependent=True)
+        parts = [(self.ner_config, text) for text in texts]
+        cache = get_cache()
+        if cache is None or not all(isinstance(text, str) for text in texts):
+            return compute(parts)
+        return cache.get_or_compute_many('skills', parts, compute)
+
+    def _score_skills(self, text_clean: str, entities: List[Tuple[str, str]]) -> Dict[str, float]:
+        """Score des compétences d'un texte nettoyé à partir du dataset, des mots-clés et des entités spaCy"""
         text_lower = text_clean.lower()
         
         # Liste noire de mots non pertinents
@@ -821,19 +1056,14 @@ class MLCVAnalyzer:
                 score = 0.8 if ' ' in keyword else 0.7
                 skills_found[keyword] = max(skills_found.get(keyword, 0), score)
         
-        # 4. Utiliser spaCy pour l'extraction des entités nommées si disponible
-        if hasattr(self, 'nlp') and self.nlp:
-            try:
-                doc = self.nlp(text_clean)
-                for ent in doc.ents:
-                    if ent.label_ in ['ORG', 'PRODUCT', 'TECH'] and 3 < len(ent.text) < 30:
-                        skill = ent.text.strip().lower()
-                        if (not self._is_irrelevant_skill(skill) and 
-                            not any(term in skill for term in blacklist) and
-                            len(skill) > 3):
-                            skills_found[skill] = max(skills_found.get(skill, 0), 0.6)
-            except Exception as e:
-                logger.warning(f"Erreur lors de l'extraction des entités avec spaCy: {e}")
+        # 4. Entités nommées spaCy (calculées par l'appelant, unitairement ou par lots)
+        for ent_text, _ in entities:
+            if 3 < len(ent_text) < 30:
+                skill = ent_text.strip().lower()
+                if (not self._is_irrelevant_skill(skill) and 
+                    not any(term in skill for term in blacklist) and
+                    len(skill) > 3):
+                    skills_found[skill] = max(skills_found.get(skill, 0), 0.6)
         
         # 5. Filtrer et trier les compétences
         filtered_skills = {
@@ -850,6 +1080,7 @@ class MLCVAnalyzer:
             key=lambda x: (-x[1], x[0])
         )[:20])
 
+    @timed_stage('category')
     def predict_job_category(self, text: str) -> tuple[str, float]:
         """
         Prédit la catégorie d'emploi à partir du texte du CV avec une détection avancée.
@@ -1004,6 +1235,8 @@ class MLCVAnalyzer:
         # Retourner la catégorie avec la confiance
         return best_category, confidence
 
+    @timed_stage('summary')
+    @cached('summary', ner_dependent=True)
     def summarize_cv(self, cv_text: str) -> str:
         """Génère un résumé concis du CV avec des compétences pertinentes"""
         if not cv_text or not isinstance(cv_text, str):
@@ -1249,4 +1482,60 @@ class MLCVAnalyzer:
         # Trier par score décroissant
         results.sort(key=lambda x: x['match_score'], reverse=True)
         
-        return results
\ No newline at end of file
+        return results
+
+# ============================================
+# INSTANCE PARTAGÉE (CONSTRUCTION PARESSEUSE)
+# ============================================
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer() -> MLCVAnalyzer:
+    """
+    Retourne l'analyseur du processus, construit à la première demande
+    (première requête ou warm_up_analyzer au démarrage).
+
+    Si un service d'inférence est configuré (NLP_INFERENCE['ADDRESS']), retourne
+    un client RemoteAnalyzer : aucun modèle n'est chargé dans ce processus.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                if remote_address():
+                    _analyzer = RemoteAnalyzer.from_settings()
+                else:
+                    _analyzer = MLCVAnalyzer()
+    return _analyzer
+
+
+def analyzer_is_ready() -> bool:
+    return _analyzer is not None
+
+
+def warm_up_analyzer() -> float:
+    """Construit l'analyseur et exécute une analyse factice ; retourne la durée en secondes"""
+    start = time.perf_counter()
+    with startup_component('warm_up'):
+        analyzer = get_analyzer()
+        try:
+            with startup_component('cache'):
+                cache = get_cache()
+                if cache is not None:
+                    cache.ping()
+        except Exception as e:
+            # Bloquant seulement si 'cache' est dans NLP_READINESS_REQUIRED
+            logger.warning(f"Cache de l'analyseur indisponible: {e}")
+
+        # Texte propre au processus : le résultat n'est jamais déjà en cache (calculé par
+        # un autre pod), l'extraction et le modèle tournent vraiment dans ce processus
+        nonce = f"{os.getpid()}-{os.urandom(4).hex()}"
+        analyzer.calculate_compatibility(
+            f"Développeur Python avec 3 ans d'expérience Django et SQL (préchauffage {nonce})",
+            f"Nous recherchons un développeur Python Django (préchauffage {nonce})",
+        )
+    elapsed = time.perf_counter() - start
+    logger.info(f"🔥 Analyseur préchauffé en {elapsed*1000:.0f} ms")
+    return elapsed
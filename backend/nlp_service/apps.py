@@ -1,6 +1,41 @@
+import logging
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
 
 
 class NlpServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nlp_service'
+
+    def ready(self):
+        from .stages import install_sql_wrapper, stage_metrics_enabled
+        if stage_metrics_enabled():
+            connection_created.connect(install_sql_wrapper, dispatch_uid='nlp_stage_sql_wrapper')
+
+        # Hook de préchauffage explicite : sans lui, l'analyseur est construit à la première
+        # requête ou à la première sonde de readiness (/health/ready/)
+        if not getattr(settings, 'NLP_WARMUP_ON_STARTUP', False) or not self._is_server_process():
+            return
+
+        from .readiness import start_warm_up
+
+        # En arrière-plan : le worker accepte déjà les requêtes (health/liveness) pendant le chargement
+        start_warm_up()
+
+    @staticmethod
+    def _is_server_process():
+        """Pas de préchauffage pour les commandes de gestion (migrate, check, shell...)"""
+        if os.environ.get('NLP_WARMUP_FORCE') == 'True':
+            return True
+        command = sys.argv[1] if len(sys.argv) > 1 else ''
+        program = os.path.basename(sys.argv[0]) if sys.argv else ''
+        if command == 'runserver':
+            # Avec l'autoreload, seul le processus enfant sert les requêtes
+            return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+        return program not in ('manage.py', 'django-admin')
@@ -0,0 +1,147 @@
+# nlp_service/batching.py
+"""
+Micro-batching des appels concurrents au modèle ML.
+
+Quand plusieurs threads (exécuteur des vues async, connexions du service
+d'inférence) analysent en même temps, chacun faisait sa propre vectorisation
+TF-IDF et son propre produit scalaire. Le MicroBatcher regroupe les appels
+arrivés pendant au plus MAX_WAIT_MS millisecondes (ou jusqu'à MAX_BATCH_SIZE
+éléments) et les exécute en une seule opération vectorisée.
+
+Le premier appel d'un lot attend au plus MAX_WAIT_MS : c'est la latence ajoutée,
+mesurée par recrutai_nlp_batch_wait_seconds. Sans concurrence (workers Gunicorn
+sync, un thread), le regroupement n'apporte rien : désactivé par défaut.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .metrics import BATCH_SIZE, BATCH_WAIT
+
+logger = logging.getLogger(__name__)
+
+BATCHING_DEFAULTS = {
+    'ENABLED': False,
+    'MAX_BATCH_SIZE': 32,
+    'MAX_WAIT_MS': 5.0,
+}
+
+
+def batching_settings():
+    """settings.NLP_BATCHING complété par les valeurs par défaut (variables d'environnement hors Django)"""
+    config = {}
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_BATCHING', {})
+    except ImportError:
+        pass
+
+    enabled = config.get('ENABLED')
+    if enabled is None:
+        enabled = os.environ.get('NLP_BATCHING_ENABLED', str(BATCHING_DEFAULTS['ENABLED'])) == 'True'
+    return {
+        'ENABLED': enabled,
+        'MAX_BATCH_SIZE': int(config.get('MAX_BATCH_SIZE') or os.environ.get(
+            'NLP_BATCHING_MAX_BATCH_SIZE', BATCHING_DEFAULTS['MAX_BATCH_SIZE'])),
+        'MAX_WAIT_MS': float(config.get('MAX_WAIT_MS') or os.environ.get(
+            'NLP_BATCHING_MAX_WAIT_MS', BATCHING_DEFAULTS['MAX_WAIT_MS'])),
+    }
+
+
+class MicroBatcher:
+    """
+    Regroupe les appels concurrents de batch_func.
+
+    batch_func reçoit une liste d'éléments et retourne la liste des résultats
+    dans le même ordre (un résultat par élément, sinon tout le lot échoue).
+    submit() retourne un Future ; l'appel direct attend le résultat. Un thread
+    démon, démarré au premier appel, forme les lots.
+    """
+
+    def __init__(self, batch_func, max_batch_size=BATCHING_DEFAULTS['MAX_BATCH_SIZE'],
+                 max_wait_ms=BATCHING_DEFAULTS['MAX_WAIT_MS'], name='batch'):
+        self.batch_func = batch_func
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, batch_func, name='batch'):
+        """MicroBatcher configuré par NLP_BATCHING, ou None si le regroupement est désactivé"""
+        config = batching_settings()
+        if not config['ENABLED']:
+            return None
+        return cls(batch_func, config['MAX_BATCH_SIZE'], config['MAX_WAIT_MS'], name)
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def submit(self, item):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f'nlp-batcher-{self.name}', daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        """Bloque jusqu'au premier élément puis complète le lot jusqu'à max_wait"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Futures annulés par l'appelant écartés ; les autres ne sont plus annulables
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, submitted in batch:
+                BATCH_WAIT.labels(self.name).observe(started - submitted)
+            BATCH_SIZE.labels(self.name).observe(len(batch))
+            self.batches += 1
+            self.items += len(batch)
+
+            try:
+                results = list(self.batch_func([item for item, _, _ in batch]))
+                if len(results) != len(batch):
+                    # zip() laisserait des appelants en attente pour toujours
+                    raise ValueError(f"{len(results)} résultats pour {len(batch)} éléments")
+            except Exception as e:
+                logger.error(f"❌ Erreur du lot {self.name} ({len(batch)} éléments): {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
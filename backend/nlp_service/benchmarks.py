@@ -0,0 +1,1084 @@
+# nlp_service/benchmarks.py
+"""
+Benchmarks de performance du service NLP.
+
+Chaque benchmark est une fonction enregistrée dans BENCHMARKS qui retourne un
+dictionnaire sérialisable en JSON. Ils sont lancés via :
+
+    python manage.py benchmark <nom> [--repeats N] [--output rapport.json]
+
+Un benchmark peut aussi déclarer un résumé lisible (register_summary) affiché
+après le JSON, et des métriques suivies (register_metrics) : --save-baseline
+les enregistre, --baseline les compare et échoue au-delà de --threshold.
+"""
+import contextlib
+import io
+import os
+import re
+import statistics
+import tempfile
+import time
+
+BENCHMARKS = {}
+SUMMARIES = {}
+METRICS = {}
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'cv_job_matcher.pkl')
+
+
+def register(name):
+    """Enregistre une fonction de benchmark sous un nom"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def register_summary(name):
+    """Enregistre la mise en forme texte du rapport d'un benchmark"""
+    def decorator(func):
+        SUMMARIES[name] = func
+        return func
+    return decorator
+
+
+def register_metrics(name):
+    """
+    Enregistre l'extraction des métriques suivies d'un benchmark ({nom: durée en ms}),
+    comparées à une baseline avec --baseline (plus petit = meilleur)
+    """
+    def decorator(func):
+        METRICS[name] = func
+        return func
+    return decorator
+
+
+def compare_to_baseline(metrics, baseline_metrics, threshold, min_delta_ms=0.05):
+    """
+    Compare chaque métrique à sa baseline. Régression si la valeur dépasse la
+    baseline de plus de `threshold` (0.2 = +20 %) et d'au moins min_delta_ms
+    (les étapes de quelques microsecondes sont dominées par le bruit).
+
+    Returns:
+        liste de dicts (metric, baseline, current, change, regression)
+    """
+    rows = []
+    for name, current in sorted(metrics.items()):
+        reference = baseline_metrics.get(name)
+        if reference is None:
+            continue
+        change = (current - reference) / reference if reference else 0.0
+        rows.append({
+            'metric': name,
+            'baseline': reference,
+            'current': current,
+            'change': round(change, 4),
+            'regression': change > threshold and current - reference > min_delta_ms,
+        })
+    return rows
+
+
+# ============================================
+# OUTILS DE MESURE
+# ============================================
+
+def measure(func, repeats=1):
+    """Exécute func `repeats` fois et retourne la liste des durées (secondes)"""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    """Statistiques (en millisecondes) d'une série de durées"""
+    if not durations:
+        return {}
+    ordered = sorted(durations)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p50_ms': round(percentile(50), 3),
+        'p95_ms': round(percentile(95), 3),
+        'p99_ms': round(percentile(99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Masque les print() des scripts d'entraînement pendant la mesure"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ============================================
+# CHARGEMENT DU MODÈLE
+# ============================================
+
+@register('model-load')
+def bench_model_load(model=None, repeats=5, **options):
+    """
+    Compare le chargement du pickle historique et de l'artefact (avec et sans mmap),
+    ainsi que la latence de la première inférence avec et sans warm-up.
+    """
+    from .train_model import CVJobMatcher, WARMUP_CV_TEXT
+
+    model = model or DEFAULT_MODEL_PATH
+    report = {'model': model, 'repeats': repeats, 'variants': {}}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if os.path.isdir(model):
+            artifact_dir = model
+            pickle_path = None
+        else:
+            pickle_path = model
+            artifact_dir = os.path.join(tmp_dir, 'artifact')
+            with quiet():
+                CVJobMatcher.load_model(pickle_path).save_artifact(artifact_dir)
+
+        variants = {
+            'artifact': lambda: CVJobMatcher.load_artifact(artifact_dir, mmap_mode=None),
+            'artifact_mmap': lambda: CVJobMatcher.load_artifact(artifact_dir, mmap_mode='r'),
+        }
+        if pickle_path:
+            variants['pickle'] = lambda: CVJobMatcher.load_model(pickle_path)
+
+        for name, load in variants.items():
+            with quiet():
+                load_times = measure(load, repeats)
+
+                cold = load()
+                first_inference = measure(lambda: cold.predict_category(WARMUP_CV_TEXT))[0]
+                steady_inference = measure(lambda: cold.predict_category(WARMUP_CV_TEXT), repeats)
+
+                warmed = load()
+                warmup_time = warmed.warm_up()
+                after_warmup = measure(lambda: warmed.predict_category(WARMUP_CV_TEXT))[0]
+
+            report['variants'][name] = {
+                'load': summarize(load_times),
+                'first_inference_ms': round(first_inference * 1000, 3),
+                'steady_inference': summarize(steady_inference),
+                'warmup_ms': round(warmup_time * 1000, 3),
+                'first_inference_after_warmup_ms': round(after_warmup * 1000, 3),
+            }
+
+        report['sizes_bytes'] = {
+            'artifact': sum(
+                os.path.getsize(os.path.join(artifact_dir, f)) for f in os.listdir(artifact_dir)
+            ),
+        }
+        if pickle_path:
+            report['sizes_bytes']['pickle'] = os.path.getsize(pickle_path)
+
+    return report
+
+
+# ============================================
+# COMPARAISON DES TYPES DE MODÈLES
+# ============================================
+
+def load_training_data(dataset=None):
+    """Charge et prépare le dataset d'entraînement (textes nettoyés, labels encodés)"""
+    import pandas as pd
+    from .train_model import CVJobMatcher, find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    df = pd.read_csv(path, encoding='latin-1')
+    preparer = CVJobMatcher(model_type='tfidf_rf')
+    X_text, y_labels = preparer.prepare_data(df)
+    return X_text, y_labels, preparer.label_encoder
+
+
+def model_memory(matcher):
+    """Taille sérialisée du modèle et mémoire allouée pour le désérialiser"""
+    import pickle
+    import tracemalloc
+
+    blob = pickle.dumps(matcher._model_data(), protocol=pickle.HIGHEST_PROTOCOL)
+    tracemalloc.start()
+    try:
+        pickle.loads(blob)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'serialized_bytes': len(blob), 'load_peak_bytes': peak}
+
+
+def available_model_types():
+    """Types entraînables ici (sbert seulement si sentence-transformers est installé)"""
+    import importlib.util
+    from .train_model import SPARSE_MODEL_TYPES
+
+    if importlib.util.find_spec('sentence_transformers') is not None:
+        return SPARSE_MODEL_TYPES + ('sbert',)
+    return SPARSE_MODEL_TYPES
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+@register('models')
+def bench_models(model_types=None, dataset=None, repeats=5, batch_size=64, **options):
+    """
+    Entraîne chaque type de modèle sur le même split et mesure ce qui compte en
+    production : temps d'entraînement, taille et temps de chargement de l'artefact,
+    latence d'un CV seul et d'un lot (percentiles), débit et mémoire.
+    """
+    from .train_model import CVJobMatcher
+
+    X_text, y_labels, label_encoder = load_training_data(dataset)
+    samples = list(X_text[:max(20, repeats)])
+    batch = list(X_text[:batch_size])
+
+    report = {'documents': len(X_text), 'batch_size': len(batch), 'models': {}}
+
+    for model_type in model_types or available_model_types():
+        matcher = CVJobMatcher(model_type=model_type)
+        matcher.label_encoder = label_encoder
+
+        start = time.perf_counter()
+        with quiet():
+            accuracy = matcher.train(X_text, y_labels)
+        fit_seconds = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            with quiet():
+                matcher.save_artifact(directory)
+                load_times = measure(lambda: CVJobMatcher.load_artifact(directory, verify=False), repeats)
+            artifact_bytes = directory_size(directory)
+
+        single = []
+        for text in samples:
+            single += measure(lambda: matcher.predict_category(text))
+
+        batch_times = measure(lambda: matcher.predict_categories(batch), repeats)
+        best_batch = min(batch_times)
+
+        report['models'][model_type] = {
+            'accuracy': round(float(accuracy), 4),
+            'fit_seconds': round(fit_seconds, 3),
+            'artifact_bytes': artifact_bytes,
+            'artifact_load': summarize(load_times),
+            'single_cv_latency': summarize(single),
+            'batch_latency': summarize(batch_times),
+            'batch_throughput_docs_per_s': round(len(batch) / best_batch, 1) if best_batch else None,
+            'memory': model_memory(matcher),
+        }
+
+    return report
+
+
+@register_summary('models')
+def summarize_models(report):
+    """Tableau comparatif des types de modèles"""
+    header = (
+        f"{'model_type':<16}{'accuracy':>9}{'fit s':>8}{'artifact':>11}{'load p50':>10}"
+        f"{'1 CV p50':>10}{'1 CV p95':>10}{'lot docs/s':>12}{'mémoire':>11}"
+    )
+    lines = [f"{report['documents']} documents, lots de {report['batch_size']}", header, '-' * len(header)]
+
+    for model_type, result in report['models'].items():
+        lines.append(
+            f"{model_type:<16}"
+            f"{result['accuracy'] * 100:>8.2f}%"
+            f"{result['fit_seconds']:>8.2f}"
+            f"{result['artifact_bytes'] / 1e6:>9.2f}MB"
+            f"{result['artifact_load']['p50_ms']:>8.1f}ms"
+            f"{result['single_cv_latency']['p50_ms']:>8.2f}ms"
+            f"{result['single_cv_latency']['p95_ms']:>8.2f}ms"
+            f"{result['batch_throughput_docs_per_s'] or 0:>12.1f}"
+            f"{result['memory']['load_peak_bytes'] / 1e6:>9.2f}MB"
+        )
+
+    if report['models']:
+        fastest = min(report['models'], key=lambda t: report['models'][t]['single_cv_latency']['p50_ms'])
+        best = max(report['models'], key=lambda t: report['models'][t]['accuracy'])
+        lines.append('')
+        lines.append(f"⚡ Plus rapide : {fastest}    🎯 Plus précis : {best}")
+    return '\n'.join(lines)
+
+
+# ============================================
+# VECTORISATION : TF-IDF vs HASHING
+# ============================================
+
+def _traced_peak(func):
+    """
+    Pic d'allocation de func (tracemalloc). Ne pas chronométrer cet appel :
+    tracemalloc ralentit fortement les allocations.
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@register('vectorizers')
+def bench_vectorizers(dataset=None, repeats=5, batch_size=64, **options):
+    """
+    Compare TfidfVectorizer (vocabulaire en mémoire) et StreamingHashingVectorizer :
+    coût du fit, mémoire de l'état sérialisé, débit de transformation et
+    coût d'une mise à jour incrémentale.
+    """
+    import pickle
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from .train_model import StreamingHashingVectorizer
+
+    X_text, _, _ = load_training_data(dataset)
+    X_text = list(X_text)
+    batch = X_text[:batch_size]
+
+    candidates = {
+        'tfidf': lambda: TfidfVectorizer(
+            max_features=5000, ngram_range=(1, 2), min_df=2, max_df=0.8, stop_words='english'
+        ),
+        'hashing': StreamingHashingVectorizer,
+    }
+
+    report = {'documents': len(X_text), 'batch_size': len(batch), 'vectorizers': {}}
+
+    for name, factory in candidates.items():
+        # Durée sur un fit sans tracemalloc, pic mémoire sur un second fit tracé
+        vectorizer = factory()
+        start = time.perf_counter()
+        vectorizer.fit(X_text)
+        fit_seconds = time.perf_counter() - start
+        fit_peak = _traced_peak(lambda: factory().fit(X_text))
+
+        state = vectorizer.get_state() if hasattr(vectorizer, 'get_state') else vectorizer
+        transform_times = measure(lambda: vectorizer.transform(batch), repeats)
+        best = min(transform_times)
+
+        result = {
+            'fit_seconds': round(fit_seconds, 3),
+            'fit_peak_bytes': fit_peak,
+            'serialized_bytes': len(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)),
+            'transform_latency': summarize(transform_times),
+            'transform_throughput_docs_per_s': round(len(batch) / best, 1) if best else None,
+        }
+
+        if hasattr(vectorizer, 'partial_fit'):
+            result['partial_fit_latency'] = summarize(measure(lambda: vectorizer.partial_fit(batch), repeats))
+        else:
+            # Absorber de nouveaux CVs impose de refitter sur tout le corpus
+            result['refit_seconds'] = result['fit_seconds']
+
+        report['vectorizers'][name] = result
+
+    return report
+
+
+# ============================================
+# NETTOYAGE DES TEXTES
+# ============================================
+
+@register('cleaning')
+def bench_cleaning(dataset=None, repeats=3, **options):
+    """
+    Compare le nettoyage ligne par ligne (apply), vectorisé (.str) et parallèle
+    (pool de processus) sur le dataset complet, et vérifie que les sorties sont identiques.
+    """
+    import pandas as pd
+    from .normalization import clean_for_model, clean_for_model_series, clean_texts
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    texts = pd.read_csv(path, encoding='latin-1')['Resume']
+    n_jobs = os.cpu_count() or 1
+    reference = texts.apply(clean_for_model).tolist()
+
+    variants = {
+        'apply': lambda: texts.apply(clean_for_model).tolist(),
+        'vectorized': lambda: clean_for_model_series(texts).tolist(),
+        'parallel': lambda: clean_texts(texts, n_jobs=n_jobs),
+    }
+
+    report = {'documents': len(texts), 'characters': int(texts.str.len().sum()), 'n_jobs': n_jobs, 'variants': {}}
+    for name, func in variants.items():
+        durations = measure(func, repeats)
+        best = min(durations)
+        report['variants'][name] = {
+            'latency': summarize(durations),
+            'docs_per_s': round(len(texts) / best, 1) if best else None,
+            'identical_to_apply': func() == reference,
+        }
+    return report
+
+
+# ============================================
+# NORMALISATION : REGEX vs TABLES DE TRADUCTION
+# ============================================
+
+def _legacy_display(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = ''.join(char for char in text if char.isprintable() or char.isspace())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _legacy_match(text):
+    text = re.sub(r'[^a-zA-Z0-9àâäéèêëîïôöùûüÿçÀÂÄÉÈÊËÎÏÔÖÙÛÜŸÇ\s]', ' ', text.lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _legacy_ml(text):
+    text = re.sub(r'http\S+', '', text.lower())
+    text = re.sub(r'[^a-zA-Z\s]+', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@register('normalization')
+def bench_normalization(dataset=None, repeats=5, **options):
+    """
+    Compare les anciennes normalisations (plusieurs regex, filtre caractère par
+    caractère) aux tables de traduction sur des CVs longs (20 CVs du dataset
+    concaténés), et vérifie que les sorties sont identiques.
+    """
+    import pandas as pd
+    from .normalization import display_text, match_text, ml_text
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    resumes = pd.read_csv(path, encoding='latin-1')['Resume'].astype(str).tolist()
+    texts = [' '.join(resumes[i:i + 20]) for i in range(0, len(resumes), 20)]
+
+    views = {
+        'display': (_legacy_display, display_text),
+        'match': (_legacy_match, match_text),
+        'ml': (_legacy_ml, ml_text),
+    }
+
+    report = {
+        'documents': len(texts),
+        'mean_chars': round(statistics.mean(len(text) for text in texts)) if texts else 0,
+        'views': {},
+    }
+    for name, (legacy, table) in views.items():
+        legacy_durations = measure(lambda: [legacy(text) for text in texts], repeats)
+        table_durations = measure(lambda: [table(text) for text in texts], repeats)
+        report['views'][name] = {
+            'regex': summarize(legacy_durations),
+            'translate': summarize(table_durations),
+            'speedup': round(min(legacy_durations) / min(table_durations), 2) if min(table_durations) else None,
+            'identical': all(legacy(text) == table(text) for text in texts),
+        }
+    return report
+
+
+# ============================================
+# NER SPACY : PIPELINE COMPLET vs RÉDUIT
+# ============================================
+
+@register('ner')
+def bench_ner(dataset=None, repeats=3, **options):
+    """
+    Latence par CV du pipeline spaCy complet, du pipeline réduit à la NER
+    (+ troncature MAX_CHARS), et d'un appel déjà en cache. Nécessite spaCy.
+    """
+    import pandas as pd
+    from .ner import cap_text, doc_entities, load_ner_pipeline, spacy_settings
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    texts = pd.read_csv(path, encoding='latin-1')['Resume'].drop_duplicates().tolist()
+    config = spacy_settings()
+    full = load_ner_pipeline(config['MODEL'], trimmed=False)
+    trimmed = load_ner_pipeline(config['MODEL'])
+
+    cache = {}
+
+    def cached_call(text):
+        if text not in cache:
+            cache[text] = doc_entities(trimmed(cap_text(text)))
+        return cache[text]
+
+    variants = {
+        'full': lambda text: doc_entities(full(text)),
+        'trimmed': lambda text: doc_entities(trimmed(cap_text(text))),
+        'cached': cached_call,
+    }
+
+    report = {
+        'model': config['MODEL'],
+        'max_chars': config['MAX_CHARS'],
+        'documents': len(texts),
+        'pipes': {'full': full.pipe_names, 'trimmed': trimmed.pipe_names},
+        'variants': {},
+    }
+    for name, func in variants.items():
+        durations = []
+        for _ in range(repeats):
+            durations.extend(measure(lambda: [func(text) for text in texts]))
+        best = min(durations)
+        report['variants'][name] = {
+            'per_doc_ms': round(best / len(texts) * 1000, 3) if texts else None,
+            'docs_per_s': round(len(texts) / best, 1) if best else None,
+        }
+
+    # Les entités retenues pour les compétences doivent rester les mêmes (hors textes tronqués)
+    short = [text for text in texts if len(text) <= config['MAX_CHARS']]
+    report['identical_entities'] = all(
+        doc_entities(full(text)) == doc_entities(trimmed(text)) for text in short[:50]
+    )
+    return report
+
+
+@register('ner-batch')
+def bench_ner_batch(dataset=None, repeats=3, batch_size=64, **options):
+    """
+    Débit (docs/s) de la NER appel par appel comparé à nlp.pipe par lots,
+    sur un puis plusieurs processus. Nécessite spaCy.
+    """
+    import pandas as pd
+    from .ner import cap_text, doc_entities, load_ner_pipeline, pipe_entities
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    texts = pd.read_csv(path, encoding='latin-1')['Resume'].drop_duplicates().tolist()
+    nlp = load_ner_pipeline()
+    n_process = min(os.cpu_count() or 1, 4)
+
+    variants = {'per_doc': lambda: [doc_entities(nlp(cap_text(text))) for text in texts]}
+    for size in sorted({8, 32, batch_size}):
+        variants[f'pipe_b{size}'] = lambda size=size: pipe_entities(nlp, texts, batch_size=size, n_process=1)
+    if n_process > 1:
+        variants[f'pipe_b{batch_size}_p{n_process}'] = lambda: pipe_entities(
+            nlp, texts, batch_size=batch_size, n_process=n_process
+        )
+
+    reference = variants['per_doc']()
+    report = {'documents': len(texts), 'variants': {}}
+    for name, func in variants.items():
+        durations = measure(func, repeats)
+        best = min(durations)
+        report['variants'][name] = {
+            'latency': summarize(durations),
+            'docs_per_s': round(len(texts) / best, 1) if best else None,
+            'identical_to_per_doc': func() == reference,
+        }
+    return report
+
+
+# ============================================
+# EXPORT NUMPY vs SCIKIT-LEARN
+# ============================================
+
+def _import_seconds(statement):
+    """Durée d'un import dans un interpréteur neuf (le processus courant a déjà tout importé)"""
+    import subprocess
+    import sys
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+@register('numpy')
+def bench_numpy(model=None, repeats=5, **options):
+    """
+    Compare le modèle scikit-learn et son export NumPy : coût des imports,
+    chargement, mémoire allouée au chargement et latence d'inférence.
+    """
+    import tracemalloc
+    from .numpy_inference import NumpyMatcher, export_matcher
+    from .train_model import CVJobMatcher, WARMUP_CV_TEXT
+
+    source = model or DEFAULT_MODEL_PATH
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Modèle introuvable : {source}")
+
+    with quiet():
+        matcher = CVJobMatcher.load_model(source)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, 'cv_job_matcher.npz')
+        export_matcher(matcher, npz_path)
+
+        loaders = {
+            'sklearn': lambda: CVJobMatcher.load_model(source),
+            'numpy': lambda: NumpyMatcher.load(npz_path),
+        }
+        imports = {
+            'sklearn': 'import joblib, sklearn.ensemble, sklearn.linear_model, sklearn.feature_extraction.text',
+            'numpy': 'import numpy',
+        }
+
+        report = {'model': source, 'npz_bytes': os.path.getsize(npz_path), 'variants': {}}
+        for name, load in loaders.items():
+            with quiet():
+                load_times = measure(load, repeats)
+                tracemalloc.start()
+                try:
+                    loaded = load()
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+
+            single = measure(lambda: loaded.predict_category(WARMUP_CV_TEXT), max(20, repeats))
+            report['variants'][name] = {
+                'import_seconds': round(_import_seconds(imports[name]), 3),
+                'load': summarize(load_times),
+                'load_peak_bytes': peak,
+                'single_cv_latency': summarize(single),
+            }
+
+    return report
+
+
+# ============================================
+# DÉMARRAGE DES WORKERS
+# ============================================
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('spacy', 'torch', 'sentence_transformers', 'pandas', 'sklearn', 'PyPDF2')
+
+# Exécuté dans un interpréteur neuf : démarrage d'un worker (settings + URLconf),
+# avec ou sans construction immédiate de l'analyseur (comportement historique)
+BOOT_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot = time.perf_counter() - start
+analyzer = None
+if sys.argv[1] == 'eager':
+    from nlp_service.analyzer import warm_up_analyzer
+    analyzer = warm_up_analyzer()
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    peak = None
+print(json.dumps({
+    'boot_seconds': boot,
+    'analyzer_seconds': analyzer,
+    'total_seconds': time.perf_counter() - start,
+    'peak_rss_bytes': peak,
+    'heavy_modules': sorted(m for m in %r if m in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _run_python(args, env=None):
+    import subprocess
+    import sys
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable] + args,
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, result.stdout
+
+
+@register('startup')
+def bench_startup(repeats=3, **options):
+    """
+    Temps de `manage.py check`, démarrage d'un worker (settings + URLconf) et RSS,
+    en mode paresseux (actuel) et avec construction immédiate de l'analyseur.
+    """
+    import json
+
+    # Le préchauffage en arrière-plan fausserait la mesure du démarrage paresseux
+    env = {'NLP_WARMUP_ON_STARTUP': 'False'}
+
+    check_times = [_run_python(['manage.py', 'check'], env)[0] for _ in range(repeats)]
+    report = {'manage_py_check': summarize(check_times), 'boot': {}}
+
+    for mode in ('lazy', 'eager'):
+        runs = [json.loads(_run_python(['-c', BOOT_SCRIPT, mode], env)[1].strip().splitlines()[-1])
+                for _ in range(repeats)]
+        report['boot'][mode] = {
+            'boot': summarize([r['boot_seconds'] for r in runs]),
+            'total': summarize([r['total_seconds'] for r in runs]),
+            'peak_rss_bytes': max(r['peak_rss_bytes'] or 0 for r in runs) or None,
+            'heavy_modules': runs[-1]['heavy_modules'],
+        }
+
+    return report
+
+
+# ============================================
+# MICRO-BATCHING DES SCORES ML
+# ============================================
+
+@register('batching')
+def bench_batching(model=None, dataset=None, repeats=3, concurrency=16, batch_size=64,
+                   max_wait_ms=None, **options):
+    """
+    `concurrency` threads calculent chacun des scores de match (CVs du dataset,
+    même offre) : appels directs au modèle, puis via un MicroBatcher. Mesure le
+    débit, la latence par appel (dont l'attente ajoutée) et la taille des lots.
+    """
+    import threading
+
+    import pandas as pd
+    from .batching import BATCHING_DEFAULTS, MicroBatcher
+    from .train_model import CVJobMatcher, WARMUP_JOB_TEXT, find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+        matcher = CVJobMatcher.load_model(model or DEFAULT_MODEL_PATH)
+        matcher.warm_up()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    texts = pd.read_csv(path, encoding='latin-1')['Resume'].drop_duplicates().tolist()
+    calls_per_thread = max(1, repeats) * 10
+    max_wait_ms = BATCHING_DEFAULTS['MAX_WAIT_MS'] if max_wait_ms is None else max_wait_ms
+
+    pairs = [(text, WARMUP_JOB_TEXT) for text in texts[:batch_size]]
+    singles = [matcher.calculate_match_score(cv, job) for cv, job in pairs]
+    batched = matcher.calculate_match_scores(pairs)
+
+    def run(score):
+        durations = []
+        lock = threading.Lock()
+
+        def client(offset):
+            local = []
+            for i in range(calls_per_thread):
+                text = texts[(offset * calls_per_thread + i) % len(texts)]
+                start = time.perf_counter()
+                score((text, WARMUP_JOB_TEXT))
+                local.append(time.perf_counter() - start)
+            with lock:
+                durations.extend(local)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'latency': summarize(durations),
+            'calls_per_s': round(len(durations) / elapsed, 1) if elapsed else None,
+        }
+
+    report = {
+        'concurrency': concurrency,
+        'calls': concurrency * calls_per_thread,
+        'max_batch_size': batch_size,
+        'max_wait_ms': max_wait_ms,
+        'max_abs_score_diff': max(abs(a - b) for a, b in zip(singles, batched)),
+        'variants': {'direct': run(lambda pair: matcher.calculate_match_score(*pair))},
+    }
+
+    batcher = MicroBatcher(matcher.calculate_match_scores, batch_size, max_wait_ms, name='benchmark')
+    report['variants']['batched'] = run(batcher)
+    report['variants']['batched'].update(batcher.stats())
+    return report
+
+
+@register_summary('batching')
+def summarize_batching(report):
+    lines = [
+        f"{report['concurrency']} threads, {report['calls']} appels, "
+        f"lots <= {report['max_batch_size']}, attente <= {report['max_wait_ms']} ms"
+    ]
+    for name, result in report['variants'].items():
+        latency = result['latency']
+        line = (
+            f"{name:<8} {result['calls_per_s']:>8.1f} appels/s  "
+            f"p50 {latency['p50_ms']:>7.2f} ms  p95 {latency['p95_ms']:>7.2f} ms"
+        )
+        if 'mean_batch_size' in result:
+            line += f"  lot moyen {result['mean_batch_size']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ============================================
+# SUITE DE L'ANALYSEUR (CORPUS DU DATASET + PDF GÉNÉRÉS)
+# ============================================
+
+ANALYZER_JOB_OFFERS = (
+    "Nous recherchons un développeur Python Django avec 3 ans d'expérience, SQL, Docker et API REST.",
+    "Data scientist: machine learning, pandas, scikit-learn, deep learning, statistics, SQL.",
+    "Chef de projet agile (Scrum, Jira), gestion de budget, communication avec les équipes métier.",
+)
+
+ANALYZER_STAGES = ('pdf', 'skills', 'experience', 'category', 'compatibility', 'summary', 'analyze')
+
+
+def build_corpus(dataset=None, size=50):
+    """
+    CVs du dataset pris à tour de rôle dans chaque catégorie (triées) : toutes
+    les catégories sont représentées et le corpus est identique d'une exécution à l'autre.
+    """
+    import pandas as pd
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    df = pd.read_csv(path, encoding='latin-1').drop_duplicates('Resume')
+    groups = [group['Resume'].tolist() for _, group in df.groupby('Category', sort=True)]
+
+    texts, rank = [], 0
+    while len(texts) < size and any(rank < len(group) for group in groups):
+        texts.extend(group[rank] for group in groups if rank < len(group))
+        rank += 1
+    return texts[:size]
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_to_pdf(text, lines_per_page=55, width=95):
+    """
+    PDF minimal (Helvetica, WinAnsi) contenant le texte, pour mesurer l'extraction
+    sans dépendance de génération PDF. Les caractères hors Latin-1 sont remplacés.
+    """
+    import textwrap
+
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        lines.extend(textwrap.wrap(paragraph, width) or [''])
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # 1 catalogue, 2 arbre des pages, 3 police, puis (page, contenu) par page
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    kids = []
+    for page_lines in pages:
+        page_id, content_id = len(objects) + 1, len(objects) + 2
+        kids.append(f'{page_id} 0 R')
+        stream = 'BT /F1 10 Tf 12 TL 50 800 Td\n' + ''.join(
+            f'({_pdf_escape(line)}) Tj T*\n' for line in page_lines
+        ) + 'ET'
+        data = stream.encode('latin-1', errors='replace')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(data) + data + b'\nendstream')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    output = io.BytesIO()
+    output.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = output.tell()
+    output.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    output.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    output.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+@register('analyzer')
+def bench_analyzer(dataset=None, repeats=3, batch_size=64, **options):
+    """
+    Latence de chaque étape de MLCVAnalyzer (cache désactivé) et de analyze() de
+    bout en bout, sur un corpus de `batch_size` CVs du dataset (toutes catégories)
+    et des PDF générés à partir des 10 premiers. Métrique suivie par étape :
+    médiane, sur les documents, de la meilleure durée de chaque document.
+    """
+    import logging
+
+    from .analyzer import MLCVAnalyzer
+    from .cache import cache_disabled
+
+    texts = build_corpus(dataset, batch_size)
+    pdfs = [text_to_pdf(text) for text in texts[:10]]
+    jobs = [ANALYZER_JOB_OFFERS[i % len(ANALYZER_JOB_OFFERS)] for i in range(len(texts))]
+
+    with quiet():
+        analyzer = MLCVAnalyzer()
+
+    stages = {
+        'pdf': (pdfs, lambda i: analyzer.extract_text_from_pdf(io.BytesIO(pdfs[i]))),
+        'skills': (texts, lambda i: analyzer.extract_skills(texts[i])),
+        'experience': (texts, lambda i: analyzer.extract_experience_years(texts[i])),
+        'category': (texts, lambda i: analyzer.predict_job_category(texts[i])),
+        'compatibility': (texts, lambda i: analyzer.calculate_compatibility(texts[i], jobs[i])),
+        'summary': (texts, lambda i: analyzer.summarize_cv(texts[i])),
+        'analyze': (texts, lambda i: analyzer.analyze(texts[i], jobs[i])),
+    }
+
+    report = {
+        'documents': len(texts),
+        'pdfs': len(pdfs),
+        'pdf_bytes': sum(len(pdf) for pdf in pdfs),
+        'repeats': repeats,
+        'ml_model': analyzer.ml_matcher is not None,
+        'spacy': analyzer.nlp is not None,
+        'stages': {},
+    }
+
+    # Les journaux INFO de l'analyseur (un par appel) fausseraient la mesure
+    logging.disable(logging.INFO)
+    try:
+        with cache_disabled():
+            # Un passage à vide : imports paresseux, compilation des regex
+            for name, (corpus, call) in stages.items():
+                call(0)
+
+            for name, (corpus, call) in stages.items():
+                durations, best = [], [float('inf')] * len(corpus)
+                for _ in range(repeats):
+                    for i in range(len(corpus)):
+                        duration = measure(lambda: call(i))[0]
+                        durations.append(duration)
+                        best[i] = min(best[i], duration)
+                report['stages'][name] = summarize(durations)
+                # Meilleure durée de chaque document, médiane : peu sensible au bruit de la machine
+                report['stages'][name]['best_p50_ms'] = summarize(best)['p50_ms']
+    finally:
+        logging.disable(logging.NOTSET)
+
+    report['extracted_chars'] = len(analyzer.extract_text_from_pdf(io.BytesIO(pdfs[0]))) if pdfs else 0
+    return report
+
+
+@register_metrics('analyzer')
+def analyzer_metrics(report):
+    return {f'{stage}.best_p50_ms': result['best_p50_ms'] for stage, result in report['stages'].items()}
+
+
+@register_summary('analyzer')
+def summarize_analyzer(report):
+    lines = [f"{report['documents']} CVs, {report['pdfs']} PDF, {report['repeats']} répétitions"
+             f" (modèle ML : {'oui' if report['ml_model'] else 'non'}, spaCy : {'oui' if report['spacy'] else 'non'})"]
+    for stage, result in report['stages'].items():
+        lines.append(
+            f"{stage:<14} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+            f"max {result['max_ms']:>9.3f} ms"
+        )
+    return "\n".join(lines)
+
+
+# ============================================
+# VUES SYNC vs ASYNC SOUS DAPHNE
+# ============================================
+
+ASYNC_VIEW_ENDPOINTS = {
+    'analyze-single': ('/api/v1/cvs/recruteur/analyze-single/', '/api/v1/cvs/async/recruteur/analyze-single/'),
+    'history': ('/api/v1/cvs/history/', '/api/v1/cvs/async/history/'),
+}
+
+
+@register('async-views')
+def bench_async_views(dataset=None, repeats=3, concurrency=16, **options):
+    """
+    Test de charge sous Daphne : `concurrency` clients envoient chacun `repeats`
+    requêtes aux vues DRF (sync) puis à leurs versions async. Utilise la base
+    configurée (migrée) ; les utilisateurs et CVs de test sont supprimés à la fin.
+    L'historique (dernière analyse par CV, sous-requête corrélée portable) se
+    mesure sous SQLite comme sous PostgreSQL.
+    """
+    import pandas as pd
+    from .loadtest import hammer, remove_fixtures, seed_fixtures, serve_daphne
+    from .train_model import find_dataset_file
+
+    with quiet():
+        path = dataset or find_dataset_file()
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Dataset UpdatedResumeDataSet.csv introuvable (option --dataset)")
+
+    texts = pd.read_csv(path, encoding='latin-1')['Resume'].drop_duplicates().head(concurrency).tolist()
+    fixtures = seed_fixtures(texts)
+    job_text = "Développeur Python Django avec expérience SQL, Docker et API REST"
+
+    report = {'concurrency': concurrency, 'requests_per_client': repeats, 'endpoints': {}}
+    try:
+        # Préchauffage au démarrage : la première requête ne paie pas le chargement des modèles
+        with serve_daphne(env={'NLP_WARMUP_ON_STARTUP': 'True', 'NLP_WARMUP_FORCE': 'True'}) as base_url:
+            for name, (sync_path, async_path) in ASYNC_VIEW_ENDPOINTS.items():
+                payload = None
+                if name == 'analyze-single':
+                    payload = {'cv_id': fixtures['cv_ids'][0], 'job_offer_text': job_text}
+
+                report['endpoints'][name] = {}
+                for variant, url_path in (('sync', sync_path), ('async', async_path)):
+                    url = base_url + url_path
+                    # Requête de préchauffage (chargement des modèles, connexions)
+                    hammer(url, 1, 1, fixtures['token'], payload)
+                    durations, statuses, elapsed = hammer(url, concurrency, repeats, fixtures['token'], payload)
+                    report['endpoints'][name][variant] = {
+                        'latency': summarize(durations),
+                        'requests_per_s': round(len(statuses) / elapsed, 1) if elapsed else None,
+                        'errors': sum(1 for status in statuses if not 200 <= status < 300),
+                        'statuses': sorted(set(statuses)),
+                    }
+    finally:
+        remove_fixtures()
+    return report
+
+
+@register_summary('async-views')
+def summarize_async_views(report):
+    lines = [f"{report['concurrency']} clients x {report['requests_per_client']} requêtes"]
+    for name, variants in report['endpoints'].items():
+        for variant, result in variants.items():
+            lines.append(
+                f"{name:<16} {variant:<6} {result['requests_per_s'] or 0:>7.1f} req/s  "
+                f"p95 {result['latency'].get('p95_ms', 0):>8.1f} ms  erreurs {result['errors']}"
+            )
+    return "\n".join(lines)
+
+
+@register_summary('startup')
+def summarize_startup(report):
+    lines = [f"manage.py check : p50 {report['manage_py_check']['p50_ms']:.0f} ms"]
+    for mode, result in report['boot'].items():
+        rss = result['peak_rss_bytes']
+        lines.append(
+            f"{mode:<6} boot p50 {result['boot']['p50_ms']:>7.0f} ms, total p50 {result['total']['p50_ms']:>7.0f} ms, "
+            f"RSS {rss / 1e6 if rss else 0:>6.1f} MB, modules lourds : {', '.join(result['heavy_modules']) or '-'}"
+        )
+    return '\n'.join(lines)
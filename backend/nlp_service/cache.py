@@ -0,0 +1,280 @@
+# nlp_service/cache.py
+"""
+Cache à deux niveaux pour les résultats de l'analyseur :
+
+1. un LRU en mémoire du processus, borné en nombre d'entrées et en octets ;
+2. le cache Django partagé (Redis en production) entre tous les workers.
+
+Les clés sont préfixées par un namespace et par ANALYZER_VERSION : changer la
+logique de l'analyseur et incrémenter la version invalide tout l'existant.
+"""
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import CACHE_EVICTIONS, CACHE_LATENCY, CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter à chaque changement qui modifie les sorties de l'analyseur
+# (2 : textes tronqués à NLP_SPACY['MAX_CHARS'] avant la NER)
+ANALYZER_VERSION = '2'
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    LRU thread-safe stockant des valeurs sérialisées (pickle).
+
+    Stocker les octets plutôt que les objets évite qu'un appelant modifie une
+    valeur en cache et permet une éviction basée sur la taille réelle.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            payload = self._data.get(key)
+            if payload is None:
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.set_raw(key, payload)
+
+    def set_raw(self, key, payload: bytes):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+
+            self._data[key] = payload
+            self.current_bytes += size
+
+            while self._data and (len(self._data) > self.max_entries or self.current_bytes > self.max_bytes):
+                _, evicted = self._data.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                CACHE_EVICTIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+
+class TwoTierCache:
+    """LRU local devant le cache Django partagé (optionnel)"""
+
+    def __init__(self, local: LRUCache, shared=None, timeout: int = 24 * 3600, version: str = ANALYZER_VERSION):
+        self.local = local
+        self.shared = shared
+        self.timeout = timeout
+        self.version = version
+
+    def make_key(self, namespace: str, *parts) -> str:
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(repr(part).encode('utf-8', 'surrogatepass'))
+            digest.update(b'\x1f')
+        return f"nlp:{self.version}:{namespace}:{digest.hexdigest()}"
+
+    def get(self, namespace: str, key: str):
+        start = time.perf_counter()
+        value = self.local.get(key)
+        CACHE_LATENCY.labels(namespace, 'local', 'get').observe(time.perf_counter() - start)
+
+        if value is not _MISSING:
+            CACHE_REQUESTS.labels(namespace, 'local', 'hit').inc()
+            return value
+        CACHE_REQUESTS.labels(namespace, 'local', 'miss').inc()
+
+        if self.shared is None:
+            return _MISSING
+
+        start = time.perf_counter()
+        try:
+            value = self.shared.get(key, _MISSING)
+        except Exception as e:
+            logger.warning(f"Cache partagé indisponible (lecture {namespace}): {e}")
+            CACHE_REQUESTS.labels(namespace, 'shared', 'error').inc()
+            return _MISSING
+        finally:
+            CACHE_LATENCY.labels(namespace, 'shared', 'get').observe(time.perf_counter() - start)
+
+        if value is _MISSING:
+            CACHE_REQUESTS.labels(namespace, 'shared', 'miss').inc()
+            return _MISSING
+
+        CACHE_REQUESTS.labels(namespace, 'shared', 'hit').inc()
+        self.local.set(key, value)
+        return value
+
+    def set(self, namespace: str, key: str, value):
+        start = time.perf_counter()
+        self.local.set(key, value)
+        CACHE_LATENCY.labels(namespace, 'local', 'set').observe(time.perf_counter() - start)
+
+        if self.shared is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            self.shared.set(key, value, self.timeout)
+        except Exception as e:
+            logger.warning(f"Cache partagé indisponible (écriture {namespace}): {e}")
+            CACHE_REQUESTS.labels(namespace, 'shared', 'error').inc()
+        finally:
+            CACHE_LATENCY.labels(namespace, 'shared', 'set').observe(time.perf_counter() - start)
+
+    def ping(self):
+        """
+        Aller-retour sur le cache partagé (les caches Django se connectent à la
+        première opération) ; lève une exception s'il est injoignable
+        """
+        if self.shared is None:
+            return
+        key, token = f"nlp:{self.version}:ping:{os.getpid()}", os.urandom(8).hex()
+        self.shared.set(key, token, 30)
+        if self.shared.get(key) != token:
+            raise RuntimeError("Cache partagé : la valeur écrite n'a pas été relue")
+
+    def get_or_compute(self, namespace: str, parts: tuple, compute):
+        key = self.make_key(namespace, *parts)
+        value = self.get(namespace, key)
+        if value is _MISSING:
+            value = compute()
+            self.set(namespace, key, value)
+        return value
+
+    def get_or_compute_many(self, namespace: str, parts_list: list, compute):
+        """
+        Version par lots de get_or_compute : compute(parts manquants) retourne
+        les valeurs correspondantes, dans le même ordre, en un seul appel.
+        """
+        keys = [self.make_key(namespace, *parts) for parts in parts_list]
+        values = [self.get(namespace, key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is _MISSING]
+        if missing:
+            for i, value in zip(missing, compute([parts_list[i] for i in missing])):
+                values[i] = value
+                self.set(namespace, keys[i], value)
+        return values
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Retourne le cache de l'analyseur configuré depuis settings.NLP_CACHE,
+    ou None s'il est désactivé. Hors Django (scripts), seul le LRU local est utilisé.
+    """
+    global _cache
+    if _cache is not None:
+        return _cache or None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = _build_cache()
+    return _cache or None
+
+
+@contextlib.contextmanager
+def cache_disabled():
+    """Court-circuite le cache pendant le bloc (benchmarks : mesurer le calcul, pas les hits)"""
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, False
+    try:
+        yield
+    finally:
+        with _cache_lock:
+            _cache = previous
+
+
+def _build_cache():
+    config = {}
+    shared = None
+
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_CACHE', {})
+            shared_alias = config.get('SHARED_ALIAS')
+            if shared_alias:
+                from django.core.cache import caches
+                shared = caches[shared_alias]
+    except Exception as e:
+        logger.warning(f"Cache partagé non configuré, utilisation du cache local uniquement: {e}")
+
+    if not config.get('ENABLED', True):
+        logger.info("Cache de l'analyseur désactivé")
+        return False
+
+    local = LRUCache(
+        max_entries=config.get('LOCAL_MAX_ENTRIES', 1024),
+        max_bytes=config.get('LOCAL_MAX_BYTES', 64 * 1024 * 1024),
+    )
+    return TwoTierCache(local, shared, timeout=config.get('TIMEOUT', 24 * 3600))
+
+
+def _is_cacheable(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def cached(namespace: str, model_dependent: bool = False, ner_dependent: bool = False):
+    """
+    Décorateur de méthode : met en cache le résultat selon les arguments.
+    Les appels avec des arguments non scalaires (fichier PDF...) ne sont pas mis en cache.
+    Avec model_dependent, la version du modèle ML servi fait partie de la clé : après
+    un rechargement, les anciens scores ne sont pas réutilisés. Si l'objet expose
+    model_snapshot(), l'appel entier (clé et calcul) lit un seul snapshot du modèle.
+    Avec ner_dependent, la configuration NER (self.ner_config : modèle spaCy et
+    MAX_CHARS, None sans spaCy) en fait aussi partie.
+    """
+    def decorator(method):
+        def call(self, args, kwargs, version):
+            cache = get_cache()
+            if (cache is None
+                    or not all(_is_cacheable(a) for a in args)
+                    or not all(_is_cacheable(v) for v in kwargs.values())):
+                return method(self, *args, **kwargs)
+
+            parts = args + tuple(sorted(kwargs.items()))
+            if ner_dependent:
+                parts = (getattr(self, 'ner_config', None),) + parts
+            if model_dependent:
+                parts = (version,) + parts
+            return cache.get_or_compute(namespace, parts, lambda: method(self, *args, **kwargs))
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if model_dependent and hasattr(self, 'model_snapshot'):
+                with self.model_snapshot() as served:
+                    return call(self, args, kwargs, served.version)
+            version = getattr(self, 'model_version', None) if model_dependent else None
+            return call(self, args, kwargs, version)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+# nlp_service/executor.py
+"""
+Exécuteur borné pour appeler l'analyseur depuis les vues async.
+
+La boucle d'événements de Daphne ne doit jamais exécuter le calcul NLP :
+run_analyzer envoie l'appel dans un pool (threads par défaut, processus avec
+NLP_EXECUTOR['KIND'] = 'process') de taille fixe. Au-delà de WORKERS appels
+simultanés, les suivants attendent dans la file de l'exécuteur.
+
+- threads : adapté quand l'analyseur est distant (RemoteAnalyzer, attente d'IO)
+  ou pour les parties qui relâchent le GIL ;
+- processus : chaque processus a son propre analyseur préchauffé, les
+  fichiers PDF sont transmis sous forme d'octets. Si l'un d'eux meurt, le pool
+  cassé (BrokenProcessPool) est remplacé à la première erreur.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .inference_server import analyzer_process_pool, call_local_analyzer, to_wire
+from .metrics import PROCESS_POOL_RESTARTS
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_DEFAULTS = {
+    'KIND': 'thread',
+    'WORKERS': 4,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor_settings():
+    """settings.NLP_EXECUTOR complété par les valeurs par défaut (variables d'environnement hors Django)"""
+    config = {}
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_EXECUTOR', {})
+    except ImportError:
+        pass
+
+    return {
+        'KIND': config.get('KIND') or os.environ.get('NLP_EXECUTOR_KIND', EXECUTOR_DEFAULTS['KIND']),
+        'WORKERS': int(config.get('WORKERS') or os.environ.get('NLP_EXECUTOR_WORKERS', EXECUTOR_DEFAULTS['WORKERS'])),
+    }
+
+
+def get_executor():
+    """Exécuteur du processus, créé à la première utilisation"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = executor_settings()
+                if config['KIND'] == 'process':
+                    _executor = analyzer_process_pool(config['WORKERS'])
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=config['WORKERS'], thread_name_prefix='nlp-executor')
+                logger.info(f"⚙️  Exécuteur d'analyse : {config['KIND']} x{config['WORKERS']}")
+    return _executor
+
+
+async def run_analyzer(method, *args, **kwargs):
+    """Appelle get_analyzer().<method>(...) dans l'exécuteur borné, sans bloquer la boucle"""
+    executor = get_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        args = tuple(to_wire(a) for a in args)
+        kwargs = {k: to_wire(v) for k, v in kwargs.items()}
+
+    call = functools.partial(call_local_analyzer, method, args, kwargs)
+    if not isinstance(executor, ProcessPoolExecutor):
+        # run_in_executor ne propage pas les ContextVar (label endpoint des métriques par étape)
+        call = functools.partial(contextvars.copy_context().run, call)
+
+    loop = asyncio.get_running_loop()
+    try:
+        future = loop.run_in_executor(executor, call)
+    except BrokenProcessPool:
+        # Pool cassé avant cet appel : nouveau pool, même appel
+        reset_executor(executor)
+        executor = get_executor()
+        future = loop.run_in_executor(executor, call)
+    try:
+        return await future
+    except BrokenProcessPool:
+        # L'appel a pu provoquer la mort du processus : il échoue, les suivants utilisent un nouveau pool
+        reset_executor(executor)
+        raise
+
+
+def reset_executor(broken):
+    """Abandonne l'exécuteur cassé (une seule fois) ; le suivant est créé au prochain appel"""
+    global _executor
+    with _executor_lock:
+        if _executor is not broken:
+            return
+        _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    PROCESS_POOL_RESTARTS.labels('executor').inc()
+    logger.error("💥 Processus d'analyse mort : exécuteur recréé au prochain appel")
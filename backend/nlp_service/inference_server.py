@@ -0,0 +1,372 @@
+# nlp_service/inference_server.py
+"""
+Service d'inférence séparé des workers web.
+
+Le serveur (manage.py inference_server) écoute sur une socket Unix et possède
+les modèles : un pool de N processus, chacun avec son MLCVAnalyzer préchauffé.
+Les workers web n'ont plus qu'un client léger (RemoteAnalyzer) qui envoie
+(méthode, arguments) par multiprocessing.connection et attend le résultat.
+
+La concurrence web (workers Daphne/Gunicorn) et la concurrence d'inférence
+(NLP_INFERENCE['WORKERS']) se dimensionnent ainsi indépendamment : la mémoire
+des modèles n'est payée qu'une fois par processus d'inférence.
+
+Si un processus d'inférence meurt (OOM, plantage du code natif), le pool
+devient inutilisable (BrokenProcessPool) : il est recréé, et son état est
+renvoyé par ping (sonde de santé : manage.py inference_server --check).
+
+Sans NLP_INFERENCE['ADDRESS'], get_analyzer() garde l'analyseur en processus.
+"""
+import functools
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import AuthenticationError, get_context
+from multiprocessing.connection import Client, Listener
+
+from .metrics import PROCESS_POOL_RESTARTS
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_DEFAULTS = {
+    'ADDRESS': '',
+    'WORKERS': 2,
+    'AUTHKEY': '',
+    'TIMEOUT': 120.0,
+}
+
+# Défini dans le serveur et hérité par ses processus : ils utilisent l'analyseur local
+SERVER_ENV = 'NLP_INFERENCE_SERVER'
+
+# Méthodes de MLCVAnalyzer exposées aux workers web
+REMOTE_METHODS = frozenset({
+    'analyze',
+    'calculate_compatibility',
+    'extract_entities',
+    'extract_entities_batch',
+    'extract_experience_years',
+    'extract_skills',
+    'extract_skills_batch',
+    'extract_text_from_pdf',
+    'predict_job_category',
+    'rank_cvs',
+    'summarize_cv',
+})
+
+
+class InferenceError(RuntimeError):
+    """Service d'inférence injoignable, trop lent, ou erreur levée par l'analyseur distant"""
+
+
+def inference_settings():
+    """settings.NLP_INFERENCE complété par les valeurs par défaut (variables d'environnement hors Django)"""
+    config = {}
+    secret_key = ''
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_INFERENCE', {})
+            secret_key = getattr(settings, 'SECRET_KEY', '')
+    except ImportError:
+        pass
+
+    return {
+        'ADDRESS': config.get('ADDRESS', os.environ.get('NLP_INFERENCE_SOCKET', INFERENCE_DEFAULTS['ADDRESS'])),
+        'WORKERS': int(config.get('WORKERS') or os.environ.get('NLP_INFERENCE_WORKERS', INFERENCE_DEFAULTS['WORKERS'])),
+        'AUTHKEY': config.get('AUTHKEY') or os.environ.get('NLP_INFERENCE_AUTHKEY') or secret_key,
+        'TIMEOUT': float(config.get('TIMEOUT') or os.environ.get('NLP_INFERENCE_TIMEOUT', INFERENCE_DEFAULTS['TIMEOUT'])),
+    }
+
+
+def remote_address():
+    """Adresse du service d'inférence à utiliser, ou '' pour l'analyseur en processus"""
+    if os.environ.get(SERVER_ENV) == 'true':
+        return ''
+    return inference_settings()['ADDRESS']
+
+
+def to_wire(value):
+    """Les fichiers (PDF uploadés) sont envoyés sous forme d'octets"""
+    if hasattr(value, 'read'):
+        value.seek(0)
+        data = value.read()
+        value.seek(0)
+        return data
+    return value
+
+
+def from_wire(value):
+    return io.BytesIO(value) if isinstance(value, bytes) else value
+
+
+# ============================================
+# CLIENT (WORKERS WEB)
+# ============================================
+
+class RemoteAnalyzer:
+    """
+    Client du service d'inférence, avec la même interface que MLCVAnalyzer
+    pour les méthodes de REMOTE_METHODS. Une connexion par thread.
+    """
+
+    def __init__(self, address, authkey='', timeout=INFERENCE_DEFAULTS['TIMEOUT']):
+        self.address = address
+        self.authkey = authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls):
+        config = inference_settings()
+        return cls(config['ADDRESS'], config['AUTHKEY'], config['TIMEOUT'])
+
+    def __getattr__(self, name):
+        if name in REMOTE_METHODS:
+            return functools.partial(self.call, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey or None)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, method, *args, **kwargs):
+        request = (
+            method,
+            tuple(to_wire(a) for a in args),
+            {k: to_wire(v) for k, v in kwargs.items()},
+        )
+
+        # Un seul nouvel essai, si la connexion gardée a été fermée par un redémarrage du serveur
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(request)
+                break
+            except (OSError, EOFError, AuthenticationError) as e:
+                self._reset()
+                if attempt:
+                    raise InferenceError(f"Service d'inférence injoignable ({self.address}): {e}")
+
+        try:
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"pas de réponse après {self.timeout:.0f}s")
+            status, payload = conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            # Réponse perdue ou en retard : la connexion n'est plus synchronisée
+            self._reset()
+            raise InferenceError(f"Service d'inférence ({method}): {e}")
+
+        if status == 'error':
+            raise InferenceError(payload)
+        return payload
+
+    def ping(self):
+        return self.call('ping')
+
+    def warm_up(self):
+        """Vérifie que le service répond (les modèles y sont déjà préchauffés)"""
+        return self.ping()
+
+
+# ============================================
+# SERVEUR
+# ============================================
+
+def init_analyzer_process(settings_module):
+    """Initialisation d'un processus d'inférence : Django puis analyseur préchauffé"""
+    os.environ[SERVER_ENV] = 'true'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from .analyzer import warm_up_analyzer
+    warm_up_analyzer()
+
+
+def call_local_analyzer(method, args, kwargs):
+    """Exécute get_analyzer().<method> (processus d'inférence ou thread de l'exécuteur)"""
+    from .analyzer import get_analyzer
+
+    args = tuple(from_wire(a) for a in args)
+    kwargs = {k: from_wire(v) for k, v in kwargs.items()}
+    return getattr(get_analyzer(), method)(*args, **kwargs)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def analyzer_process_pool(workers):
+    """Pool de processus possédant chacun un analyseur préchauffé"""
+    # spawn : pas de fork d'un processus qui a déjà des threads (connexions, rechargement)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=init_analyzer_process,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),),
+    )
+
+
+class InferenceServer:
+    """Socket Unix + pool de processus possédant chacun un analyseur"""
+
+    def __init__(self, address, workers=INFERENCE_DEFAULTS['WORKERS'], authkey=''):
+        self.address = address
+        self.workers = workers
+        self.authkey = authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+        self.pool = None
+        self.pool_restarts = 0
+        self.listener = None
+        self.started_at = None
+        self._stopping = threading.Event()
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, address=None, workers=None):
+        config = inference_settings()
+        return cls(address or config['ADDRESS'], workers or config['WORKERS'], config['AUTHKEY'])
+
+    def start_pool(self):
+        os.environ[SERVER_ENV] = 'true'
+        self.pool = analyzer_process_pool(self.workers)
+        # Une tâche par processus : tous démarrent et chargent les modèles avant la première requête
+        start = time.perf_counter()
+        pids = {future.result() for future in [self.pool.submit(_worker_pid) for _ in range(self.workers)]}
+        logger.info(f"🔥 {len(pids)} processus d'inférence prêts en {time.perf_counter() - start:.1f}s")
+
+    def restart_pool(self, broken):
+        """
+        Remplace le pool cassé (une seule fois si plusieurs requêtes l'ont vu casser).
+        Les processus du nouveau pool chargent les modèles à leur première tâche.
+        """
+        with self._pool_lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = analyzer_process_pool(self.workers)
+            self.pool_restarts += 1
+        PROCESS_POOL_RESTARTS.labels('inference').inc()
+        logger.error(f"💥 Processus d'inférence mort : pool recréé ({self.pool_restarts} depuis le démarrage)")
+
+    def run(self, method, args, kwargs):
+        """Exécute la méthode dans le pool ; recrée le pool si un de ses processus est mort"""
+        pool = self.pool
+        try:
+            future = pool.submit(call_local_analyzer, method, args, kwargs)
+        except BrokenProcessPool:
+            # Pool cassé avant cette requête : nouveau pool, même requête
+            self.restart_pool(pool)
+            pool = self.pool
+            future = pool.submit(call_local_analyzer, method, args, kwargs)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # La requête a pu provoquer la mort du processus : elle échoue, sans nouvel essai
+            self.restart_pool(pool)
+            raise
+
+    def pool_state(self):
+        """
+        État du pool pour ping : submit lève BrokenProcessPool dès qu'un processus
+        est mort, même sans tâche en cours ; le pool est alors recréé
+        """
+        pool = self.pool
+        try:
+            pool.submit(_worker_pid).cancel()
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            self.pool.submit(_worker_pid).cancel()
+        return {'state': 'ok', 'restarts': self.pool_restarts}
+
+    def serve_forever(self):
+        if self.pool is None:
+            self.start_pool()
+
+        directory = os.path.dirname(self.address)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.address):
+            # Socket laissée par un arrêt brutal
+            os.unlink(self.address)
+
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey or None)
+        self.started_at = time.time()
+        logger.info(f"🚀 Service d'inférence en écoute sur {self.address} ({self.workers} processus)")
+
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn = self.listener.accept()
+                except AuthenticationError as e:
+                    logger.warning(f"Connexion refusée (authentification): {e}")
+                    continue
+                except OSError:
+                    if self._stopping.is_set():
+                        break
+                    raise
+                threading.Thread(target=self._handle, args=(conn,), name='nlp-inference-conn', daemon=True).start()
+        finally:
+            self.close()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if method == 'ping':
+                    try:
+                        reply = ('ok', {
+                            'workers': self.workers,
+                            'uptime': time.time() - self.started_at,
+                            'pool': self.pool_state(),
+                        })
+                    except Exception as e:
+                        logger.error(f"❌ Pool d'inférence inutilisable: {e}")
+                        reply = ('error', f"Pool d'inférence inutilisable : {type(e).__name__}: {e}")
+                elif method not in REMOTE_METHODS:
+                    reply = ('error', f"Méthode non exposée : {method}")
+                else:
+                    try:
+                        reply = ('ok', self.run(method, args, kwargs))
+                    except Exception as e:
+                        logger.error(f"❌ Erreur d'inférence ({method}): {e}")
+                        reply = ('error', f"{type(e).__name__}: {e}")
+
+                try:
+                    conn.send(reply)
+                except (OSError, EOFError):
+                    return
+
+    def stop(self):
+        self._stopping.set()
+        if self.listener is not None:
+            self.listener.close()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
@@ -0,0 +1,384 @@
+# nlp_service/loadtest.py
+"""
+Outils de test de charge de l'API (bibliothèque standard uniquement) :
+
+- seed_fixtures : recruteur + candidat + CVs du dataset dans la base courante,
+  avec un token JWT d'accès ;
+- serve_daphne : lance Daphne (config.asgi) sur un port libre le temps du test ;
+- hammer : N clients concurrents (threads + urllib) sur un endpoint, débit et latences ;
+- run_scenarios : N utilisateurs virtuels qui rejouent un mélange pondéré de
+  scénarios (upload, analyse, classement...) pendant une durée donnée, avec
+  débit, percentiles de latence et taux d'erreur par endpoint
+  (manage.py loadtest).
+"""
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURE_PREFIX = 'loadtest'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed_fixtures(texts, prefix=FIXTURE_PREFIX):
+    """
+    Crée (ou réutilise) un recruteur, un candidat et un CV par texte.
+
+    Returns:
+        dict avec 'token' (accès JWT du recruteur), 'candidat_token', 'cv_ids'
+    """
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from cvs.models import CV
+
+    User = get_user_model()
+    recruteur, _ = User.objects.get_or_create(
+        username=f'{prefix}-recruteur',
+        defaults={'email': f'{prefix}-recruteur@example.com', 'role': 'recruteur'},
+    )
+    candidat, _ = User.objects.get_or_create(
+        username=f'{prefix}-candidat',
+        defaults={'email': f'{prefix}-candidat@example.com', 'role': 'candidat'},
+    )
+
+    CV.objects.filter(candidat=candidat).delete()
+    cvs = CV.objects.bulk_create([
+        CV(candidat=candidat, file=f'cvs/{prefix}_{i}.pdf', extracted_text=text, parsed_data={})
+        for i, text in enumerate(texts)
+    ])
+    if any(cv.pk is None for cv in cvs):
+        cvs = list(CV.objects.filter(candidat=candidat).order_by('pk'))
+
+    return {
+        'token': str(RefreshToken.for_user(recruteur).access_token),
+        'candidat_token': str(RefreshToken.for_user(candidat).access_token),
+        'cv_ids': [cv.pk for cv in cvs],
+    }
+
+
+def seed_users(role, count, prefix=FIXTURE_PREFIX):
+    """Crée (ou réutilise) `count` utilisateurs du rôle ; retourne leurs tokens JWT d'accès"""
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    User = get_user_model()
+    tokens = []
+    for i in range(count):
+        user, _ = User.objects.get_or_create(
+            username=f'{prefix}-{role}-{i}',
+            defaults={'email': f'{prefix}-{role}-{i}@example.com', 'role': role},
+        )
+        tokens.append(str(RefreshToken.for_user(user).access_token))
+    return tokens
+
+
+def remove_fixtures(prefix=FIXTURE_PREFIX):
+    from django.contrib.auth import get_user_model
+
+    from django.core.files.storage import default_storage
+
+    # Les CVs et analyses suivent par cascade
+    get_user_model().objects.filter(username__startswith=f'{prefix}-').delete()
+
+    # PDF uploadés pendant le test : les vues ne suppriment pas le fichier d'un CV remplacé
+    try:
+        _, filenames = default_storage.listdir('cvs')
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        if filename.startswith(f'{prefix}-upload-'):
+            default_storage.delete(f'cvs/{filename}')
+
+
+@contextlib.contextmanager
+def serve_daphne(port=None, env=None, timeout=60):
+    """Lance Daphne sur 127.0.0.1 ; produit l'URL de base"""
+    port = port or free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'config.asgi:application'],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                urllib.request.urlopen(f'{base_url}/health/', timeout=2).read()
+                break
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"Daphne n'a pas démarré sur le port {port}")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def multipart_body(field, files):
+    """Corps multipart/form-data : files = [(nom de fichier, contenu PDF)] sous le champ `field`"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n'.encode('utf-8') + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def request(url, token=None, payload=None, timeout=120, body=None, content_type=None):
+    """
+    Une requête JSON (payload) ou brute (body + content_type, ex. multipart) ;
+    retourne (statut HTTP, durée en secondes)
+    """
+    headers = {'Content-Type': content_type or 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = body if body is not None else json.dumps(payload).encode('utf-8') if payload is not None else None
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def hammer(url, concurrency, requests_per_client, token=None, payload=None):
+    """
+    Envoie concurrency x requests_per_client requêtes depuis `concurrency` threads.
+
+    Returns:
+        (durées des requêtes réussies, statuts, durée totale)
+    """
+    durations, statuses = [], []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests_per_client):
+            status, duration = request(url, token, payload)
+            with lock:
+                statuses.append(status)
+                if 200 <= status < 300:
+                    durations.append(duration)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durations, statuses, time.perf_counter() - start
+
+
+# ============================================
+# SCÉNARIOS
+# ============================================
+
+JOB_OFFERS = (
+    "Développeur Python Django avec expérience SQL, Docker et API REST",
+    "Data scientist : machine learning, pandas, scikit-learn, statistiques et SQL",
+    "Chef de projet agile (Scrum, Jira), gestion de budget et communication",
+)
+
+DEFAULT_MIX = {
+    'recruteur-analyze': 4,
+    'candidat-analyze': 2,
+    'rank': 1,
+    'recruteur-upload': 1,
+    'candidat-upload': 1,
+    'cv-list': 2,
+}
+
+
+class VirtualUser:
+    """Comptes, CVs et documents d'un client ; chaque client a son propre recruteur et candidat uploadeur"""
+
+    def __init__(self, index, base_url, fixtures, recruteur_token, uploader_token, texts, rng):
+        self.index = index
+        self.base_url = base_url
+        self.fixtures = fixtures
+        self.recruteur_token = recruteur_token
+        self.uploader_token = uploader_token
+        self.texts = texts
+        self.rng = rng
+        self.uploads = 0
+
+    def pdf(self):
+        """
+        PDF d'un CV du corpus, précédé d'un email unique : l'upload recruteur crée
+        le candidat à partir de cet email, supprimé ensuite par remove_fixtures
+        """
+        from .benchmarks import text_to_pdf
+
+        self.uploads += 1
+        name = f'{FIXTURE_PREFIX}-upload-{self.index}-{self.uploads}'
+        return f'{name}.pdf', text_to_pdf(f'{name}@example.com\n{self.rng.choice(self.texts)}')
+
+
+def scenario_recruteur_analyze(user):
+    return user.base_url + '/api/v1/cvs/recruteur/analyze-single/', user.recruteur_token, {
+        'payload': {'cv_id': user.rng.choice(user.fixtures['cv_ids']), 'job_offer_text': user.rng.choice(JOB_OFFERS)},
+    }
+
+
+def scenario_candidat_analyze(user):
+    cv_id = user.rng.choice(user.fixtures['cv_ids'])
+    return user.base_url + f'/api/v1/cvs/candidat/analyze-job/{cv_id}/', user.fixtures['candidat_token'], {
+        'payload': {'job_description': user.rng.choice(JOB_OFFERS)},
+    }
+
+
+def scenario_rank(user):
+    cv_ids = user.fixtures['cv_ids']
+    return user.base_url + '/api/v1/cvs/recruteur/rank/', user.recruteur_token, {
+        'payload': {'job_offer_text': user.rng.choice(JOB_OFFERS),
+                    'cv_ids': user.rng.sample(cv_ids, min(10, len(cv_ids)))},
+    }
+
+
+def scenario_recruteur_upload(user):
+    body, content_type = multipart_body('files', [user.pdf() for _ in range(3)])
+    return user.base_url + '/api/v1/cvs/recruteur/upload/', user.recruteur_token, {
+        'body': body, 'content_type': content_type,
+    }
+
+
+def scenario_candidat_upload(user):
+    # Le candidat garde 5 CVs : l'upload remplace le plus ancien
+    body, content_type = multipart_body('file', [user.pdf()])
+    return user.base_url + '/api/v1/cvs/candidat/upload/', user.uploader_token, {
+        'body': body, 'content_type': content_type,
+    }
+
+
+def scenario_cv_list(user):
+    return user.base_url + '/api/v1/cvs/cvs/', user.fixtures['candidat_token'], {}
+
+
+def scenario_history(user):
+    return user.base_url + '/api/v1/cvs/history/', user.recruteur_token, {}
+
+
+SCENARIOS = {
+    'recruteur-analyze': scenario_recruteur_analyze,
+    'candidat-analyze': scenario_candidat_analyze,
+    'rank': scenario_rank,
+    'recruteur-upload': scenario_recruteur_upload,
+    'candidat-upload': scenario_candidat_upload,
+    'cv-list': scenario_cv_list,
+    'history': scenario_history,
+}
+
+
+def parse_mix(spec):
+    """'recruteur-analyze=4,rank=1' -> {'recruteur-analyze': 4.0, 'rank': 1.0}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Scénario inconnu : {name} (disponibles : {', '.join(sorted(SCENARIOS))})")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Poids invalide pour {name} : {weight}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Le mélange de scénarios est vide")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def warm_up(user, mix, timeout=120):
+    """Un passage de chaque scénario (connexions, imports, modèles) ; retourne les statuts"""
+    statuses = {}
+    for name in mix:
+        url, token, options = SCENARIOS[name](user)
+        statuses[name] = request(url, token, timeout=timeout, **options)[0]
+    return statuses
+
+
+def run_scenarios(users, mix, duration, think_time=0.0, timeout=120):
+    """
+    Chaque utilisateur virtuel (un thread) tire un scénario selon les poids du
+    mélange et l'exécute, jusqu'à la fin de `duration` secondes.
+
+    Returns:
+        ({scénario: [(statut, durée)]}, durée totale)
+    """
+    names, weights = list(mix), list(mix.values())
+    results = {name: [] for name in names}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(user):
+        while time.monotonic() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            url, token, options = SCENARIOS[name](user)
+            status, elapsed = request(url, token, timeout=timeout, **options)
+            with lock:
+                results[name].append((status, elapsed))
+            if think_time:
+                time.sleep(user.rng.expovariate(1 / think_time))
+
+    threads = [threading.Thread(target=client, args=(user,), daemon=True) for user in users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def scenario_report(results, elapsed, summarize):
+    """Débit, latences (requêtes réussies) et erreurs par scénario, puis au total"""
+    def stats(samples):
+        statuses = Counter(status for status, _ in samples)
+        errors = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+        return {
+            'requests': len(samples),
+            'requests_per_s': round(len(samples) / elapsed, 2) if elapsed else None,
+            'latency': summarize([duration for status, duration in samples if 200 <= status < 300]),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        }
+
+    report = {name: stats(samples) for name, samples in results.items()}
+    report['total'] = stats([sample for samples in results.values() for sample in samples])
+    return report
+
+
+def virtual_users(count, base_url, fixtures, recruteur_tokens, uploader_tokens, texts, seed=0):
+    return [
+        VirtualUser(i, base_url, fixtures, recruteur_tokens[i], uploader_tokens[i], texts, random.Random(seed + i))
+        for i in range(count)
+    ]
@@ -0,0 +1,99 @@
+# nlp_service/management/commands/benchmark.py
+import json
+import platform
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from nlp_service.benchmarks import BENCHMARKS, METRICS, SUMMARIES, compare_to_baseline
+
+
+class Command(BaseCommand):
+    help = "Lance un benchmark de performance du service NLP et affiche un rapport JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS), help='Benchmark à lancer')
+        parser.add_argument('--repeats', type=int, default=5, help='Nombre de répétitions par mesure')
+        parser.add_argument('--model', help='Chemin du modèle (pickle ou dossier artefact)')
+        parser.add_argument('--dataset', help='Chemin de UpdatedResumeDataSet.csv')
+        parser.add_argument('--model-types', nargs='+', help='Types de modèles à comparer (benchmark models)')
+        parser.add_argument('--batch-size', type=int, default=64, help='Taille des lots pour le débit')
+        parser.add_argument('--concurrency', type=int, default=16, help='Clients simultanés (async-views, batching)')
+        parser.add_argument('--max-wait-ms', type=float, help='Attente maximale du micro-batcher (benchmark batching)')
+        parser.add_argument('--output', help='Fichier JSON où écrire le rapport')
+        parser.add_argument('--save-baseline', help='Enregistre les métriques suivies comme baseline (JSON)')
+        parser.add_argument('--baseline', help='Baseline à comparer : échec si une métrique régresse')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Régression tolérée par rapport à la baseline (0.25 = +25 %%)')
+
+    def handle(self, *args, **options):
+        name = options.pop('name')
+        output = options.pop('output')
+        save_baseline = options.pop('save_baseline')
+        baseline = options.pop('baseline')
+        threshold = options.pop('threshold')
+        if (save_baseline or baseline) and name not in METRICS:
+            raise CommandError(f"Le benchmark {name} ne déclare pas de métriques suivies (baseline impossible)")
+
+        previous = self.load_baseline(baseline, name) if baseline else None
+
+        self.stdout.write(f"⏱️  Benchmark {name}...")
+        try:
+            report = BENCHMARKS[name](**options)
+        except (FileNotFoundError, ValueError, ImportError, OSError) as e:
+            raise CommandError(str(e))
+
+        content = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rapport écrit dans {output}"))
+        self.stdout.write(content)
+
+        if name in SUMMARIES:
+            self.stdout.write('')
+            self.stdout.write(SUMMARIES[name](report))
+
+        if name not in METRICS:
+            return
+        metrics = METRICS[name](report)
+
+        if save_baseline:
+            with open(save_baseline, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'benchmark': name,
+                    'created_at': timezone.now().isoformat(),
+                    'python': sys.version.split()[0],
+                    'platform': platform.platform(),
+                    'metrics': metrics,
+                    'report': report,
+                }, f, indent=2, ensure_ascii=False, default=str)
+            self.stdout.write(self.style.SUCCESS(f"✅ Baseline écrite dans {save_baseline}"))
+
+        if previous is not None:
+            self.check_regressions(metrics, previous, threshold)
+
+    def load_baseline(self, path, name):
+        try:
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Baseline {path} illisible: {e}")
+        if baseline.get('benchmark') != name:
+            raise CommandError(f"La baseline {path} concerne le benchmark {baseline.get('benchmark')}, pas {name}")
+        return baseline
+
+    def check_regressions(self, metrics, baseline, threshold):
+        rows = compare_to_baseline(metrics, baseline['metrics'], threshold)
+        self.stdout.write('')
+        self.stdout.write(f"Comparaison avec la baseline du {baseline.get('created_at', '?')} (seuil +{threshold:.0%})")
+        for row in rows:
+            line = (f"{row['metric']:<28} {row['baseline']:>10.3f} -> {row['current']:>10.3f} ms"
+                    f"  {row['change']:+7.1%}")
+            self.stdout.write(self.style.ERROR(line + '  RÉGRESSION') if row['regression'] else line)
+
+        regressions = [row['metric'] for row in rows if row['regression']]
+        if regressions:
+            raise CommandError(f"{len(regressions)} régression(s) au-delà de +{threshold:.0%}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("✅ Aucune régression"))
@@ -0,0 +1,59 @@
+# nlp_service/management/commands/export_numpy.py
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.benchmarks import DEFAULT_MODEL_PATH, quiet
+from nlp_service.numpy_inference import NumpyMatcher, compare, export_matcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte un CVJobMatcher TF-IDF au format NumPy (.npz) chargeable sans "
+        "scikit-learn ni pickle, puis vérifie que les scores sont identiques"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Modèle source (pickle ou dossier artefact)')
+        parser.add_argument('--output', help='Fichier .npz (par défaut à côté du modèle source)')
+        parser.add_argument('--dataset', help='CSV utilisé pour la vérification (colonne Resume)')
+        parser.add_argument('--verify', type=int, default=200, help='Nombre de CVs comparés (0 = aucun)')
+
+    def handle(self, *args, **options):
+        from nlp_service.train_model import CVJobMatcher, find_dataset_file
+
+        source = options['model']
+        output = options['output'] or os.path.splitext(source.rstrip('/\\'))[0] + '.npz'
+
+        try:
+            with quiet():
+                matcher = CVJobMatcher.load_model(source)
+            meta = export_matcher(matcher, output)
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"💾 Export NumPy écrit : {output} ({os.path.getsize(output) / 1e6:.2f} MB, {meta['classifier']})"
+        ))
+
+        if not options['verify']:
+            return
+
+        import pandas as pd
+        with quiet():
+            dataset = options['dataset'] or find_dataset_file()
+            numpy_matcher = NumpyMatcher.load(output)
+        if not dataset:
+            raise CommandError("Dataset introuvable pour la vérification (option --dataset ou --verify 0)")
+
+        texts = pd.read_csv(dataset, encoding='latin-1')['Resume'].head(options['verify']).tolist()
+        report = compare(matcher, numpy_matcher, texts)
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if report['category_mismatches'] or report['max_match_score_diff'] > 0.01:
+            raise CommandError(
+                "L'export NumPy ne reproduit pas les prédictions du modèle source "
+                "(pickle entraîné avec une autre version de scikit-learn ? réentraîner puis réexporter)"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Prédictions identiques"))
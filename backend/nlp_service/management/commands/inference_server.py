@@ -0,0 +1,49 @@
+# nlp_service/management/commands/inference_server.py
+import json
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.inference_server import InferenceError, InferenceServer, RemoteAnalyzer, inference_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Démarre le service d'inférence : socket Unix + pool de processus possédant "
+        "les modèles. Les workers web s'y connectent si NLP_INFERENCE['ADDRESS'] est défini."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', help="Chemin de la socket Unix (défaut NLP_INFERENCE['ADDRESS'])")
+        parser.add_argument('--workers', type=int, help="Processus d'inférence (défaut NLP_INFERENCE['WORKERS'])")
+        parser.add_argument('--check', action='store_true',
+                            help="Sonde de santé : ping du service en cours (pool de processus compris), "
+                                 "code de sortie 1 en cas d'échec")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self.ping_service(options['address'])
+
+        server = InferenceServer.from_settings(options['address'], options['workers'])
+        if not server.address:
+            raise CommandError("Adresse de socket manquante (--address ou NLP_INFERENCE_SOCKET)")
+
+        def stop(signum, frame):
+            self.stdout.write("🛑 Arrêt du service d'inférence...")
+            server.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"⏳ Chargement des modèles dans {server.workers} processus...")
+        server.serve_forever()
+        self.stdout.write(self.style.SUCCESS("✅ Service d'inférence arrêté"))
+
+    def ping_service(self, address):
+        config = inference_settings()
+        client = RemoteAnalyzer(address or config['ADDRESS'], config['AUTHKEY'], timeout=5)
+        try:
+            status = client.ping()
+        except InferenceError as e:
+            raise CommandError(f"Service d'inférence indisponible : {e}")
+        self.stdout.write(json.dumps(status))
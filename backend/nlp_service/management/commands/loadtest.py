@@ -0,0 +1,118 @@
+# nlp_service/management/commands/loadtest.py
+import contextlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.benchmarks import build_corpus, summarize
+from nlp_service.loadtest import (
+    DEFAULT_MIX,
+    SCENARIOS,
+    parse_mix,
+    remove_fixtures,
+    run_scenarios,
+    scenario_report,
+    seed_fixtures,
+    seed_users,
+    serve_daphne,
+    virtual_users,
+    warm_up,
+)
+
+# Quotas par rôle levés sur le serveur lancé par la commande : les clients virtuels
+# partagent quelques comptes, les 429 mesureraient les quotas et non la capacité
+UNTHROTTLED_ENV = {
+    'THROTTLE_ANALYSIS_CANDIDAT': '100000/s',
+    'THROTTLE_ANALYSIS_RECRUTEUR': '100000/s',
+    'THROTTLE_BULK_ANALYSIS_RECRUTEUR': '100000/s',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge de bout en bout : crée des utilisateurs et des CVs de test, "
+        "rejoue un mélange de scénarios et mesure débit, latences et erreurs par endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Serveur déjà lancé (même base que cette commande) ; "
+                                          "sinon Daphne est lancé sur un port libre")
+        parser.add_argument('--duration', type=float, default=30, help='Durée du test (secondes)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Utilisateurs virtuels simultanés')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help=f"Poids des scénarios, ex. rank=1,cv-list=2 (disponibles : {', '.join(SCENARIOS)})")
+        parser.add_argument('--cvs', type=int, default=50, help='CVs du dataset créés pour les analyses')
+        parser.add_argument('--dataset', help='Chemin de UpdatedResumeDataSet.csv')
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help='Pause moyenne entre deux requêtes d\'un client (secondes, loi exponentielle)')
+        parser.add_argument('--seed', type=int, default=0, help='Graine des tirages (scénarios, CVs, offres)')
+        parser.add_argument('--keep-throttles', action='store_true',
+                            help='Garde les quotas par rôle sur le serveur lancé par la commande')
+        parser.add_argument('--timeout', type=float, default=120, help='Timeout par requête (secondes)')
+        parser.add_argument('--output', help='Fichier JSON où écrire le rapport')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            texts = build_corpus(options['dataset'], options['cvs'])
+        except (ValueError, FileNotFoundError, ImportError) as e:
+            raise CommandError(str(e))
+        concurrency = max(1, options['concurrency'])
+
+        self.stdout.write(f"🌱 Création des fixtures ({len(texts)} CVs, {concurrency} utilisateurs virtuels)...")
+        fixtures = seed_fixtures(texts)
+        recruteur_tokens = seed_users('recruteur', concurrency)
+        uploader_tokens = seed_users('candidat', concurrency)
+
+        env = {'NLP_WARMUP_ON_STARTUP': 'True', 'NLP_WARMUP_FORCE': 'True'}
+        if not options['keep_throttles']:
+            env.update(UNTHROTTLED_ENV)
+        server = contextlib.nullcontext(options['url'].rstrip('/')) if options['url'] else serve_daphne(env=env)
+
+        try:
+            with server as base_url:
+                users = virtual_users(concurrency, base_url, fixtures, recruteur_tokens, uploader_tokens,
+                                      texts, options['seed'])
+                self.stdout.write("🔥 Préchauffage...")
+                for name, status in warm_up(users[0], mix, options['timeout']).items():
+                    if not 200 <= status < 300:
+                        self.stdout.write(self.style.WARNING(f"⚠️  {name} : HTTP {status} au préchauffage"))
+
+                self.stdout.write(f"⏱️  {options['duration']:.0f} s, {concurrency} clients sur {base_url}...")
+                results, elapsed = run_scenarios(users, mix, options['duration'], options['think_time'],
+                                                 options['timeout'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            remove_fixtures()
+
+        report = {
+            'url': options['url'] or 'daphne',
+            'duration_s': round(elapsed, 2),
+            'concurrency': concurrency,
+            'think_time_s': options['think_time'],
+            'mix': mix,
+            'throttled': bool(options['url'] or options['keep_throttles']),
+            'endpoints': scenario_report(results, elapsed, summarize),
+        }
+
+        content = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rapport écrit dans {options['output']}"))
+        self.stdout.write(content)
+        self.stdout.write('')
+        self.stdout.write(self.summary(report))
+
+    def summary(self, report):
+        lines = [f"{'scénario':<18} {'req':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erreurs':>8}"]
+        for name, result in report['endpoints'].items():
+            latency = result['latency']
+            lines.append(
+                f"{name:<18} {result['requests']:>6} {result['requests_per_s'] or 0:>8.2f} "
+                f"{latency.get('p50_ms', 0):>9.1f} {latency.get('p95_ms', 0):>9.1f} {latency.get('p99_ms', 0):>9.1f} "
+                f"{result['error_rate']:>8.1%}"
+            )
+        return '\n'.join(lines)
+
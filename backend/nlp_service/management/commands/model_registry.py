@@ -0,0 +1,57 @@
+# nlp_service/management/commands/model_registry.py
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.registry import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = (
+        "Gère le registre de modèles : list, register <dossier artefact> [--version], "
+        "promote <version>. Les workers rechargent la version promue à chaud."
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        subparsers.add_parser('list', help='Liste les versions (* = active)')
+
+        register = subparsers.add_parser('register', help='Ajoute un artefact au registre')
+        register.add_argument('source', help='Dossier produit par save_artifact')
+        register.add_argument('--version', help='Nom de version (par défaut horodatage)')
+        register.add_argument('--promote', action='store_true', help='Promouvoir immédiatement')
+
+        promote = subparsers.add_parser('promote', help='Rend une version active')
+        promote.add_argument('version')
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry.from_settings()
+        action = options['action']
+
+        try:
+            if action == 'list':
+                self._list(registry)
+            elif action == 'register':
+                version = registry.register(options['source'], options['version'])
+                self.stdout.write(self.style.SUCCESS(f"📦 Version {version} enregistrée"))
+                if options['promote']:
+                    self._promote(registry, version)
+            elif action == 'promote':
+                self._promote(registry, options['version'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def _list(self, registry):
+        active = registry.active_version()
+        versions = registry.list_versions()
+        if not versions:
+            self.stdout.write(f"Registre vide ({registry.root})")
+            return
+        for version in versions:
+            marker = '*' if version == active else ' '
+            self.stdout.write(f"{marker} {version}")
+
+    def _promote(self, registry, version):
+        registry.promote(version)
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 Version {version} promue — les workers la chargeront en arrière-plan"
+        ))
@@ -0,0 +1,70 @@
+# nlp_service/management/commands/reanalyze_cvs.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cvs.models import CV
+from nlp_service.analyzer import get_analyzer
+
+
+class Command(BaseCommand):
+    help = (
+        "Réanalyse les CVs stockés (compétences, années d'expérience) par blocs : "
+        "la NER de chaque bloc passe par nlp.pipe au lieu d'un appel spaCy par CV"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='CVs lus et mis à jour par bloc')
+        parser.add_argument('--batch-size', type=int, help="Textes par lot nlp.pipe (défaut NLP_SPACY['BATCH_SIZE'])")
+        parser.add_argument('--n-process', type=int, help="Processus spaCy (défaut NLP_SPACY['N_PROCESS'], -1 = tous)")
+        parser.add_argument('--limit', type=int, help='Nombre maximum de CVs à traiter')
+        parser.add_argument('--dry-run', action='store_true', help='Analyse sans enregistrer')
+
+    def handle(self, *args, **options):
+        analyzer = get_analyzer()
+        chunk_size = options['chunk_size']
+
+        queryset = CV.objects.exclude(extracted_text='').order_by('pk').only('pk', 'extracted_text', 'parsed_data')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        total = 0
+        start = time.perf_counter()
+        chunk = []
+        for cv in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(cv)
+            if len(chunk) >= chunk_size:
+                total += self._reanalyze(analyzer, chunk, options)
+                chunk = []
+        if chunk:
+            total += self._reanalyze(analyzer, chunk, options)
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0
+        verb = 'analysés (dry-run)' if options['dry_run'] else 'réanalysés'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} CV(s) {verb} en {elapsed:.1f}s ({rate:.1f} CV/s)"
+        ))
+
+    def _reanalyze(self, analyzer, cvs, options):
+        skills_by_cv = analyzer.extract_skills_batch(
+            [cv.extracted_text for cv in cvs],
+            batch_size=options['batch_size'],
+            n_process=options['n_process'],
+        )
+
+        now = timezone.now().isoformat()
+        for cv, skills_dict in zip(cvs, skills_by_cv):
+            cv.parsed_data = {
+                **(cv.parsed_data or {}),
+                'skills': list(skills_dict.keys()),
+                'skills_with_weights': skills_dict,
+                'experience_years': analyzer.extract_experience_years(cv.extracted_text),
+                'reanalyzed_at': now,
+            }
+
+        if not options['dry_run']:
+            CV.objects.bulk_update(cvs, ['parsed_data'])
+        self.stdout.write(f"  … {len(cvs)} CV(s) jusqu'à #{cvs[-1].pk}")
+        return len(cvs)
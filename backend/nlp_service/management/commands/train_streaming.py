@@ -0,0 +1,66 @@
+# nlp_service/management/commands/train_streaming.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.train_model import (
+    default_artifact_dir,
+    find_dataset_file,
+    iter_csv_chunks,
+    iter_cv_table_chunks,
+    train_streaming,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Entraîne le modèle hashing_sgd en streaming (CSV par blocs ou table CV via "
+        "curseur serveur) et l'exporte au format artefact chargé par MLCVAnalyzer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['csv', 'db'], default='csv', help='Origine des données')
+        parser.add_argument('--csv', help='Chemin du CSV (par défaut UpdatedResumeDataSet.csv)')
+        parser.add_argument('--label-key', default='category',
+                            help="Clé de parsed_data contenant la catégorie (source db)")
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Lignes lues par bloc')
+        parser.add_argument('--epochs', type=int, default=3, help='Passes partial_fit')
+        parser.add_argument('--holdout', type=int, default=5,
+                            help="Une ligne sur N réservée à l'évaluation (0 = aucune)")
+        parser.add_argument('--buffer-size', type=int, default=10000, help='Taille du tampon de mélange')
+        parser.add_argument('--output', help="Dossier de l'artefact (par défaut models/cv_job_matcher_hashing_sgd)")
+        parser.add_argument('--report', help='Fichier JSON où écrire le rapport')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        if options['source'] == 'db':
+            label_key = options['label_key']
+            chunks = lambda: iter_cv_table_chunks(chunk_size=chunk_size, label_key=label_key)
+        else:
+            csv_path = options['csv'] or find_dataset_file()
+            if not csv_path:
+                raise CommandError("Dataset introuvable (option --csv)")
+            chunks = lambda: iter_csv_chunks(csv_path, chunk_size=chunk_size)
+
+        try:
+            matcher, report = train_streaming(
+                chunks,
+                epochs=options['epochs'],
+                holdout=options['holdout'],
+                buffer_size=options['buffer_size'],
+                chunk_size=chunk_size,
+            )
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        output = options['output'] or default_artifact_dir(matcher.model_type)
+        matcher.save_artifact(output)
+        report['artifact'] = output
+
+        content = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.stdout.write(content)
+        self.stdout.write(self.style.SUCCESS(f"✅ Modèle exporté dans {output}"))
@@ -0,0 +1,53 @@
+# nlp_service/management/commands/tune_model.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.benchmarks import load_training_data
+from nlp_service.tuning import DEFAULT_CACHE_DIR, SEARCH_SPACES, search
+
+
+class Command(BaseCommand):
+    help = (
+        "Recherche d'hyperparamètres (grille ou aléatoire) avec cache disque des "
+        "features, plis en parallèle et reprise après interruption"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model_type', choices=sorted(SEARCH_SPACES), help='Type de modèle à optimiser')
+        parser.add_argument('--search', choices=['grid', 'random'], default='grid', help='Stratégie de recherche')
+        parser.add_argument('--n-iter', type=int, default=10, help='Combinaisons tirées (recherche aléatoire)')
+        parser.add_argument('--folds', type=int, default=5, help='Nombre de plis de validation croisée')
+        parser.add_argument('--n-jobs', type=int, default=-1, help='Processus parallèles (-1 = tous les cœurs)')
+        parser.add_argument('--dataset', help='Chemin de UpdatedResumeDataSet.csv')
+        parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Dossier du cache de features')
+        parser.add_argument('--results', help='Fichier JSONL des résultats (reprise si déjà présent)')
+        parser.add_argument('--top', type=int, default=5, help='Nombre de combinaisons affichées')
+
+    def handle(self, *args, **options):
+        model_type = options['model_type']
+        results = options['results'] or f'tuning_{model_type}.jsonl'
+
+        try:
+            X_text, y_labels, _ = load_training_data(options['dataset'])
+            ranking = search(
+                X_text,
+                y_labels,
+                model_type=model_type,
+                search=options['search'],
+                n_iter=options['n_iter'],
+                folds=options['folds'],
+                n_jobs=options['n_jobs'],
+                cache_dir=options['cache_dir'],
+                results_path=results,
+            )
+        except (FileNotFoundError, ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(json.dumps(ranking[:options['top']], indent=2, default=str))
+        if ranking:
+            best = ranking[0]
+            self.stdout.write(self.style.SUCCESS(
+                f"🏆 Meilleure combinaison : {best['mean_accuracy'] * 100:.2f}% "
+                f"(± {best['std_accuracy'] * 100:.2f}) sur {best['folds']} plis — résultats dans {results}"
+            ))
@@ -0,0 +1,72 @@
+# nlp_service/management/commands/update_model.py
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_service.registry import ModelRegistry
+from nlp_service.train_model import CVJobMatcher, update_from_cv_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour incrémentalement le modèle hashing_sgd avec les CVs arrivés depuis sa "
+        "dernière mise à jour, puis enregistre le résultat comme nouvelle version du registre. "
+        "Le modèle servi n'est jamais modifié : les workers chargent la version promue à chaud."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help="Artefact à mettre à jour (par défaut la version active du registre)")
+        parser.add_argument('--since', type=int,
+                            help="Absorber les CVs d'id > SINCE (par défaut le dernier id absorbé, "
+                                 "noté dans le manifest de l'artefact)")
+        parser.add_argument('--label-key', default='category',
+                            help="Clé de parsed_data contenant la catégorie")
+        parser.add_argument('--chunk-size', type=int, default=1000, help='CVs lus par bloc')
+        parser.add_argument('--name', help='Nom de la nouvelle version (par défaut horodatage)')
+        parser.add_argument('--promote', action='store_true', help='Promouvoir la nouvelle version')
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry.from_settings()
+        source = options['source'] or registry.active_path()
+        if not source:
+            raise CommandError("Aucune version active dans le registre (option --source)")
+
+        # Copie en mémoire (pas de mmap) : l'artefact source et le modèle servi restent intacts
+        try:
+            matcher = CVJobMatcher.load_artifact(source, mmap_mode=None)
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        metadata = (matcher.manifest or {}).get('metadata', {})
+        since = options['since'] if options['since'] is not None else metadata.get('last_cv_id', 0)
+
+        try:
+            report = update_from_cv_table(matcher, since, options['chunk_size'], options['label_key'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not report['cvs']:
+            self.stdout.write(f"Aucun nouveau CV depuis l'id {since} : pas de nouvelle version")
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            matcher.save_artifact(tmp, metadata={
+                **metadata,
+                'updated_from': source,
+                'last_cv_id': report['last_cv_id'],
+                'updated_cvs': metadata.get('updated_cvs', 0) + report['cvs'],
+            })
+            try:
+                version = registry.register(tmp, options['name'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        report['version'] = version
+
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f"📦 Version {version} enregistrée ({report['cvs']} nouveaux CVs)"))
+        if options['promote']:
+            registry.promote(version)
+            self.stdout.write(self.style.SUCCESS(
+                f"🚀 Version {version} promue — les workers la chargeront en arrière-plan"
+            ))
@@ -0,0 +1,96 @@
+# nlp_service/metrics.py
+"""
+Métriques Prometheus du service NLP.
+
+Elles sont enregistrées dans le registre par défaut de prometheus_client et
+donc exposées par la vue /api/v1/metrics/ de django_prometheus.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# ============================================
+# CACHE DE L'ANALYSEUR
+# ============================================
+
+CACHE_REQUESTS = Counter(
+    'recrutai_nlp_cache_requests_total',
+    "Lectures du cache de l'analyseur par tier et résultat (hit / miss / error)",
+    ['namespace', 'tier', 'result'],
+)
+
+CACHE_LATENCY = Histogram(
+    'recrutai_nlp_cache_latency_seconds',
+    "Latence des opérations du cache de l'analyseur",
+    ['namespace', 'tier', 'operation'],
+    buckets=(0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+
+CACHE_EVICTIONS = Counter(
+    'recrutai_nlp_cache_evictions_total',
+    "Entrées évincées du cache LRU local",
+)
+
+# ============================================
+# MICRO-BATCHING (nlp_service/batching.py)
+# ============================================
+
+BATCH_SIZE = Histogram(
+    'recrutai_nlp_batch_size',
+    "Nombre d'appels regroupés par lot",
+    ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+BATCH_WAIT = Histogram(
+    'recrutai_nlp_batch_wait_seconds',
+    "Attente d'un appel avant l'exécution de son lot (latence ajoutée)",
+    ['batcher'],
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+# ============================================
+# ÉTAPES DU PIPELINE (nlp_service/stages.py)
+# ============================================
+
+STAGE_LATENCY = Histogram(
+    'recrutai_nlp_stage_latency_seconds',
+    "Durée d'une étape du pipeline d'analyse, par endpoint",
+    ['stage', 'endpoint'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+STAGE_ERRORS = Counter(
+    'recrutai_nlp_stage_errors_total',
+    "Exceptions levées par une étape du pipeline d'analyse, par endpoint",
+    ['stage', 'endpoint'],
+)
+
+# ============================================
+# DÉMARRAGE ET READINESS (nlp_service/readiness.py)
+# ============================================
+
+STARTUP_SECONDS = Gauge(
+    'recrutai_nlp_startup_seconds',
+    "Durée de chargement de chaque composant de l'analyseur ('total' : démarrage du processus -> prêt)",
+    ['component'],
+)
+
+COMPONENT_READY = Gauge(
+    'recrutai_nlp_component_ready',
+    "Composant de l'analyseur chargé (1) ou en cours / en échec (0)",
+    ['component'],
+)
+
+PROCESS_READY = Gauge(
+    'recrutai_nlp_ready',
+    "Processus prêt à servir les analyses (préchauffage terminé)",
+)
+
+# ============================================
+# POOLS DE PROCESSUS (inference_server.py, executor.py)
+# ============================================
+
+PROCESS_POOL_RESTARTS = Counter(
+    'recrutai_nlp_process_pool_restarts_total',
+    "Pools de processus d'analyse recréés après la mort d'un processus (BrokenProcessPool)",
+    ['pool'],
+)
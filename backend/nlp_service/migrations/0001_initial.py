@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import nlp_service.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('endpoint', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duration_ms', models.FloatField()),
+                ('trigger', models.CharField(choices=[('header', 'En-tête (staff)'), ('sample', 'Échantillonnage')], max_length=10)),
+                ('kind', models.CharField(choices=[('cprofile', 'cProfile (.prof)'), ('sampling', 'Piles échantillonnées (.folded)')], max_length=10)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('summary', models.TextField(blank=True)),
+                ('file', models.FileField(storage=nlp_service.models.profile_storage, upload_to='%Y/%m/%d/')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profil de requête',
+                'verbose_name_plural': 'Profils de requêtes',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,3 +1,59 @@
+# nlp_service/models.py
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+
+def profile_storage():
+    """Profils hors de MEDIA_ROOT (servi publiquement) : NLP_PROFILING['DIR']"""
+    from .profiling import profiling_settings
+    return FileSystemStorage(location=profiling_settings()['DIR'])
+
+
+class RequestProfile(models.Model):
+    """Profil d'une requête capturé par nlp_service.profiling.profiling_middleware"""
+    TRIGGER_CHOICES = [
+        ('header', 'En-tête (staff)'),
+        ('sample', 'Échantillonnage'),
+    ]
+    KIND_CHOICES = [
+        ('cprofile', 'cProfile (.prof)'),
+        ('sampling', 'Piles échantillonnées (.folded)'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    endpoint = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='request_profiles')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    samples = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)
+    file = models.FileField(upload_to='%Y/%m/%d/', storage=profile_storage)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Profil de requête'
+        verbose_name_plural = 'Profils de requêtes'
+
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration_ms:.0f} ms ({self.created_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.file.name) if self.file else ''
+
 
-# Create your models here.
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_file(sender, instance, **kwargs):
+    # Aussi pour les suppressions en masse (admin, rétention)
+    if instance.file:
+        instance.file.delete(save=False)
@@ -0,0 +1,109 @@
+# nlp_service/ner.py
+"""
+Pipeline spaCy réduit à la reconnaissance d'entités.
+
+L'analyseur n'utilise que doc.ents : le parser, le morphologizer, le lemmatizer
+et l'attribute_ruler sont exclus au chargement (ni mémoire ni calcul), et les
+textes sont tronqués à MAX_CHARS avant le passage dans le modèle.
+
+Pour les traitements en masse (upload multiple, réanalyse), pipe_entities
+passe les textes par lots dans nlp.pipe (BATCH_SIZE, N_PROCESS).
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SPACY_DEFAULTS = {
+    'MODEL': 'fr_core_news_sm',
+    'MAX_CHARS': 20000,
+    'BATCH_SIZE': 32,
+    'N_PROCESS': 1,
+}
+
+# Composants inutiles pour doc.ents dans les pipelines *_core_news_* / *_core_web_*
+UNUSED_COMPONENTS = ['morphologizer', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter']
+
+# Labels retenus comme compétences potentielles
+SKILL_LABELS = ('ORG', 'PRODUCT', 'TECH')
+
+
+def spacy_settings():
+    """settings.NLP_SPACY complété par les valeurs par défaut (variables d'environnement hors Django)"""
+    config = {}
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_SPACY', {})
+    except ImportError:
+        pass
+
+    return {
+        'MODEL': config.get('MODEL') or os.environ.get('NLP_SPACY_MODEL', SPACY_DEFAULTS['MODEL']),
+        'MAX_CHARS': int(config.get('MAX_CHARS') or os.environ.get('NLP_SPACY_MAX_CHARS', SPACY_DEFAULTS['MAX_CHARS'])),
+        'BATCH_SIZE': int(config.get('BATCH_SIZE') or os.environ.get('NLP_SPACY_BATCH_SIZE', SPACY_DEFAULTS['BATCH_SIZE'])),
+        'N_PROCESS': int(config.get('N_PROCESS') or os.environ.get('NLP_SPACY_N_PROCESS', SPACY_DEFAULTS['N_PROCESS'])),
+    }
+
+
+def load_ner_pipeline(model=None, trimmed=True):
+    """
+    Charge le modèle spaCy ; avec trimmed=True seuls les composants nécessaires
+    à la NER sont conservés.
+
+    Raises:
+        ImportError / OSError si spaCy ou le modèle ne sont pas installés
+    """
+    import spacy
+
+    model = model or spacy_settings()['MODEL']
+    if not trimmed:
+        return spacy.load(model)
+
+    nlp = spacy.load(model, exclude=UNUSED_COMPONENTS)
+
+    # Le tok2vec partagé n'est utile que si la NER l'écoute (sinon elle a le sien)
+    if 'tok2vec' in nlp.pipe_names:
+        listeners = getattr(nlp.get_pipe('tok2vec'), 'listening_components', None)
+        if listeners is not None and 'ner' not in listeners:
+            nlp.remove_pipe('tok2vec')
+
+    logger.info(f"✅ Pipeline spaCy {model} réduit à : {', '.join(nlp.pipe_names)}")
+    return nlp
+
+
+def cap_text(text, max_chars=None):
+    """Tronque le texte (en fin de mot) avant la NER"""
+    max_chars = max_chars or spacy_settings()['MAX_CHARS']
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def doc_entities(doc, labels=SKILL_LABELS):
+    """Entités (texte, label) d'un Doc, limitées aux labels utiles"""
+    return [(ent.text, ent.label_) for ent in doc.ents if ent.label_ in labels]
+
+
+def pipe_entities(nlp, texts, batch_size=None, n_process=None, labels=SKILL_LABELS):
+    """
+    Entités d'un lot de textes via nlp.pipe, dans l'ordre des textes.
+
+    Args:
+        batch_size: textes par lot (défaut : NLP_SPACY['BATCH_SIZE'])
+        n_process: processus spaCy (défaut : NLP_SPACY['N_PROCESS'], -1 = tous les cœurs)
+    """
+    config = spacy_settings()
+    batch_size = batch_size or config['BATCH_SIZE']
+    n_process = n_process or config['N_PROCESS']
+
+    texts = [cap_text(text, config['MAX_CHARS']) for text in texts]
+    # Démarrer des processus ne vaut pas le coup pour un seul lot
+    if len(texts) <= batch_size:
+        n_process = 1
+
+    return [
+        doc_entities(doc, labels)
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    ]
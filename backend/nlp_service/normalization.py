@@ -0,0 +1,185 @@
+# nlp_service/normalization.py
+"""
+Normalisation des textes de l'analyseur et du modèle ML.
+
+Trois vues d'un même texte, chacune produite par un seul str.translate
+(tables précalculées) suivi de la fusion des espaces :
+
+- display_text : texte lisible (PDF extrait) — caractères non imprimables supprimés ;
+- match_text : recherche de compétences — minuscules, lettres accentuées et chiffres ;
+- ml_text / clean_for_model : entrée du modèle ML — minuscules, sans URLs, lettres ASCII.
+
+normalize() retourne les trois vues d'un coup.
+
+Pour le modèle, une seule définition sert à l'entraînement (prepare_data,
+streaming) et à l'inférence (CVJobMatcher.clean_text) : les deux côtés
+produisent exactement les mêmes tokens :
+
+- clean_for_model : un texte (inférence) ;
+- clean_for_model_series : une Series pandas ;
+- clean_texts : un lot découpé en blocs, répartis sur un pool de processus.
+
+La traduction par table est plus rapide que les opérations .str de pandas
+(quatre passes regex) : les lots sont traités texte par texte.
+"""
+import os
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+# Appliqué avant la mise en minuscules (faite par la table de traduction)
+URL_RE = re.compile(r'http\S+', re.IGNORECASE)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# ============================================
+# TABLES DE TRADUCTION
+# ============================================
+
+MATCH_CHARS = frozenset(string.ascii_letters + string.digits + 'àâäéèêëîïôöùûüÿçÀÂÄÉÈÊËÎÏÔÖÙÛÜŸÇ')
+ML_CHARS = frozenset(string.ascii_letters)
+
+# Au-delà, les caractères sont classés à chaque fois sans être mémorisés (table bornée)
+_TABLE_LIMIT = 0x10000
+
+
+class TranslationTable(dict):
+    """
+    Table pour str.translate, complétée à la demande : chaque caractère n'est
+    classé qu'une fois.
+
+    Les 256 premiers points de code sont aussi précalculés en table d'octets :
+    un texte Latin-1 (cas le plus courant) est traduit par bytes.translate,
+    sans aucun appel Python par caractère.
+    """
+
+    def __init__(self, classify):
+        super().__init__()
+        self.classify = classify
+
+        byte_table = bytearray(range(256))
+        byte_delete = bytearray()
+        for codepoint in range(256):
+            value = classify(chr(codepoint))
+            self[codepoint] = value
+            if value is None:
+                byte_delete.append(codepoint)
+            else:
+                # Les classements utilisés gardent un caractère Latin-1 dans Latin-1
+                byte_table[codepoint] = ord(value)
+        self.byte_table = bytes(byte_table)
+        self.byte_delete = bytes(byte_delete)
+
+    def __missing__(self, codepoint):
+        value = self.classify(chr(codepoint))
+        if codepoint < _TABLE_LIMIT:
+            self[codepoint] = value
+        return value
+
+    def translate(self, text):
+        try:
+            raw = text.encode('latin-1')
+        except UnicodeEncodeError:
+            return text.translate(self)
+        return raw.translate(self.byte_table, self.byte_delete).decode('latin-1')
+
+
+def _display_char(char):
+    if char.isspace():
+        return ' '
+    return char if char.isprintable() else None
+
+
+def _keep_lowered(allowed):
+    def classify(char):
+        if char.isspace():
+            return ' '
+        # lower() peut produire plusieurs caractères (ex. "İ")
+        return ''.join(c if c in allowed else ' ' for c in char.lower())
+    return classify
+
+
+DISPLAY_TABLE = TranslationTable(_display_char)
+MATCH_TABLE = TranslationTable(_keep_lowered(MATCH_CHARS))
+ML_TABLE = TranslationTable(_keep_lowered(ML_CHARS))
+
+
+def squash_spaces(text):
+    """Fusionne les blancs consécutifs en un espace et retire ceux des extrémités"""
+    return ' '.join(text.split())
+
+
+def display_text(text):
+    """Texte lisible : blancs fusionnés, caractères non imprimables supprimés"""
+    if not isinstance(text, str):
+        return ""
+    return squash_spaces(DISPLAY_TABLE.translate(text))
+
+
+def match_text(text):
+    """Texte de recherche : minuscules, lettres (accentuées comprises) et chiffres"""
+    if not isinstance(text, str):
+        return ""
+    return squash_spaces(MATCH_TABLE.translate(text))
+
+
+def ml_text(text):
+    """Minuscules, sans URLs, lettres ASCII uniquement, espaces fusionnés"""
+    if not isinstance(text, str):
+        return ""
+    return squash_spaces(ML_TABLE.translate(URL_RE.sub('', text)))
+
+
+class NormalizedText(NamedTuple):
+    display: str
+    match: str
+    ml: str
+
+
+def normalize(text):
+    """Les trois vues d'un texte (affichage, recherche, modèle ML)"""
+    return NormalizedText(display_text(text), match_text(text), ml_text(text))
+
+
+# ============================================
+# MODÈLE ML
+# ============================================
+
+# Vue ML : définition partagée par l'entraînement et l'inférence
+clean_for_model = ml_text
+
+
+def clean_for_model_series(series):
+    """clean_for_model appliqué à une Series pandas (les valeurs non textuelles deviennent "")"""
+    # Import local : l'inférence (clean_for_model) ne doit pas dépendre de pandas
+    import pandas as pd
+
+    return pd.Series(series, dtype=object).map(clean_for_model)
+
+
+def _clean_chunk(texts):
+    return [clean_for_model(text) for text in texts]
+
+
+def clean_texts(texts, n_jobs=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Nettoie un lot de textes et retourne une liste dans le même ordre.
+
+    Args:
+        n_jobs: nombre de processus (1 = dans le processus courant, -1 = tous les cœurs)
+        chunk_size: textes envoyés à chaque worker par tâche
+    """
+    texts = list(texts)
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs <= 1 or len(texts) <= chunk_size:
+        return _clean_chunk(texts)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as pool:
+        cleaned = []
+        for result in pool.map(_clean_chunk, chunks):
+            cleaned.extend(result)
+    return cleaned
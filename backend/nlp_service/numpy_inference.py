@@ -0,0 +1,305 @@
+# nlp_service/numpy_inference.py
+"""
+Format d'inférence NumPy (.npz) pour CVJobMatcher, sans scikit-learn.
+
+L'inférence ne demande qu'une transformation TF-IDF, des produits scalaires et
+la décision du classifieur : on exporte le vocabulaire, l'IDF et les poids dans
+des tableaux NumPy simples, chargés avec allow_pickle=False (aucun code exécuté
+au chargement). NumpyMatcher expose la même interface que CVJobMatcher
+(predict_category, predict_categories, calculate_match_score(s), warm_up).
+
+Classifieurs supportés : tfidf_linear (softmax), tfidf_centroid (score
+discriminant) et tfidf_rf (arbres aplatis, parcours vectorisé).
+"""
+import json
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from .normalization import clean_for_model
+
+NUMPY_FORMAT_VERSION = 1
+
+WARMUP_CV_TEXT = "Software engineer with 5 years of experience in Python, Django and SQL."
+WARMUP_JOB_TEXT = "We are hiring a Python developer with Django, REST API and SQL experience."
+
+
+# ============================================
+# EXPORT (nécessite le modèle scikit-learn)
+# ============================================
+
+def export_matcher(matcher, path):
+    """
+    Convertit un CVJobMatcher TF-IDF entraîné en fichier .npz.
+
+    Returns:
+        métadonnées écrites dans le fichier
+    """
+    vectorizer = matcher.vectorizer
+    classifier = matcher.classifier
+    if not hasattr(vectorizer, 'vocabulary_'):
+        raise ValueError(f"Export NumPy non supporté pour le type {matcher.model_type} (TF-IDF uniquement)")
+    if vectorizer.analyzer != 'word' or vectorizer.strip_accents or vectorizer.sublinear_tf or vectorizer.norm != 'l2':
+        raise ValueError("Export NumPy : seul le TfidfVectorizer 'word' / l2 par défaut est supporté")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    arrays = {
+        'terms': np.array(terms, dtype=str),
+        'idf': _idf(vectorizer),
+        'stop_words': np.array(sorted(vectorizer.get_stop_words() or []), dtype=str),
+        # Noms de catégories dans l'ordre des colonnes de probabilités
+        'categories': np.array(
+            [str(c) for c in matcher.label_encoder.inverse_transform(classifier.classes_)], dtype=str
+        ),
+    }
+
+    kind = type(classifier).__name__
+    if kind == 'LogisticRegression':
+        arrays['coef'] = np.asarray(classifier.coef_, dtype=np.float64)
+        arrays['intercept'] = np.asarray(classifier.intercept_, dtype=np.float64)
+    elif kind == 'NearestCentroid':
+        if classifier.metric != 'euclidean':
+            raise ValueError("Export NumPy : NearestCentroid euclidien uniquement")
+        std = np.asarray(classifier.within_class_std_dev_, dtype=np.float64)
+        scale = np.where(std != 0, std, 1.0)
+        arrays['centroids'] = np.asarray(classifier.centroids_, dtype=np.float64) / scale
+        arrays['inv_scale'] = 1.0 / scale
+        arrays['log_prior'] = 2.0 * np.log(np.asarray(classifier.class_prior_, dtype=np.float64))
+    elif kind == 'RandomForestClassifier':
+        arrays.update(_flatten_forest(classifier))
+    else:
+        raise ValueError(f"Export NumPy : classifieur {kind} non supporté")
+
+    meta = {
+        'format_version': NUMPY_FORMAT_VERSION,
+        'model_type': matcher.model_type,
+        'classifier': kind,
+        'token_pattern': vectorizer.token_pattern,
+        'lowercase': bool(vectorizer.lowercase),
+        'ngram_range': list(vectorizer.ngram_range),
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    return meta
+
+
+def _idf(vectorizer):
+    try:
+        return np.asarray(vectorizer.idf_, dtype=np.float64)
+    except AttributeError:
+        # Pickles scikit-learn < 1.5 : IDF stocké en matrice diagonale
+        return np.asarray(vectorizer._tfidf._idf_diag.diagonal(), dtype=np.float64)
+
+
+def _flatten_forest(forest):
+    """Concatène les arbres en tableaux plats (indices globaux, -1 pour les feuilles)"""
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        value = tree.value[:, 0, :].astype(np.float64)
+        # Proportions par feuille (les anciens pickles stockent des effectifs)
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree.node_count
+
+    return {
+        'tree_left': np.concatenate(lefts).astype(np.int32),
+        'tree_right': np.concatenate(rights).astype(np.int32),
+        'tree_feature': np.concatenate(features).astype(np.int32),
+        'tree_threshold': np.concatenate(thresholds).astype(np.float64),
+        'tree_value': np.concatenate(values),
+        'tree_roots': np.array(roots, dtype=np.int32),
+    }
+
+
+# ============================================
+# INFÉRENCE (NumPy uniquement)
+# ============================================
+
+class NumpyMatcher:
+    """Inférence TF-IDF + classifieur à partir d'un export .npz"""
+
+    def __init__(self, arrays):
+        """arrays : dictionnaire nom -> tableau NumPy, tel qu'écrit par export_matcher"""
+        self.meta = json.loads(str(arrays['meta']))
+        if self.meta.get('format_version') != NUMPY_FORMAT_VERSION:
+            raise ValueError(f"Format NumPy non supporté : {self.meta.get('format_version')}")
+
+        self.model_type = self.meta['model_type']
+        self.classifier_kind = self.meta['classifier']
+        self.vocabulary = {term: index for index, term in enumerate(arrays['terms'].tolist())}
+        self.n_features = len(self.vocabulary)
+        self.stop_words = frozenset(arrays['stop_words'].tolist())
+        self.token_re = re.compile(self.meta['token_pattern'])
+        self.ngram_range = tuple(self.meta['ngram_range'])
+        self.categories = arrays['categories']
+        self.arrays = {name: value for name, value in arrays.items() if name not in ('meta', 'terms', 'stop_words')}
+        self.idf = self.arrays['idf']
+
+        if self.classifier_kind == 'NearestCentroid':
+            centroids = self.arrays['centroids']
+            self.arrays['centroid_sq_norms'] = np.einsum('ij,ij->i', centroids, centroids)
+
+    @classmethod
+    def load(cls, path):
+        # allow_pickle=False : le fichier ne contient que des tableaux, jamais d'objets
+        with np.load(path, allow_pickle=False) as npz:
+            instance = cls({name: npz[name] for name in npz.files})
+        print(f"✅ Modèle NumPy chargé : {path} ({instance.model_type})")
+        return instance
+
+    def clean_text(self, text):
+        return clean_for_model(text)
+
+    # ----- TF-IDF -----
+
+    def _terms(self, text):
+        """Mêmes n-grammes que l'analyseur 'word' de scikit-learn"""
+        if self.meta['lowercase']:
+            text = text.lower()
+        tokens = [t for t in self.token_re.findall(text) if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def vectorize(self, text):
+        """Vecteur TF-IDF normalisé L2, au format creux (indices triés, valeurs)"""
+        counts = Counter(
+            index for index in map(self.vocabulary.get, self._terms(text)) if index is not None
+        )
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        indices = np.fromiter(sorted(counts), dtype=np.int64, count=len(counts))
+        values = np.array([counts[i] for i in indices.tolist()], dtype=np.float64) * self.idf[indices]
+        norm = np.sqrt(np.dot(values, values))
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    # ----- Classifieur -----
+
+    def _probabilities(self, vectors):
+        """Probabilités (n_docs, n_categories) pour une liste de vecteurs creux"""
+        kind = self.classifier_kind
+        if kind == 'LogisticRegression':
+            coef, intercept = self.arrays['coef'], self.arrays['intercept']
+            scores = np.array([coef[:, idx] @ val for idx, val in vectors]) + intercept
+            if coef.shape[0] == 1:
+                positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+                return np.column_stack([1.0 - positive, positive])
+            return _softmax(scores)
+
+        if kind == 'NearestCentroid':
+            centroids = self.arrays['centroids']
+            inv_scale = self.arrays['inv_scale']
+            rows = []
+            for idx, val in vectors:
+                x = val * inv_scale[idx]
+                # ||x - c||² = ||x||² - 2 x·c + ||c||²
+                distances = np.dot(x, x) - 2.0 * (centroids[:, idx] @ x) + self.arrays['centroid_sq_norms']
+                rows.append(self.arrays['log_prior'] - distances)
+            return _softmax(np.array(rows))
+
+        return self._forest_probabilities(vectors)
+
+    def _forest_probabilities(self, vectors):
+        arrays = self.arrays
+        left, right = arrays['tree_left'], arrays['tree_right']
+        feature, threshold = arrays['tree_feature'], arrays['tree_threshold']
+        roots = arrays['tree_roots']
+
+        # Les arbres scikit-learn comparent des features float32
+        dense = np.zeros((len(vectors), self.n_features), dtype=np.float32)
+        for row, (idx, val) in enumerate(vectors):
+            dense[row, idx] = val
+
+        nodes = np.broadcast_to(roots, (len(vectors), len(roots))).copy()
+        rows = np.arange(len(vectors))[:, None]
+        while True:
+            active = left[nodes] != -1
+            if not active.any():
+                break
+            go_left = dense[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(active, np.where(go_left, left[nodes], right[nodes]), nodes)
+
+        return arrays['tree_value'][nodes].mean(axis=1)
+
+    # ----- Interface CVJobMatcher -----
+
+    def predict_categories(self, cv_texts):
+        vectors = [self.vectorize(self.clean_text(text)) for text in cv_texts]
+        if not vectors:
+            return []
+        probabilities = self._probabilities(vectors)
+        best = probabilities.argmax(axis=1)
+        return [
+            (str(self.categories[i]), float(probabilities[row, i]))
+            for row, i in enumerate(best.tolist())
+        ]
+
+    def predict_category(self, cv_text):
+        return self.predict_categories([cv_text])[0]
+
+    def calculate_match_score(self, cv_text, job_description):
+        cv_idx, cv_val = self.vectorize(self.clean_text(cv_text))
+        job_idx, job_val = self.vectorize(self.clean_text(job_description))
+        _, cv_pos, job_pos = np.intersect1d(cv_idx, job_idx, assume_unique=True, return_indices=True)
+        similarity = float(cv_val[cv_pos] @ job_val[job_pos])
+        return round(min(similarity * 100, 100), 2)
+
+    def calculate_match_scores(self, pairs):
+        vectors = {}
+        for text in (text for pair in pairs for text in pair):
+            if text not in vectors:
+                vectors[text] = self.vectorize(self.clean_text(text))
+
+        scores = []
+        for cv_text, job_description in pairs:
+            (cv_idx, cv_val), (job_idx, job_val) = vectors[cv_text], vectors[job_description]
+            _, cv_pos, job_pos = np.intersect1d(cv_idx, job_idx, assume_unique=True, return_indices=True)
+            scores.append(round(min(float(cv_val[cv_pos] @ job_val[job_pos]) * 100, 100), 2))
+        return scores
+
+    def warm_up(self):
+        start = time.perf_counter()
+        self.predict_category(WARMUP_CV_TEXT)
+        self.calculate_match_score(WARMUP_CV_TEXT, WARMUP_JOB_TEXT)
+        return time.perf_counter() - start
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def compare(matcher, numpy_matcher, texts, job_description=WARMUP_JOB_TEXT):
+    """Écarts entre le modèle scikit-learn et son export NumPy sur des textes donnés"""
+    expected = matcher.predict_categories(texts)
+    actual = numpy_matcher.predict_categories(texts)
+    score_diffs = [
+        abs(matcher.calculate_match_score(text, job_description) - numpy_matcher.calculate_match_score(text, job_description))
+        for text in texts
+    ]
+    return {
+        'texts': len(texts),
+        'category_mismatches': sum(e[0] != a[0] for e, a in zip(expected, actual)),
+        'max_confidence_diff': max((abs(float(e[1]) - a[1]) for e, a in zip(expected, actual)), default=0.0),
+        'max_match_score_diff': max(score_diffs, default=0.0),
+    }
@@ -0,0 +1,296 @@
+# nlp_service/profiling.py
+"""
+Profilage à la demande des requêtes de production.
+
+Les analyses lentes dépendent souvent d'un CV précis : profiling_middleware
+capture le profil de la requête réelle et l'enregistre (RequestProfile +
+fichier dans NLP_PROFILING['DIR'], hors MEDIA_ROOT), téléchargeable depuis
+l'admin Django. Déclenchement :
+
+- en-tête X-Profile: 1 envoyé par un utilisateur staff (JWT ou session) ;
+- échantillonnage aléatoire de SAMPLE_RATE des requêtes.
+
+Deux formats selon le mode du serveur :
+
+- WSGI (vue exécutée dans le thread du middleware) : cProfile, fichier .prof
+  (pstats, snakeviz) ;
+- ASGI (Daphne) : la vue sync et l'analyseur tournent dans d'autres threads,
+  que cProfile ne voit pas. Un thread échantillonne toutes les piles toutes
+  les INTERVAL_MS millisecondes et produit des piles repliées (.folded,
+  flamegraph.pl / speedscope). Les threads en attente sont ignorés ; les
+  requêtes concurrentes apparaissent aussi dans le profil.
+
+Désactivé (ENABLED = False), le middleware n'est pas chargé.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.utils.decorators import sync_and_async_middleware
+
+from .stages import endpoint_label
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'HEADER': 'X-Profile',
+    'DIR': 'profiles',
+    'INTERVAL_MS': 5.0,
+    'MAX_PROFILES': 500,
+}
+
+# Dernière fonction Python d'un thread bloqué en attente (verrou, file, socket)
+IDLE_FRAMES = frozenset({
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+    ('socket.py', 'accept'),
+    ('connection.py', '_recv'),
+    ('connection.py', 'poll'),
+})
+
+SUMMARY_LINES = 40
+
+
+def profiling_settings():
+    """settings.NLP_PROFILING complété par les valeurs par défaut"""
+    from django.conf import settings
+
+    config = {**PROFILING_DEFAULTS, **getattr(settings, 'NLP_PROFILING', {})}
+    if not os.path.isabs(config['DIR']):
+        config['DIR'] = os.path.join(settings.BASE_DIR, config['DIR'])
+    return config
+
+
+# ============================================
+# ÉCHANTILLONNEUR DE PILES
+# ============================================
+
+def frame_label(code):
+    directory, filename = os.path.split(code.co_filename)
+    return f"{os.path.basename(directory)}/{filename}:{code.co_name}"
+
+
+class StackSampler:
+    """Échantillonne les piles de tous les threads actifs (hors lui-même) dans un thread démon"""
+
+    def __init__(self, interval_ms=PROFILING_DEFAULTS['INTERVAL_MS']):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='nlp-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Format 'f1;f2;f3 N' (une pile par ligne)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=SUMMARY_LINES):
+        """Fonctions les plus présentes : en propre (sommet de pile) et au total"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+
+        seen = sum(self.stacks.values()) or 1
+        lines = [f"{self.samples} échantillons ({self.interval * 1000:.0f} ms), {seen} piles actives", '',
+                 'propre  total  fonction']
+        for label, count in own.most_common(limit):
+            lines.append(f"{count / seen:6.1%} {total[label] / seen:6.1%}  {label}")
+        return '\n'.join(lines)
+
+
+# ============================================
+# DÉCLENCHEMENT ET ENREGISTREMENT
+# ============================================
+
+def token_user_id(request):
+    """Identifiant utilisateur du token JWT validé (sans accès base), ou None"""
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    try:
+        return AccessToken(parts[1])[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+def requested_by_staff(request, user_id):
+    """Utilisateur staff (token JWT, sinon session) ; accès base, à n'appeler qu'avec l'en-tête"""
+    from django.contrib.auth import get_user_model
+
+    if user_id is not None:
+        return get_user_model().objects.filter(pk=user_id, is_staff=True, is_active=True).exists()
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def header_requested(request, config):
+    return bool(request.headers.get(config['HEADER']))
+
+
+def sampled(config):
+    return bool(config['SAMPLE_RATE']) and random.random() < config['SAMPLE_RATE']
+
+
+def save_profile(request, response, trigger, user_id, duration, kind, content, summary, samples=0, config=None):
+    """Enregistre le profil ; les erreurs sont journalisées, jamais renvoyées au client"""
+    from .models import RequestProfile
+
+    config = config or profiling_settings()
+    extension = 'prof' if kind == 'cprofile' else 'folded'
+    endpoint = endpoint_label(request)
+    try:
+        profile = RequestProfile(
+            method=request.method,
+            path=request.path[:500],
+            endpoint=endpoint[:200],
+            user_id=user_id,
+            status_code=getattr(response, 'status_code', None),
+            duration_ms=round(duration * 1000, 3),
+            trigger=trigger,
+            kind=kind,
+            samples=samples,
+            summary=summary,
+        )
+        profile.file.save(f"{time.strftime('%H%M%S')}_{endpoint}.{extension}", ContentFile(content), save=False)
+        profile.save()
+        prune_profiles(config['MAX_PROFILES'])
+    except Exception as e:
+        logger.error(f"❌ Profil de {request.path} non enregistré: {e}")
+        return None
+
+    logger.info(f"🔬 Profil {profile.pk} enregistré : {request.method} {request.path} ({duration * 1000:.0f} ms)")
+    return profile
+
+
+def prune_profiles(max_profiles):
+    """Supprime les profils les plus anciens au-delà de max_profiles (fichiers compris)"""
+    from .models import RequestProfile
+
+    stale = RequestProfile.objects.order_by('-created_at').values_list('pk', flat=True)[max_profiles:]
+    stale_ids = list(stale)
+    if stale_ids:
+        for profile in RequestProfile.objects.filter(pk__in=stale_ids):
+            profile.delete()
+
+
+def cprofile_content(profiler):
+    """Fichier .prof (format de pstats.dump_stats) et résumé par temps cumulé"""
+    stream = io.StringIO()
+    # Stats() reprend les statistiques du profiler (et les lui retire)
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    return marshal.dumps(stats.stats), stream.getvalue()
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    config = profiling_settings()
+    if not config['ENABLED']:
+        raise MiddlewareNotUsed()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            user_id, trigger = token_user_id(request), None
+            # Accès base (thread sync) seulement si l'en-tête est présent
+            if header_requested(request, config) and await sync_to_async(requested_by_staff)(request, user_id):
+                trigger = 'header'
+            elif sampled(config):
+                trigger = 'sample'
+            if trigger is None:
+                return await get_response(request)
+
+            sampler = StackSampler(config['INTERVAL_MS']).start()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = await get_response(request)
+            finally:
+                duration = time.perf_counter() - start
+                sampler.stop()
+                profile = await sync_to_async(save_profile)(
+                    request, response, trigger, user_id, duration, 'sampling',
+                    sampler.folded().encode('utf-8'), sampler.summary(), sampler.samples, config,
+                )
+            if profile is not None:
+                response['X-Profile-Id'] = str(profile.pk)
+            return response
+    else:
+        def middleware(request):
+            user_id, trigger = token_user_id(request), None
+            if header_requested(request, config) and requested_by_staff(request, user_id):
+                trigger = 'header'
+            elif sampled(config):
+                trigger = 'sample'
+            if trigger is None:
+                return get_response(request)
+
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            response = None
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+                duration = time.perf_counter() - start
+                content, summary = cprofile_content(profiler)
+                profile = save_profile(request, response, trigger, user_id, duration, 'cprofile',
+                                       content, summary, config=config)
+            if profile is not None:
+                response['X-Profile-Id'] = str(profile.pk)
+            return response
+
+    return middleware
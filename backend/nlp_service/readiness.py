@@ -0,0 +1,139 @@
+# nlp_service/readiness.py
+"""
+État de démarrage de l'analyseur, pour la sonde de readiness.
+
+Sans cet état, /health/ répond dès que Django tourne : Kubernetes envoie du
+trafic à un pod qui charge encore spaCy, le lexique et le modèle ML, et les
+premières requêtes paient le démarrage à froid. Ici, chaque composant note
+son chargement (startup_component) :
+
+- ml_model / ml_warm_up : chargement et inférence factice du modèle ML ;
+- spacy : pipeline NER ;
+- lexicon : compétences extraites du dataset ;
+- cache : cache de l'analyseur (connexion Redis) ;
+- warm_up : analyse factice complète (warm_up_analyzer).
+
+Le processus est prêt quand warm_up a réussi et que chaque composant de
+NLP_READINESS_REQUIRED est chargé. Les autres composants peuvent manquer
+(spaCy non installé, pas de modèle : 'skipped') ou échouer (statut
+'degraded') : l'analyseur a des replis et reste prêt. Les durées sont
+exportées en métriques Prometheus.
+"""
+import contextlib
+import logging
+import os
+import threading
+import time
+
+from .metrics import COMPONENT_READY, PROCESS_READY, STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+LOADING, READY, SKIPPED, FAILED = 'loading', 'ready', 'skipped', 'failed'
+
+_components = {}
+_lock = threading.Lock()
+_process_start = time.monotonic()
+_ready_since = None
+_warm_up_thread = None
+
+
+def required_components():
+    """settings.NLP_READINESS_REQUIRED (variable d'environnement hors Django)"""
+    try:
+        from django.conf import settings
+        if settings.configured and hasattr(settings, 'NLP_READINESS_REQUIRED'):
+            return tuple(settings.NLP_READINESS_REQUIRED)
+    except ImportError:
+        pass
+    return tuple(filter(None, os.environ.get('NLP_READINESS_REQUIRED', '').split(',')))
+
+
+def record_component(name, state, seconds=None, error=None):
+    """Enregistre l'état d'un composant (et sa durée de chargement)"""
+    with _lock:
+        _components[name] = {
+            'state': state,
+            'seconds': round(seconds, 4) if seconds is not None else None,
+            'error': error,
+        }
+    COMPONENT_READY.labels(name).set(1 if state in (READY, SKIPPED) else 0)
+    if seconds is not None:
+        STARTUP_SECONDS.labels(name).set(seconds)
+    if name == 'warm_up' and state == READY:
+        _mark_ready()
+
+
+@contextlib.contextmanager
+def startup_component(name):
+    """Chronomètre le bloc ; état 'failed' si une exception en sort (relancée)"""
+    record_component(name, LOADING)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_component(name, FAILED, time.perf_counter() - start, str(e))
+        raise
+    record_component(name, READY, time.perf_counter() - start)
+
+
+def _mark_ready():
+    global _ready_since
+    if _ready_since is None:
+        _ready_since = time.monotonic()
+        STARTUP_SECONDS.labels('total').set(_ready_since - _process_start)
+        PROCESS_READY.set(1)
+
+
+def readiness():
+    """
+    Returns:
+        (prêt, détail) : détail = statut, composants, secondes depuis le démarrage du processus
+    """
+    with _lock:
+        components = {name: dict(info) for name, info in _components.items()}
+
+    warm_up = components.get('warm_up', {}).get('state')
+    missing = [name for name in required_components() if components.get(name, {}).get('state') != READY]
+    failed = [name for name, info in components.items() if info['state'] == FAILED]
+
+    unavailable = [name for name in missing if components.get(name, {}).get('state') in (FAILED, SKIPPED)]
+
+    if warm_up == FAILED or unavailable:
+        status = 'failed'
+    elif warm_up != READY or missing:
+        status = 'loading'
+    else:
+        status = 'degraded' if failed else 'ready'
+    ready = status in ('ready', 'degraded')
+    PROCESS_READY.set(1 if ready else 0)
+
+    return ready, {
+        'status': status,
+        'components': components,
+        'missing': missing,
+        'uptime_s': round(time.monotonic() - _process_start, 3),
+        'startup_s': round(_ready_since - _process_start, 3) if _ready_since is not None else None,
+    }
+
+
+def start_warm_up():
+    """
+    Lance warm_up_analyzer dans un thread d'arrière-plan (une seule fois par processus,
+    relancé après un échec) ; le worker répond déjà aux sondes pendant le chargement
+    """
+    global _warm_up_thread
+    with _lock:
+        if _ready_since is not None or (_warm_up_thread is not None and _warm_up_thread.is_alive()):
+            return False
+
+        def run():
+            from .analyzer import warm_up_analyzer
+            try:
+                warm_up_analyzer()
+            except Exception as e:
+                logger.error(f"❌ Préchauffage de l'analyseur impossible: {e}")
+
+        _warm_up_thread = threading.Thread(target=run, name='nlp-warm-up', daemon=True)
+        _warm_up_thread.start()
+    return True
@@ -0,0 +1,250 @@
+# nlp_service/registry.py
+"""
+Registre de modèles versionnés et rechargement à chaud.
+
+Organisation sur disque (volume partagé entre les workers) :
+
+    <ROOT>/versions/<version>/   artefact CVJobMatcher (model.joblib + manifest.json)
+    <ROOT>/ACTIVE                nom de la version servie
+
+Promouvoir une version réécrit ACTIVE de façon atomique et publie un message
+Redis (si configuré). Chaque worker surveille ACTIVE (et le canal pub/sub) dans
+un thread d'arrière-plan, charge la nouvelle version, la préchauffe puis
+remplace le modèle en une seule affectation : les requêtes en cours ne sont
+jamais bloquées.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = 'ACTIVE'
+VERSIONS_DIR = 'versions'
+MANIFEST_FILE = 'manifest.json'
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(__file__), 'models', 'registry')
+DEFAULT_CHANNEL = 'recrutai:nlp:model-promoted'
+DEFAULT_WATCH_INTERVAL = 5.0
+
+VERSION_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def registry_settings():
+    """Configuration du registre : settings.NLP_MODEL_REGISTRY, sinon variables d'environnement"""
+    config = {}
+    redis_url = os.environ.get('REDIS_URL', '')
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config = getattr(settings, 'NLP_MODEL_REGISTRY', {})
+            redis_url = getattr(settings, 'REDIS_URL', redis_url)
+    except ImportError:
+        pass
+
+    return {
+        'ROOT': config.get('ROOT') or os.environ.get('NLP_MODEL_REGISTRY_DIR', DEFAULT_ROOT),
+        'WATCH': config.get('WATCH', True),
+        'WATCH_INTERVAL': float(config.get('WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL)),
+        'CHANNEL': config.get('CHANNEL', DEFAULT_CHANNEL),
+        'REDIS_URL': config.get('REDIS_URL', redis_url),
+    }
+
+
+def local_version(path, chunk_size=1024 * 1024):
+    """
+    Version d'un modèle chargé hors registre (NLP_MODEL_PATH, artefact, .npz, pickle) :
+    empreinte sha256 du manifest d'un artefact (qui contient celle du modèle) ou du
+    fichier lui-même. Deux modèles différents n'ont jamais la même version, et les
+    pods servant le même fichier partagent leurs entrées de cache.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_FILE)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return f"local-{digest.hexdigest()[:16]}"
+
+
+class ModelRegistry:
+    """Dossier d'artefacts versionnés + pointeur vers la version active"""
+
+    def __init__(self, root=None, redis_url=None, channel=DEFAULT_CHANNEL):
+        self.root = str(root or registry_settings()['ROOT'])
+        self.redis_url = redis_url
+        self.channel = channel
+
+    @classmethod
+    def from_settings(cls):
+        config = registry_settings()
+        return cls(config['ROOT'], redis_url=config['REDIS_URL'], channel=config['CHANNEL'])
+
+    @property
+    def active_file(self):
+        return os.path.join(self.root, ACTIVE_FILE)
+
+    def version_path(self, version):
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def list_versions(self):
+        """Versions disponibles (ordre alphabétique = chronologique pour les noms par défaut)"""
+        directory = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name for name in os.listdir(directory)
+            if os.path.exists(os.path.join(directory, name, MANIFEST_FILE))
+        )
+
+    def active_version(self):
+        try:
+            with open(self.active_file, encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def active_path(self):
+        """Dossier de l'artefact actif, ou None si le registre est vide"""
+        version = self.active_version()
+        if version and os.path.exists(os.path.join(self.version_path(version), MANIFEST_FILE)):
+            return self.version_path(version)
+        return None
+
+    def register(self, source, version=None):
+        """
+        Copie un artefact (dossier produit par save_artifact) dans le registre.
+
+        Returns:
+            nom de la version créée
+        """
+        if not os.path.exists(os.path.join(source, MANIFEST_FILE)):
+            raise ValueError(f"{source} n'est pas un artefact (manifest.json manquant)")
+
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+        if not VERSION_RE.match(version):
+            raise ValueError(f"Nom de version invalide : {version}")
+
+        target = self.version_path(version)
+        if os.path.exists(target):
+            raise ValueError(f"La version {version} existe déjà")
+
+        # Copie dans un dossier temporaire puis renommage : jamais de version à moitié copiée
+        tmp_target = target + '.tmp'
+        shutil.rmtree(tmp_target, ignore_errors=True)
+        shutil.copytree(source, tmp_target)
+        os.replace(tmp_target, target)
+
+        logger.info(f"📦 Version {version} enregistrée depuis {source}")
+        return version
+
+    def promote(self, version):
+        """Rend une version active (écriture atomique du pointeur + notification des workers)"""
+        if version not in self.list_versions():
+            raise ValueError(f"Version inconnue : {version}")
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.active_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, self.active_file)
+
+        logger.info(f"🚀 Version {version} promue")
+        self._publish(version)
+        return version
+
+    def _publish(self, version):
+        if not self.redis_url:
+            return
+        try:
+            import redis
+            redis.Redis.from_url(self.redis_url).publish(self.channel, version)
+        except Exception as e:
+            # Les workers détecteront quand même le changement en surveillant ACTIVE
+            logger.warning(f"Notification Redis impossible ({self.channel}): {e}")
+
+
+class ModelReloader:
+    """
+    Thread d'arrière-plan qui détecte un changement de version active
+    (pub/sub Redis, sinon scrutation du fichier ACTIVE) et appelle
+    on_change(version, path) hors du chemin des requêtes.
+    """
+
+    def __init__(self, registry, on_change, interval=DEFAULT_WATCH_INTERVAL, current_version=None):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self.current_version = current_version
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='nlp-model-reloader', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Recharge si la version active a changé ; retourne True en cas de swap"""
+        version = self.registry.active_version()
+        path = self.registry.active_path()
+        if not version or not path or version == self.current_version:
+            return False
+
+        # Version notée même en cas d'échec : elle n'est pas rechargée à chaque scrutation
+        self.current_version = version
+        try:
+            self.on_change(version, path)
+        except Exception as e:
+            # On garde l'ancien modèle ; nouvel essai au prochain changement de version
+            logger.error(f"❌ Échec du rechargement de la version {version}: {e}")
+            return False
+        return True
+
+    def _run(self):
+        pubsub = self._subscribe()
+        while not self._stop.is_set():
+            if pubsub is not None:
+                try:
+                    # Attend un message au plus `interval` secondes
+                    pubsub.get_message(ignore_subscribe_messages=True, timeout=self.interval)
+                except Exception as e:
+                    logger.warning(f"Pub/sub Redis interrompu, scrutation du fichier uniquement: {e}")
+                    pubsub = None
+            else:
+                self._stop.wait(self.interval)
+            self.check()
+
+    def _subscribe(self):
+        if not self.registry.redis_url:
+            return None
+        try:
+            import redis
+            pubsub = redis.Redis.from_url(self.registry.redis_url).pubsub()
+            pubsub.subscribe(self.registry.channel)
+            return pubsub
+        except Exception as e:
+            logger.warning(f"Abonnement Redis impossible ({self.registry.channel}): {e}")
+            return None
+
+
+def start_reloader(on_change, current_version=None):
+    """Démarre la surveillance du registre selon la configuration (None si désactivée)"""
+    config = registry_settings()
+    if not config['WATCH']:
+        return None
+
+    registry = ModelRegistry.from_settings()
+    return ModelReloader(
+        registry,
+        on_change,
+        interval=config['WATCH_INTERVAL'],
+        current_version=current_version,
+    ).start()
@@ -0,0 +1,136 @@
+# nlp_service/stages.py
+"""
+Latence par étape du pipeline d'analyse, libellée par endpoint.
+
+django_prometheus ne mesure que la requête HTTP entière. Ici :
+
+- @timed_stage('pdf') sur les méthodes de l'analyseur (PDF, compétences,
+  expérience, catégorie, compatibilité, score ML, résumé) ;
+- les requêtes SQL d'écriture / de lecture (execute_wrapper installé sur chaque
+  connexion), étapes 'db_write' et 'db_read' ;
+- stage_endpoint_middleware place le nom d'URL de la requête dans un
+  ContextVar, repris comme label 'endpoint' ('background' hors requête).
+
+Les étapes s'imbriquent (calculate_compatibility appelle extract_skills) :
+chaque histogramme mesure l'appel complet de son étape.
+
+Désactivé (NLP_STAGE_METRICS = False), timed_stage retourne la fonction
+d'origine et le middleware n'est pas chargé : aucun surcoût par appel.
+Avec le service d'inférence, les étapes de l'analyseur sont mesurées dans ses
+processus et ne sont pas exportées par les workers web.
+"""
+import contextvars
+import functools
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import STAGE_ERRORS, STAGE_LATENCY
+
+BACKGROUND_ENDPOINT = 'background'
+
+current_endpoint = contextvars.ContextVar('nlp_stage_endpoint', default=BACKGROUND_ENDPOINT)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def stage_metrics_enabled():
+    """settings.NLP_STAGE_METRICS (variable d'environnement hors Django)"""
+    try:
+        from django.conf import settings
+        if settings.configured and hasattr(settings, 'NLP_STAGE_METRICS'):
+            return bool(settings.NLP_STAGE_METRICS)
+    except ImportError:
+        pass
+    return os.environ.get('NLP_STAGE_METRICS', 'True') == 'True'
+
+
+def observe(stage, seconds, failed=False):
+    endpoint = current_endpoint.get()
+    STAGE_LATENCY.labels(stage, endpoint).observe(seconds)
+    if failed:
+        STAGE_ERRORS.labels(stage, endpoint).inc()
+
+
+def timed_stage(stage):
+    """Mesure la durée (et les exceptions) de la fonction décorée sous l'étape `stage`"""
+    def decorator(func):
+        if not stage_metrics_enabled():
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                observe(stage, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
+
+
+# ============================================
+# BASE DE DONNÉES
+# ============================================
+
+def sql_stage_wrapper(execute, sql, params, many, context):
+    """execute_wrapper Django : étape db_write (INSERT/UPDATE/DELETE) ou db_read"""
+    stage = 'db_write' if sql.lstrip()[:6].upper() in WRITE_STATEMENTS else 'db_read'
+    start = time.perf_counter()
+    failed = True
+    try:
+        result = execute(sql, params, many, context)
+        failed = False
+        return result
+    finally:
+        observe(stage, time.perf_counter() - start, failed)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """Signal connection_created : une fois par nouvelle connexion"""
+    if sql_stage_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_stage_wrapper)
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+def endpoint_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unknown'
+    return match.url_name or match.view_name or 'unknown'
+
+
+@sync_and_async_middleware
+def stage_endpoint_middleware(get_response):
+    """Label 'endpoint' des étapes mesurées pendant la requête (sync et async)"""
+    if not stage_metrics_enabled():
+        raise MiddlewareNotUsed()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = current_endpoint.set(endpoint_label(request))
+            try:
+                return await get_response(request)
+            finally:
+                current_endpoint.reset(token)
+    else:
+        def middleware(request):
+            token = current_endpoint.set(endpoint_label(request))
+            try:
+                return get_response(request)
+            finally:
+                current_endpoint.reset(token)
+    return middleware
@@ -1,3 +1,516 @@
-from django.test import TestCase
+import contextlib
+import json
+import os
+import pickle
+import random
+import re
+import sys
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import cache as nlp_cache
+from .analyzer import MLCVAnalyzer, ServedModel
+from .batching import MicroBatcher
+from .benchmarks import quiet
+from .cache import LRUCache, TwoTierCache, cached
+from .normalization import clean_for_model_series, display_text, match_text, ml_text
+from .numpy_inference import NumpyMatcher, compare, export_matcher
+from .registry import ModelRegistry, ModelReloader, local_version
+
+
+class FakeModelAnalyzer:
+    """Objet minimal pour @cached(model_dependent=True) : version servie + compteur d'appels"""
+
+    def __init__(self, version):
+        self.model_version = version
+        self.calls = 0
+
+    @contextlib.contextmanager
+    def model_snapshot(self):
+        yield mock.Mock(version=self.model_version)
+
+    @cached('compatibility', model_dependent=True)
+    def score(self, cv_text, job_text):
+        self.calls += 1
+        return f"{self.model_version}:{cv_text}:{job_text}"
+
+
+class CacheTests(SimpleTestCase):
+    """LRU borné en octets, clés versionnées par le modèle, calcul par lots"""
+
+    def setUp(self):
+        self.cache = TwoTierCache(LRUCache(max_entries=100, max_bytes=1024 * 1024))
+        patcher = mock.patch.object(nlp_cache, '_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cle_versionnee_par_le_modele(self):
+        analyzer = FakeModelAnalyzer('local-aaaa')
+        self.assertEqual(analyzer.score('cv', 'offre'), 'local-aaaa:cv:offre')
+        self.assertEqual(analyzer.score('cv', 'offre'), 'local-aaaa:cv:offre')
+        self.assertEqual(analyzer.calls, 1)
+
+        # Nouveau modèle (réentraînement, .pkl -> .npz) : pas de score de l'ancien
+        analyzer.model_version = 'local-bbbb'
+        self.assertEqual(analyzer.score('cv', 'offre'), 'local-bbbb:cv:offre')
+        self.assertEqual(analyzer.calls, 2)
+
+        self.assertNotEqual(
+            self.cache.make_key('compatibility', 'local-aaaa', 'cv', 'offre'),
+            self.cache.make_key('compatibility', 'local-bbbb', 'cv', 'offre'),
+        )
+
+    def test_arguments_non_scalaires_non_caches(self):
+        analyzer = FakeModelAnalyzer('v1')
+        analyzer.score(['cv'], 'offre')
+        analyzer.score(['cv'], 'offre')
+        self.assertEqual(analyzer.calls, 2)
+
+    def test_lru_eviction_par_taille(self):
+        value = 'x' * 100
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        lru = LRUCache(max_entries=100, max_bytes=size * 3)
+        for key in 'abc':
+            lru.set(key, value)
+        lru.get('a')  # 'a' devient le plus récent : 'b' part en premier
+        lru.set('d', value)
+
+        self.assertIs(lru.get('b'), nlp_cache._MISSING)
+        self.assertEqual([lru.get(key) for key in 'acd'], [value] * 3)
+        self.assertEqual(lru.current_bytes, size * 3)
+
+    def test_lru_valeur_trop_grosse_ignoree(self):
+        lru = LRUCache(max_entries=10, max_bytes=50)
+        lru.set('petit', 1)
+        lru.set('gros', 'x' * 100)
+        self.assertIs(lru.get('gros'), nlp_cache._MISSING)
+        self.assertEqual(lru.get('petit'), 1)
+
+    def test_lru_remplacement_d_une_cle(self):
+        lru = LRUCache(max_entries=10, max_bytes=10_000)
+        lru.set('a', 'x' * 100)
+        lru.set('a', 'y')
+        self.assertEqual(lru.current_bytes, len(pickle.dumps('y', protocol=pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(len(lru), 1)
+
+    def test_get_or_compute_many(self):
+        self.cache.get_or_compute('skills', ('b',), lambda: 'B')
+        computed = []
+
+        def compute(missing):
+            computed.append(missing)
+            return [parts[0].upper() for parts in missing]
+
+        values = self.cache.get_or_compute_many('skills', [('a',), ('b',), ('c',)], compute)
+        self.assertEqual(values, ['A', 'B', 'C'])
+        self.assertEqual(computed, [[('a',), ('c',)]])
+
+        # Tout est en cache : compute n'est plus appelé
+        self.assertEqual(self.cache.get_or_compute_many('skills', [('c',), ('a',)], compute), ['C', 'A'])
+        self.assertEqual(len(computed), 1)
+
+
+class FakeNER:
+    """Pipeline spaCy factice : chaque mot en majuscules est une entité ORG"""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, text):
+        self.texts.append(text)
+        return mock.Mock(ents=[mock.Mock(text=word, label_='ORG') for word in text.split() if word.isupper()])
+
+    def pipe(self, texts, **kwargs):
+        return [self(text) for text in texts]
+
+
+class EntitiesCacheTests(SimpleTestCase):
+    """Clés 'entities' : configuration NER incluse, mêmes clés à l'unité et par lots"""
+
+    def setUp(self):
+        patcher = mock.patch.object(nlp_cache, '_cache', TwoTierCache(LRUCache()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.analyzer = MLCVAnalyzer.__new__(MLCVAnalyzer)
+        self.analyzer.nlp = FakeNER()
+        self.analyzer.ner_config = ('fr_core_news_sm', 20000)
+
+    def test_unite_et_lot_partagent_les_cles(self):
+        self.assertEqual(self.analyzer.extract_entities('cv AWS'), [('AWS', 'ORG')])
+        self.assertEqual(
+            self.analyzer.extract_entities_batch(['cv AWS', 'cv SQL']),
+            [[('AWS', 'ORG')], [('SQL', 'ORG')]],
+        )
+        self.assertEqual(self.analyzer.nlp.texts, ['cv AWS', 'cv SQL'])
+        self.assertEqual(self.analyzer.extract_entities('cv SQL'), [('SQL', 'ORG')])
+        self.assertEqual(len(self.analyzer.nlp.texts), 2)
+
+    def test_changement_de_configuration_ner(self):
+        self.analyzer.extract_entities('cv AWS')
+        self.analyzer.ner_config = ('fr_core_news_md', 20000)
+        self.analyzer.extract_entities('cv AWS')
+        self.analyzer.ner_config = ('fr_core_news_md', 5000)
+        self.analyzer.extract_entities_batch(['cv AWS'])
+        self.assertEqual(len(self.analyzer.nlp.texts), 3)
+
+
+class LocalVersionTests(SimpleTestCase):
+    """Version des modèles chargés hors registre"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_fichier(self):
+        path = self.write('cv_job_matcher.pkl', b'modele-1')
+        version = local_version(path)
+        self.assertTrue(version.startswith('local-'))
+        self.assertEqual(local_version(path), version)
+
+        self.write('cv_job_matcher.pkl', b'modele-2')
+        self.assertNotEqual(local_version(path), version)
+        self.assertNotEqual(local_version(self.write('cv_job_matcher.npz', b'modele-1')), local_version(path))
+
+    def test_artefact(self):
+        manifest = {'files': {'model.joblib': {'sha256': 'aaaa'}}}
+        self.write('artefact/manifest.json', json.dumps(manifest).encode())
+        directory = os.path.join(self.tmp.name, 'artefact')
+        version = local_version(directory)
+
+        manifest['files']['model.joblib']['sha256'] = 'bbbb'
+        self.write('artefact/manifest.json', json.dumps(manifest).encode())
+        self.assertNotEqual(local_version(directory), version)
+
+
+def write_artifact(directory, content=b'modele'):
+    """Artefact minimal : model.joblib + manifest.json"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'model.joblib'), 'wb') as f:
+        f.write(content)
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'files': {'model.joblib': {'size': len(content)}}}, f)
+    return directory
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """Enregistrement et promotion des versions"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = ModelRegistry(os.path.join(self.tmp.name, 'registry'))
+        self.source = write_artifact(os.path.join(self.tmp.name, 'artefact'))
+
+    def test_register(self):
+        self.assertEqual(self.registry.register(self.source, 'v1'), 'v1')
+        self.assertEqual(self.registry.list_versions(), ['v1'])
+        with open(os.path.join(self.registry.version_path('v1'), 'model.joblib'), 'rb') as f:
+            self.assertEqual(f.read(), b'modele')
+
+        with self.assertRaises(ValueError):
+            self.registry.register(self.source, 'v1')
+        with self.assertRaises(ValueError):
+            self.registry.register(self.source, '../v2')
+        with self.assertRaises(ValueError):
+            self.registry.register(self.tmp.name, 'v2')
+        self.assertEqual(self.registry.list_versions(), ['v1'])
+
+    def test_register_copie_temporaire(self):
+        # Reste d'une copie interrompue : remplacé, jamais listé ni servi
+        stale = self.registry.version_path('v1') + '.tmp'
+        os.makedirs(stale)
+        with open(os.path.join(stale, 'partiel'), 'w') as f:
+            f.write('x')
+        self.assertEqual(self.registry.list_versions(), [])
+
+        with mock.patch('nlp_service.registry.os.replace', wraps=os.replace) as replace:
+            self.registry.register(self.source, 'v1')
+        replace.assert_called_once_with(stale, self.registry.version_path('v1'))
+        self.assertFalse(os.path.exists(stale))
+        self.assertEqual(sorted(os.listdir(self.registry.version_path('v1'))), ['manifest.json', 'model.joblib'])
+
+    def test_promote(self):
+        self.assertIsNone(self.registry.active_version())
+        self.assertIsNone(self.registry.active_path())
+        self.registry.register(self.source, 'v1')
+
+        with mock.patch('nlp_service.registry.os.replace', wraps=os.replace) as replace:
+            self.registry.promote('v1')
+        replace.assert_called_once_with(self.registry.active_file + '.tmp', self.registry.active_file)
+        self.assertFalse(os.path.exists(self.registry.active_file + '.tmp'))
+        self.assertEqual(self.registry.active_version(), 'v1')
+        self.assertEqual(self.registry.active_path(), self.registry.version_path('v1'))
+
+        with self.assertRaises(ValueError):
+            self.registry.promote('v2')
+        self.assertEqual(self.registry.active_version(), 'v1')
+
+
+class FakeMatcher:
+    def __init__(self, path):
+        self.path = path
+
+    def warm_up(self):
+        return 0.0
+
+
+class ModelReloaderTests(SimpleTestCase):
+    """Rechargement à chaud : swap sur promotion, ancien modèle conservé en cas d'échec"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = ModelRegistry(self.tmp.name)
+        for version in ('v1', 'v2', 'v3'):
+            self.registry.register(write_artifact(os.path.join(self.tmp.name, 'src', version)), version)
+        self.registry.promote('v1')
+
+        self.old_model = FakeMatcher(self.registry.version_path('v1'))
+        self.analyzer = MLCVAnalyzer.__new__(MLCVAnalyzer)
+        self.analyzer._served = ServedModel(self.old_model, 'v1')
+        self.reloader = ModelReloader(self.registry, self.analyzer._swap_ml_model, current_version='v1')
+
+        patcher = mock.patch.object(MLCVAnalyzer, '_load_matcher', side_effect=FakeMatcher)
+        self.load_matcher = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_swap_sur_promotion(self):
+        self.assertFalse(self.reloader.check())
+        self.load_matcher.assert_not_called()
+
+        self.registry.promote('v2')
+        with self.analyzer.model_snapshot() as pinned:
+            self.assertTrue(self.reloader.check())
+            # Un appel en cours garde le modèle figé au début du bloc
+            self.assertIs(self.analyzer.ml_matcher, self.old_model)
+        self.assertEqual(pinned.version, 'v1')
+
+        self.assertEqual(self.analyzer.model_version, 'v2')
+        self.assertEqual(self.analyzer.ml_matcher.path, self.registry.version_path('v2'))
+        self.assertFalse(self.reloader.check())
+        self.assertEqual(self.load_matcher.call_count, 1)
+
+    def test_echec_de_chargement(self):
+        self.load_matcher.side_effect = OSError('artefact corrompu')
+        self.registry.promote('v2')
+        self.assertFalse(self.reloader.check())
+        self.assertIs(self.analyzer.ml_matcher, self.old_model)
+        self.assertEqual(self.analyzer.model_version, 'v1')
+
+        # La version en échec n'est pas retentée à chaque scrutation
+        self.assertFalse(self.reloader.check())
+        self.assertEqual(self.load_matcher.call_count, 1)
+
+        # Une nouvelle promotion est chargée normalement
+        self.load_matcher.side_effect = FakeMatcher
+        self.registry.promote('v3')
+        self.assertTrue(self.reloader.check())
+        self.assertEqual(self.analyzer.model_version, 'v3')
+
+    def test_echec_du_warm_up(self):
+        broken = mock.Mock(**{'warm_up.side_effect': RuntimeError('boom')})
+        self.load_matcher.side_effect = None
+        self.load_matcher.return_value = broken
+        self.registry.promote('v2')
+        self.assertFalse(self.reloader.check())
+        self.assertIs(self.analyzer.ml_matcher, self.old_model)
+
+
+# Corpus d'entraînement minimal : vocabulaire propre à chaque catégorie + mots communs
+CORPUS_WORDS = {
+    'Data Science': 'python pandas numpy statistics regression machine learning tensorflow jupyter',
+    'Web Developer': 'javascript react django html css rest api frontend backend nodejs',
+    'Accountant': 'accounting ledger audit tax invoices budget excel payroll balance sheet',
+}
+COMMON_WORDS = 'team project experience communication years client management agile'
+
+
+class NumpyExportTests(SimpleTestCase):
+    """L'export .npz reproduit exactement les prédictions du modèle scikit-learn"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import pandas as pd
+
+        rng = random.Random(0)
+
+        def resume(category):
+            words = CORPUS_WORDS[category].split() * 2 + COMMON_WORDS.split()
+            return ' '.join(rng.choice(words) for _ in range(12))
+
+        cls.dataset = pd.DataFrame(
+            [(resume(category), category) for category in CORPUS_WORDS for _ in range(10)],
+            columns=['Resume', 'Category'],
+        )
+        cls.texts = [resume(category) for category in CORPUS_WORDS for _ in range(3)] + [
+            '', 'Ingénieur €€ sans mot connu', 'PYTHON, Django & SQL!',
+        ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def train(self, model_type):
+        from .train_model import CVJobMatcher
+
+        matcher = CVJobMatcher(model_type)
+        with quiet():
+            matcher.train(*matcher.prepare_data(self.dataset.copy()))
+        return matcher
+
+    def test_export_identique(self):
+        for model_type in ('tfidf_linear', 'tfidf_centroid', 'tfidf_rf'):
+            with self.subTest(model_type=model_type):
+                matcher = self.train(model_type)
+                path = os.path.join(self.tmp.name, f'{model_type}.npz')
+                meta = export_matcher(matcher, path)
+                with quiet():
+                    numpy_matcher = NumpyMatcher.load(path)
+
+                report = compare(matcher, numpy_matcher, self.texts)
+                self.assertEqual(meta['model_type'], model_type)
+                self.assertEqual(report['texts'], len(self.texts))
+                self.assertEqual(report['category_mismatches'], 0)
+                self.assertEqual(report['max_match_score_diff'], 0.0)
+                # Probabilités : mêmes opérations, à l'arrondi flottant près
+                self.assertLess(report['max_confidence_diff'], 1e-12)
+
+    def test_modele_hashing_non_exportable(self):
+        with self.assertRaises(ValueError):
+            export_matcher(self.train('hashing_sgd'), os.path.join(self.tmp.name, 'hashing.npz'))
+
+
+# Implémentations regex d'origine (avant les tables de traduction), référence des tests
+def regex_display_text(text):
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text)
+    text = ''.join(char for char in text if char.isprintable() or char.isspace())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def regex_match_text(text):
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z0-9àâäéèêëîïôöùûüÿçÀÂÄÉÈÊËÎÏÔÖÙÛÜŸÇ\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def regex_ml_text(text):
+    text = re.sub(r'http\S+', '', text.lower())
+    text = re.sub(r'[^a-zA-Z\s]+', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class NormalizationTests(SimpleTestCase):
+    """Les tables de traduction produisent exactement les sorties des anciennes regex"""
+
+    CASES = [
+        '',
+        '   ',
+        'Développeur Python/Django — 5 ans, SQL & REST.',
+        'ÉCOLE Supérieure ÀÂÄ ÇÑ ß ÿ ÿ µ ª º ¹²³ ½ ×÷',
+        '\x00\x07 contrôle\x1b[0m \x7f\x85\x9f\xa0\xad fin',
+        'lignes\r\n\tmultiples\x0b\x0c\x1c\x1d\x1e\x1f  \n\n',
+        '\u2000\u2028\u2029\u3000\u202f\u205f\u180e\ufeff\u200b espaces Unicode',
+        'İstanbul ǅ ﬁ ﬀ ẞ Σς K Å',
+        'Москва 東京 Ελληνικά عربى हिन्दी',
+        'emoji 🚀🐍 \U0001d400\U0001f600 \ud800 astral',
+        'http://exemple.fr/cv?id=1 HTTPS://Exemple.FR voir:http x http',
+        'url collée:https://a.b/c,suite et Http//x fin',
+        'a\u0301 e\u0308 combinants',
+    ]
+
+    def assertEquivalent(self, text):
+        self.assertEqual(display_text(text), regex_display_text(text), repr(text))
+        self.assertEqual(match_text(text), regex_match_text(text), repr(text))
+        self.assertEqual(ml_text(text), regex_ml_text(text), repr(text))
+
+    def test_cas_limites(self):
+        for text in self.CASES:
+            with self.subTest(text=text):
+                self.assertEquivalent(text)
+
+    def test_textes_aleatoires(self):
+        rng = random.Random(0)
+        # Latin-1 (traduction par octets), reste du BMP et plans supplémentaires (str.translate)
+        ranges = [(0, 0xff), (0x100, 0x2fff), (0x3000, 0xffff), (0x10000, sys.maxunicode)]
+        alphabet = 'http:// HTTP abc DEF 123 éÉ \t\n'
+        for _ in range(300):
+            low, high = rng.choice(ranges)
+            chars = [chr(rng.randint(low, high)) if rng.random() < 0.6 else rng.choice(alphabet)
+                     for _ in range(rng.randint(1, 60))]
+            self.assertEquivalent(''.join(chars))
+
+    def test_valeurs_non_textuelles(self):
+        for value in (None, float('nan'), 42):
+            self.assertEqual((display_text(value), match_text(value), ml_text(value)), ('', '', ''))
+        self.assertEqual(
+            clean_for_model_series(['Python DEV http://x.y', None, float('nan')]).tolist(),
+            [regex_ml_text('Python DEV http://x.y'), '', ''],
+        )
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Chaque appelant reçoit son résultat ou une exception, jamais une attente infinie"""
+
+    def submit_all(self, batcher, items):
+        # Lot formé après toutes les soumissions (max_wait long, taille exacte)
+        return [batcher.submit(item) for item in items]
+
+    def test_lot_regroupe(self):
+        calls = []
+
+        def double(items):
+            calls.append(items)
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(double, max_batch_size=3, max_wait_ms=1000)
+        futures = self.submit_all(batcher, [1, 2, 3])
+        self.assertEqual([future.result(timeout=2) for future in futures], [2, 4, 6])
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_nombre_de_resultats_incorrect(self):
+        batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=3, max_wait_ms=1000)
+        for future in self.submit_all(batcher, [1, 2, 3]):
+            with self.assertRaises(ValueError):
+                future.result(timeout=2)
+
+        # Le thread du batcher continue de servir les lots suivants
+        batcher.batch_func = lambda items: items
+        batcher.max_wait = 0.01
+        self.assertEqual(batcher(4), 4)
+
+    def test_erreur_du_lot(self):
+        def fail(items):
+            raise RuntimeError('modèle indisponible')
+
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=1000)
+        for future in self.submit_all(batcher, [1, 2]):
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=2)
+
+    def test_appel_annule(self):
+        calls = []
+
+        def identity(items):
+            calls.append(items)
+            return items
+
+        batcher = MicroBatcher(identity, max_batch_size=3, max_wait_ms=1000)
+        first = batcher.submit(1)
+        self.assertTrue(first.cancel())
+        futures = [batcher.submit(2), batcher.submit(3)]
+        self.assertEqual([future.result(timeout=2) for future in futures], [2, 3])
+        self.assertEqual(calls, [[2, 3]])
@@ -1,23 +1,149 @@
 # nlp_service/train_model.py - VERSION CORRIGÉE
-import pandas as pd
+# pandas et sentence-transformers ne servent qu'à l'entraînement : importés à
+# l'usage pour que le chargement du modèle en production reste léger.
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.neighbors import NearestCentroid
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.preprocessing import LabelEncoder
+from sklearn.preprocessing import LabelEncoder, normalize
+from scipy import sparse
 import joblib
-import re
+import hashlib
+import json
 import os
 import sys
+import time
+from datetime import datetime, timezone
 
-# Pour embeddings avancés (optionnel)
+# Normalisation partagée entraînement / inférence (import absolu si lancé en script)
 try:
-    from sentence_transformers import SentenceTransformer
-    import torch
+    from .normalization import clean_for_model, clean_texts
 except ImportError:
-    print("⚠️  Sentence-transformers non installé, utilisation de TF-IDF uniquement")
+    from normalization import clean_for_model, clean_texts
+
+# ============================================
+# FORMAT ARTEFACT
+# ============================================
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_MODEL_FILE = 'model.joblib'
+ARTIFACT_MANIFEST_FILE = 'manifest.json'
+
+WARMUP_CV_TEXT = """
+Software engineer with 5 years of experience in Python, Django and SQL.
+Built REST APIs, data pipelines and machine learning models.
+"""
+
+WARMUP_JOB_TEXT = """
+We are hiring a Python developer with Django, REST API and SQL experience.
+"""
+
+
+# Types de modèles reposant sur la vectorisation TF-IDF
+TFIDF_MODEL_TYPES = ('tfidf_rf', 'tfidf_linear', 'tfidf_centroid')
+# Types de modèles reposant sur le hashing (sans vocabulaire, IDF incrémental)
+HASHING_MODEL_TYPES = ('hashing_sgd',)
+# Vecteurs creux normalisés L2 : même code d'inférence et de similarité
+SPARSE_MODEL_TYPES = TFIDF_MODEL_TYPES + HASHING_MODEL_TYPES
+MODEL_TYPES = SPARSE_MODEL_TYPES + ('sbert',)
+
+
+def default_artifact_dir(model_type):
+    """Dossier d'export d'un type de modèle (le modèle par défaut garde le chemin historique)"""
+    if model_type == 'tfidf_rf':
+        return 'models/cv_job_matcher'
+    return f'models/cv_job_matcher_{model_type}'
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Empreinte sha256 d'un fichier, lue par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StreamingHashingVectorizer:
+    """
+    Vectorisation TF-IDF sans vocabulaire : les n-grammes sont hachés dans
+    n_features colonnes et l'IDF est calculé à partir de fréquences de documents
+    mises à jour au fil de l'eau (partial_fit), sans jamais réentraîner.
+    
+    L'état se résume à quelques paramètres et aux fréquences non nulles
+    (get_state / from_state), ce qui garde l'artefact compact et indépendant
+    de la classe Python (pas de pickle de l'objet lui-même).
+    """
+    
+    def __init__(self, n_features=2 ** 16, ngram_range=(1, 2), stop_words='english'):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self._idf = None
+        self.hasher = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=self.ngram_range,
+            stop_words=stop_words,
+            alternate_sign=False,
+            norm=None
+        )
+    
+    def partial_fit(self, texts):
+        """Ajoute les fréquences de documents d'un lot de textes"""
+        counts = self.hasher.transform(texts)
+        counts.sum_duplicates()
+        self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs += counts.shape[0]
+        self._idf = None
+        return self
+    
+    def fit(self, texts):
+        self.doc_freq[:] = 0
+        self.n_docs = 0
+        return self.partial_fit(texts)
+    
+    def fit_transform(self, texts):
+        return self.fit(texts).transform(texts)
+    
+    @property
+    def idf_(self):
+        # Même lissage que TfidfVectorizer(smooth_idf=True)
+        if self._idf is None:
+            self._idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        return self._idf
+    
+    def transform(self, texts):
+        counts = self.hasher.transform(texts)
+        return normalize(counts @ sparse.diags(self.idf_), norm='l2', copy=False).tocsr()
+    
+    def get_state(self):
+        """État sérialisable : paramètres + fréquences non nulles (format creux)"""
+        indices = np.flatnonzero(self.doc_freq)
+        return {
+            'n_features': self.n_features,
+            'ngram_range': self.ngram_range,
+            'stop_words': self.stop_words,
+            'n_docs': self.n_docs,
+            'df_indices': indices.astype(np.int32),
+            'df_values': self.doc_freq[indices].astype(np.int32),
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        instance = cls(
+            n_features=state['n_features'],
+            ngram_range=state['ngram_range'],
+            stop_words=state['stop_words']
+        )
+        instance.doc_freq[state['df_indices']] = state['df_values']
+        instance.n_docs = state['n_docs']
+        return instance
+
 
 class CVJobMatcher:
     """
@@ -28,9 +154,15 @@ class CVJobMatcher:
     def __init__(self, model_type='tfidf_rf'):
         """
         Args:
-            model_type: 'tfidf_rf' (TF-IDF + Random Forest) 
+            model_type: 'tfidf_rf' (TF-IDF + Random Forest)
+                       'tfidf_linear' (TF-IDF + régression logistique, faible latence)
+                       'tfidf_centroid' (TF-IDF + plus proche centroïde, modèle minimal)
+                       'hashing_sgd' (hashing + IDF incrémental + SGD, sans vocabulaire)
                        ou 'sbert' (Sentence-BERT embeddings)
         """
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"model_type inconnu : {model_type} (choix : {', '.join(MODEL_TYPES)})")
+        
         self.model_type = model_type
         self.vectorizer = None
         self.classifier = None
@@ -39,22 +171,20 @@ class CVJobMatcher:
         
         if model_type == 'sbert':
             try:
+                # Pour embeddings avancés (optionnel)
+                from sentence_transformers import SentenceTransformer
                 self.sbert_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
             except ImportError:
                 print("❌ Sentence-transformers non installé, basculement vers TF-IDF")
                 self.model_type = 'tfidf_rf'
+        
+        self.manifest = None
     
     def clean_text(self, text):
-        """Nettoie le texte"""
-        if not isinstance(text, str):
-            return ""
-        text = text.lower()
-        text = re.sub(r'http\S+', '', text)  # URLs
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)  # Caractères spéciaux
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    
-    def prepare_data(self, df, text_column='Resume', label_column='Category'):
+        """Nettoie le texte (même normalisation qu'à l'entraînement)"""
+        return clean_for_model(text)
+    
+    def prepare_data(self, df, text_column='Resume', label_column='Category', n_jobs=1):
         """
         Prépare les données pour l'entraînement
         
@@ -62,9 +192,10 @@ class CVJobMatcher:
             df: DataFrame Kaggle (ex: UpdatedResumeDataSet.csv)
             text_column: colonne contenant le texte du CV
             label_column: colonne contenant la catégorie d'emploi
+            n_jobs: processus utilisés pour le nettoyage (-1 = tous les cœurs)
         """
-        # Nettoyage
-        df[text_column] = df[text_column].apply(self.clean_text)
+        # Nettoyage vectorisé (par blocs en parallèle si n_jobs > 1)
+        df[text_column] = clean_texts(df[text_column], n_jobs=n_jobs)
         
         # Encodage des labels
         self.label_encoder = LabelEncoder()
@@ -92,8 +223,8 @@ class CVJobMatcher:
         
         print(f"📊 Données : {len(X_train)} train, {len(X_test)} test")
         
-        if self.model_type == 'tfidf_rf':
-            # ===== MÉTHODE 1 : TF-IDF + Random Forest =====
+        if self.model_type in TFIDF_MODEL_TYPES:
+            # ===== MÉTHODE 1 : TF-IDF + classifieur (Random Forest, linéaire ou centroïde) =====
             print("🔧 Vectorisation TF-IDF...")
             self.vectorizer = TfidfVectorizer(
                 max_features=5000,
@@ -105,14 +236,22 @@ class CVJobMatcher:
             X_train_vec = self.vectorizer.fit_transform(X_train)
             X_test_vec = self.vectorizer.transform(X_test)
             
-            print("🌲 Entraînement Random Forest...")
-            self.classifier = RandomForestClassifier(
-                n_estimators=100,  # Réduit pour plus de rapidité
-                max_depth=20,
-                min_samples_split=5,
-                random_state=random_state,
-                n_jobs=-1
-            )
+            self.classifier = self._build_tfidf_classifier(random_state)
+            self.classifier.fit(X_train_vec, y_train)
+            
+            # Évaluation
+            y_pred = self.classifier.predict(X_test_vec)
+            accuracy = accuracy_score(y_test, y_pred)
+            
+        elif self.model_type in HASHING_MODEL_TYPES:
+            # ===== MÉTHODE 3 : Hashing + IDF incrémental + SGD (mise à jour continue) =====
+            print("🔧 Vectorisation par hashing (IDF incrémental)...")
+            self.vectorizer = StreamingHashingVectorizer()
+            X_train_vec = self.vectorizer.fit_transform(X_train)
+            X_test_vec = self.vectorizer.transform(X_test)
+            
+            print("📈 Entraînement SGD (log loss)...")
+            self.classifier = self._build_sgd_classifier(random_state)
             self.classifier.fit(X_train_vec, y_train)
             
             # Évaluation
@@ -148,6 +287,66 @@ class CVJobMatcher:
         
         return accuracy
     
+    def _build_tfidf_classifier(self, random_state):
+        """Classifieur entraîné sur les vecteurs TF-IDF selon model_type"""
+        if self.model_type == 'tfidf_linear':
+            print("📈 Entraînement Logistic Regression (mode faible latence)...")
+            return LogisticRegression(
+                C=10.0,
+                max_iter=1000,
+                random_state=random_state
+            )
+        
+        if self.model_type == 'tfidf_centroid':
+            print("🎯 Calcul des centroïdes par catégorie...")
+            return NearestCentroid()
+        
+        print("🌲 Entraînement Random Forest...")
+        return RandomForestClassifier(
+            n_estimators=100,  # Réduit pour plus de rapidité
+            max_depth=20,
+            min_samples_split=5,
+            random_state=random_state,
+            n_jobs=-1
+        )
+    
+    def _build_sgd_classifier(self, random_state):
+        """Classifieur linéaire compatible partial_fit (probabilités via log loss)"""
+        return SGDClassifier(
+            loss='log_loss',
+            alpha=1e-5,
+            max_iter=50,
+            tol=1e-4,
+            random_state=random_state
+        )
+    
+    def update(self, cv_texts, categories=None):
+        """
+        Met à jour un modèle hashing avec de nouveaux CVs, sans réentraînement :
+        les statistiques IDF absorbent toujours les textes, le classifieur
+        seulement si les catégories (noms connus du label_encoder) sont fournies.
+
+        Modifie l'instance en place : ne jamais l'appeler sur le matcher servi par
+        MLCVAnalyzer. update_from_cv_table (commande update_model) met à jour une
+        copie chargée en mémoire, l'enregistre comme nouvelle version du registre,
+        et les workers la mettent en service par le rechargement à chaud.
+        """
+        if self.model_type not in HASHING_MODEL_TYPES:
+            raise ValueError(f"Mise à jour incrémentale non supportée pour {self.model_type}")
+        
+        cv_clean = clean_texts(cv_texts)
+        self.vectorizer.partial_fit(cv_clean)
+        
+        if categories is not None:
+            # Un artefact chargé en mmap expose des poids en lecture seule
+            for attr in ('coef_', 'intercept_'):
+                weights = getattr(self.classifier, attr)
+                if not weights.flags.writeable:
+                    setattr(self.classifier, attr, np.array(weights))
+            
+            y = self.label_encoder.transform(categories)
+            self.classifier.partial_fit(self.vectorizer.transform(cv_clean), y)
+    
     def predict_category(self, cv_text):
         """
         Prédit la catégorie d'emploi pour un CV
@@ -157,10 +356,11 @@ class CVJobMatcher:
         """
         cv_clean = self.clean_text(cv_text)
         
-        if self.model_type == 'tfidf_rf':
+        if self.model_type in SPARSE_MODEL_TYPES:
             cv_vec = self.vectorizer.transform([cv_clean])
-            prediction = self.classifier.predict(cv_vec)[0]
+            # Un seul appel : la classe prédite est l'argmax des probabilités
             probabilities = self.classifier.predict_proba(cv_vec)[0]
+            prediction = self.classifier.classes_[probabilities.argmax()]
             confidence = probabilities.max()
             
         elif self.model_type == 'sbert':
@@ -172,6 +372,27 @@ class CVJobMatcher:
         category = self.label_encoder.inverse_transform([prediction])[0]
         return category, confidence
     
+    def predict_categories(self, cv_texts):
+        """
+        Prédit les catégories d'un lot de CVs avec une seule vectorisation
+        
+        Returns:
+            liste de (category_name, confidence_score)
+        """
+        cv_clean = clean_texts(cv_texts)
+        if not cv_clean:
+            return []
+        
+        if self.model_type in SPARSE_MODEL_TYPES:
+            features = self.vectorizer.transform(cv_clean)
+        else:
+            features = self.sbert_model.encode(cv_clean)
+        
+        probabilities = self.classifier.predict_proba(features)
+        predictions = self.classifier.classes_[probabilities.argmax(axis=1)]
+        categories = self.label_encoder.inverse_transform(predictions)
+        return list(zip(categories, probabilities.max(axis=1)))
+    
     def calculate_match_score(self, cv_text, job_description):
         """
         Calcule le score de match entre CV et offre
@@ -182,7 +403,7 @@ class CVJobMatcher:
         cv_clean = self.clean_text(cv_text)
         job_clean = self.clean_text(job_description)
         
-        if self.model_type == 'tfidf_rf':
+        if self.model_type in SPARSE_MODEL_TYPES:
             # TF-IDF similarity
             combined = self.vectorizer.transform([cv_clean, job_clean])
             similarity = (combined[0] @ combined[1].T).toarray()[0][0]
@@ -197,29 +418,151 @@ class CVJobMatcher:
         
         return round(score, 2)
     
-    def save_model(self, path='models/cv_job_matcher.pkl'):
-        """Sauvegarde le modèle entraîné"""
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+    def calculate_match_scores(self, pairs):
+        """
+        Scores de match d'un lot de paires (cv_text, job_description) avec une
+        seule vectorisation ; les textes répétés (même offre) ne sont vectorisés qu'une fois.
+        
+        Returns:
+            liste de scores (0-100)
+        """
+        if not pairs:
+            return []
         
-        model_data = {
+        unique = list(dict.fromkeys(text for pair in pairs for text in pair))
+        position = {text: i for i, text in enumerate(unique)}
+        cv_rows = [position[cv_text] for cv_text, _ in pairs]
+        job_rows = [position[job_description] for _, job_description in pairs]
+        cleaned = clean_texts(unique)
+        
+        if self.model_type in SPARSE_MODEL_TYPES:
+            features = self.vectorizer.transform(cleaned)
+            similarities = np.asarray(features[cv_rows].multiply(features[job_rows]).sum(axis=1)).ravel()
+        else:
+            embeddings = self.sbert_model.encode(cleaned)
+            cv_emb, job_emb = embeddings[cv_rows], embeddings[job_rows]
+            similarities = (cv_emb * job_emb).sum(axis=1) / (
+                np.linalg.norm(cv_emb, axis=1) * np.linalg.norm(job_emb, axis=1)
+            )
+        
+        return [round(min(similarity * 100, 100), 2) for similarity in similarities.tolist()]
+    
+    def warm_up(self):
+        """
+        Exécute une inférence factice pour initialiser les structures paresseuses
+        (pages mmap, caches sklearn/BLAS) avant la première vraie requête.
+        
+        Returns:
+            durée du warm-up en secondes
+        """
+        start = time.perf_counter()
+        self.predict_category(WARMUP_CV_TEXT)
+        self.calculate_match_score(WARMUP_CV_TEXT, WARMUP_JOB_TEXT)
+        return time.perf_counter() - start
+    
+    def _model_data(self):
+        vectorizer = self.vectorizer
+        if isinstance(vectorizer, StreamingHashingVectorizer):
+            vectorizer = vectorizer.get_state()
+        
+        return {
             'model_type': self.model_type,
-            'vectorizer': self.vectorizer,
+            'vectorizer': vectorizer,
             'classifier': self.classifier,
             'label_encoder': self.label_encoder
         }
-        
-        joblib.dump(model_data, path)
-        print(f"💾 Modèle sauvegardé : {path}")
     
     @classmethod
-    def load_model(cls, path='models/cv_job_matcher.pkl'):
-        """Charge un modèle pré-entraîné"""
-        model_data = joblib.load(path)
-        
+    def _from_model_data(cls, model_data):
         instance = cls(model_type=model_data['model_type'])
         instance.vectorizer = model_data['vectorizer']
+        if instance.model_type in HASHING_MODEL_TYPES:
+            instance.vectorizer = StreamingHashingVectorizer.from_state(instance.vectorizer)
         instance.classifier = model_data['classifier']
         instance.label_encoder = model_data['label_encoder']
+        return instance
+    
+    def save_model(self, path='models/cv_job_matcher.pkl'):
+        """Sauvegarde le modèle entraîné"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        joblib.dump(self._model_data(), path)
+        print(f"💾 Modèle sauvegardé : {path}")
+    
+    def save_artifact(self, directory='models/cv_job_matcher', metadata=None):
+        """
+        Sauvegarde au format artefact : un dossier contenant
+        - model.joblib : dump joblib NON compressé (tableaux numpy chargeables en mmap)
+        - manifest.json : version du format, type de modèle, taille et sha256 des fichiers
+          (et metadata, ex. dernier CV absorbé par update_from_cv_table)
+        """
+        os.makedirs(directory, exist_ok=True)
+        
+        model_path = os.path.join(directory, ARTIFACT_MODEL_FILE)
+        joblib.dump(self._model_data(), model_path, compress=0)
+        
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_type': self.model_type,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'classes': [str(c) for c in self.label_encoder.classes_] if self.label_encoder is not None else [],
+            'files': {
+                ARTIFACT_MODEL_FILE: {
+                    'size': os.path.getsize(model_path),
+                    'sha256': file_sha256(model_path),
+                }
+            },
+        }
+        if metadata:
+            manifest['metadata'] = metadata
+        
+        # Écriture atomique : un lecteur ne voit jamais un manifest partiel
+        manifest_path = os.path.join(directory, ARTIFACT_MANIFEST_FILE)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+        
+        self.manifest = manifest
+        print(f"💾 Artefact sauvegardé : {directory}")
+        return manifest
+    
+    @classmethod
+    def load_artifact(cls, directory, mmap_mode='r', verify=True):
+        """
+        Charge un artefact produit par save_artifact.
+        
+        Avec mmap_mode='r', les tableaux numpy sont projetés en mémoire depuis le
+        fichier : les pages sont partagées entre les workers via le page cache.
+        """
+        with open(os.path.join(directory, ARTIFACT_MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"Format d'artefact non supporté : {manifest.get('format_version')} "
+                f"(attendu {ARTIFACT_FORMAT_VERSION})"
+            )
+        
+        model_path = os.path.join(directory, ARTIFACT_MODEL_FILE)
+        if verify:
+            expected = manifest['files'][ARTIFACT_MODEL_FILE]['sha256']
+            if file_sha256(model_path) != expected:
+                raise ValueError(f"Checksum invalide pour {model_path}")
+        
+        instance = cls._from_model_data(joblib.load(model_path, mmap_mode=mmap_mode))
+        instance.manifest = manifest
+        
+        print(f"✅ Artefact chargé : {directory} ({manifest['model_type']})")
+        return instance
+    
+    @classmethod
+    def load_model(cls, path='models/cv_job_matcher.pkl'):
+        """Charge un modèle pré-entraîné (pickle historique ou dossier artefact)"""
+        if os.path.isdir(path):
+            return cls.load_artifact(path)
+        
+        instance = cls._from_model_data(joblib.load(path))
         
         print(f"✅ Modèle chargé : {path}")
         return instance
@@ -282,6 +625,7 @@ def train_from_kaggle_dataset(
     # 2. Charger dataset Kaggle
     print("\n📂 Chargement du dataset...")
     try:
+        import pandas as pd
         df = pd.read_csv(csv_path, encoding='latin-1')
         print(f"✅ Dataset chargé : {len(df)} exemples")
         print(f"📋 Colonnes : {list(df.columns)}")
@@ -300,8 +644,8 @@ def train_from_kaggle_dataset(
     # 3. Initialiser modèle
     matcher = CVJobMatcher(model_type=model_type)
     
-    # 4. Préparer données
-    X_text, y_labels = matcher.prepare_data(df)
+    # 4. Préparer données (nettoyage réparti sur tous les cœurs)
+    X_text, y_labels = matcher.prepare_data(df, n_jobs=-1)
     
     # 5. Entraîner
     accuracy = matcher.train(X_text, y_labels)
@@ -316,6 +660,274 @@ def train_from_kaggle_dataset(
     return matcher
 
 
+# ============================================
+# ENTRAÎNEMENT EN STREAMING (HORS MÉMOIRE)
+# ============================================
+
+def iter_csv_chunks(csv_path, chunk_size=1000, text_column='Resume', label_column='Category'):
+    """Lit le CSV par blocs de chunk_size lignes : (textes, catégories)"""
+    import pandas as pd
+    
+    reader = pd.read_csv(
+        csv_path,
+        encoding='latin-1',
+        usecols=[text_column, label_column],
+        chunksize=chunk_size
+    )
+    for chunk in reader:
+        chunk = chunk.dropna()
+        yield chunk[text_column].tolist(), chunk[label_column].astype(str).tolist()
+
+
+def iter_cv_table_chunks(chunk_size=1000, label_key='category'):
+    """
+    Lit les CVs stockés (table CV) par blocs : (textes, catégories).
+    
+    QuerySet.iterator() s'appuie sur un curseur côté serveur sous PostgreSQL :
+    la table n'est jamais chargée entièrement. Seuls les CVs dont parsed_data
+    contient label_key sont utilisés. Nécessite Django configuré.
+    """
+    from cvs.models import CV
+    
+    rows = (
+        CV.objects
+        .filter(parsed_data__has_key=label_key)
+        .exclude(extracted_text='')
+        .order_by('pk')
+        .values_list('extracted_text', f'parsed_data__{label_key}')
+        .iterator(chunk_size=chunk_size)
+    )
+    
+    texts, labels = [], []
+    for text, label in rows:
+        texts.append(text)
+        labels.append(str(label))
+        if len(texts) >= chunk_size:
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+def iter_new_cv_chunks(after_cv_id=0, chunk_size=1000, label_key='category'):
+    """
+    CVs stockés d'identifiant > after_cv_id, par blocs : (dernier id, textes, catégories).
+    La catégorie vaut None si parsed_data ne contient pas label_key. Nécessite Django configuré.
+    """
+    from cvs.models import CV
+    
+    rows = (
+        CV.objects
+        .filter(pk__gt=after_cv_id)
+        .exclude(extracted_text='')
+        .order_by('pk')
+        .values_list('pk', 'extracted_text', f'parsed_data__{label_key}')
+        .iterator(chunk_size=chunk_size)
+    )
+    
+    last_id, texts, labels = after_cv_id, [], []
+    for pk, text, label in rows:
+        last_id = pk
+        texts.append(text)
+        labels.append(str(label) if label is not None else None)
+        if len(texts) >= chunk_size:
+            yield last_id, texts, labels
+            texts, labels = [], []
+    if texts:
+        yield last_id, texts, labels
+
+
+def update_from_cv_table(matcher, after_cv_id=0, chunk_size=1000, label_key='category'):
+    """
+    Absorbe dans matcher (hashing_sgd) les CVs arrivés depuis after_cv_id :
+    IDF pour tous, classifieur pour ceux dont la catégorie est connue du modèle.
+    
+    Returns:
+        rapport : CVs absorbés, étiquetés, catégories inconnues ignorées, dernier id
+    """
+    known = set(str(c) for c in matcher.label_encoder.classes_)
+    report = {'after_cv_id': after_cv_id, 'last_cv_id': after_cv_id, 'cvs': 0, 'labeled': 0,
+              'unknown_labels': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    
+    for last_id, texts, labels in iter_new_cv_chunks(after_cv_id, chunk_size, label_key):
+        labeled = [(text, label) for text, label in zip(texts, labels) if label in known]
+        unlabeled = [text for text, label in zip(texts, labels) if label not in known]
+        
+        # Chaque CV compte une seule fois dans les fréquences de documents
+        if unlabeled:
+            matcher.update(unlabeled)
+        if labeled:
+            matcher.update([text for text, _ in labeled], [label for _, label in labeled])
+        
+        report['cvs'] += len(texts)
+        report['labeled'] += len(labeled)
+        report['unknown_labels'] += sum(1 for label in labels if label is not None and label not in known)
+        report['last_cv_id'] = last_id
+    
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def shuffle_chunks(chunks, buffer_size, chunk_size, random_state=42):
+    """
+    Mélange approximatif d'un flux de blocs avec un tampon borné : les données
+    triées par catégorie (cas du CSV Kaggle) dégradent fortement partial_fit.
+    """
+    rng = np.random.default_rng(random_state)
+    buffer = []
+    
+    def drain(keep):
+        while len(buffer) > keep:
+            size = min(chunk_size, len(buffer) - keep)
+            picked = set(rng.choice(len(buffer), size=size, replace=False).tolist())
+            out = [row for i, row in enumerate(buffer) if i in picked]
+            buffer[:] = [row for i, row in enumerate(buffer) if i not in picked]
+            yield [t for t, _ in out], [c for _, c in out]
+    
+    for texts, labels in chunks:
+        buffer.extend(zip(texts, labels))
+        yield from drain(buffer_size)
+    yield from drain(0)
+
+
+def peak_memory_bytes():
+    """Pic de mémoire résidente du processus (None si indisponible, ex. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : kilo-octets, macOS : octets
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def train_streaming(
+    chunks,
+    epochs=3,
+    holdout=5,
+    buffer_size=10000,
+    chunk_size=1000,
+    random_state=42
+):
+    """
+    Entraîne un modèle hashing_sgd sans jamais charger le dataset en mémoire.
+    
+    Args:
+        chunks: callable retournant un nouvel itérateur de (textes, catégories)
+                (appelé une fois par passe : iter_csv_chunks, iter_cv_table_chunks...)
+        epochs: nombre de passes partial_fit sur les données d'entraînement
+        holdout: une ligne sur `holdout` est réservée à l'évaluation (0 = aucune)
+    
+    Returns:
+        (matcher, report) avec débit et pic mémoire par passe
+    """
+    matcher = CVJobMatcher(model_type='hashing_sgd')
+    matcher.vectorizer = StreamingHashingVectorizer()
+    matcher.classifier = matcher._build_sgd_classifier(random_state)
+    
+    def split_rows():
+        """(textes nettoyés, catégories, is_test) par bloc, découpage stable par index de ligne"""
+        offset = 0
+        for texts, labels in chunks():
+            cleaned = clean_texts(texts)
+            is_test = [bool(holdout) and (offset + i) % holdout == 0 for i in range(len(texts))]
+            offset += len(texts)
+            yield cleaned, labels, is_test
+    
+    def train_rows():
+        for cleaned, labels, is_test in split_rows():
+            rows = [(t, c) for t, c, test in zip(cleaned, labels, is_test) if not test]
+            if rows:
+                yield [t for t, _ in rows], [c for _, c in rows]
+    
+    report = {'model_type': matcher.model_type, 'chunk_size': chunk_size, 'passes': []}
+    
+    def timed_pass(name, func):
+        start = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - start
+        report['passes'].append({
+            'name': name,
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'docs_per_s': round(rows / elapsed, 1) if elapsed else None,
+            'peak_rss_bytes': peak_memory_bytes(),
+        })
+        print(f"   ✅ {name} : {rows} lignes en {elapsed:.1f}s")
+    
+    # Passe 1 : catégories + statistiques IDF (lignes d'entraînement seulement)
+    categories = set()
+    counts = {'train': 0, 'test': 0}
+    
+    def statistics_pass():
+        for cleaned, labels, is_test in split_rows():
+            categories.update(labels)
+            train_texts = [t for t, test in zip(cleaned, is_test) if not test]
+            if train_texts:
+                matcher.vectorizer.partial_fit(train_texts)
+            counts['train'] += len(train_texts)
+            counts['test'] += len(cleaned) - len(train_texts)
+        return counts['train'] + counts['test']
+    
+    print("📊 Passe 1 : catégories et statistiques IDF...")
+    timed_pass('statistics', statistics_pass)
+    if not counts['train']:
+        raise ValueError("Aucune donnée d'entraînement")
+    
+    matcher.label_encoder = LabelEncoder().fit(sorted(categories))
+    classes = np.arange(len(matcher.label_encoder.classes_))
+    
+    # Passes 2..n : partial_fit sur des blocs mélangés
+    def fit_pass():
+        rows = 0
+        for texts, labels in shuffle_chunks(train_rows(), buffer_size, chunk_size, random_state + epoch):
+            matcher.classifier.partial_fit(
+                matcher.vectorizer.transform(texts),
+                matcher.label_encoder.transform(labels),
+                classes=classes
+            )
+            rows += len(texts)
+        return rows
+    
+    for epoch in range(epochs):
+        print(f"📈 Passe d'entraînement {epoch + 1}/{epochs}...")
+        timed_pass(f'epoch_{epoch + 1}', fit_pass)
+    
+    # Évaluation en streaming sur les lignes réservées
+    correct = {'count': 0}
+    
+    def evaluation_pass():
+        rows = 0
+        for cleaned, labels, is_test in split_rows():
+            texts = [t for t, test in zip(cleaned, is_test) if test]
+            expected = [c for c, test in zip(labels, is_test) if test]
+            if not texts:
+                continue
+            predicted = matcher.label_encoder.inverse_transform(
+                matcher.classifier.predict(matcher.vectorizer.transform(texts))
+            )
+            correct['count'] += int(np.sum(predicted == np.asarray(expected)))
+            rows += len(texts)
+        return rows
+    
+    accuracy = None
+    if counts['test']:
+        print("🧪 Évaluation...")
+        timed_pass('evaluation', evaluation_pass)
+        accuracy = correct['count'] / counts['test']
+        print(f"📊 Accuracy : {accuracy*100:.2f}%")
+    
+    report.update({
+        'train_rows': counts['train'],
+        'test_rows': counts['test'],
+        'categories': len(classes),
+        'accuracy': round(accuracy, 4) if accuracy is not None else None,
+        'peak_rss_bytes': peak_memory_bytes(),
+    })
+    return matcher, report
+
+
 # ============================================
 # TEST DU MODÈLE
 # ============================================
@@ -363,11 +975,34 @@ if __name__ == '__main__':
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == 'train':
-        # Mode entraînement
-        train_from_kaggle_dataset(
-            model_type='tfidf_rf',  # ou 'sbert'
-            save_path='models/cv_job_matcher.pkl'
+        # Mode entraînement : python train_model.py train [tfidf_rf|tfidf_linear|tfidf_centroid|hashing_sgd|sbert|all]
+        requested = sys.argv[2] if len(sys.argv) > 2 else 'tfidf_rf'
+        model_types = SPARSE_MODEL_TYPES if requested == 'all' else (requested,)
+        
+        for model_type in model_types:
+            matcher = train_from_kaggle_dataset(
+                model_type=model_type,
+                save_path='models/cv_job_matcher.pkl' if model_type == 'tfidf_rf'
+                else f'models/cv_job_matcher_{model_type}.pkl'
+            )
+            if matcher is not None:
+                # Exporté à côté du modèle par défaut ; NLP_MODEL_PATH choisit celui à servir
+                matcher.save_artifact(default_artifact_dir(model_type))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'stream':
+        # Entraînement hors mémoire : python train_model.py stream [csv] [chunk_size]
+        csv_path = sys.argv[2] if len(sys.argv) > 2 else find_dataset_file()
+        chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        matcher, report = train_streaming(
+            lambda: iter_csv_chunks(csv_path, chunk_size=chunk_size),
+            chunk_size=chunk_size
         )
+        matcher.save_artifact(default_artifact_dir(matcher.model_type))
+        print(json.dumps(report, indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'export':
+        # Conversion d'un pickle existant au format artefact (mmap + manifest)
+        source = sys.argv[2] if len(sys.argv) > 2 else 'models/cv_job_matcher.pkl'
+        target = sys.argv[3] if len(sys.argv) > 3 else 'models/cv_job_matcher'
+        CVJobMatcher.load_model(source).save_artifact(target)
     else:
         # Mode test
         test_model('models/cv_job_matcher.pkl')
\ No newline at end of file
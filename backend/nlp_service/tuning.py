@@ -0,0 +1,351 @@
+# nlp_service/tuning.py
+"""
+Recherche d'hyperparamètres pour CVJobMatcher.
+
+- Les matrices de features (TF-IDF, hashing, embeddings SBERT) sont mises en
+  cache sur disque, par pli, avec une clé dérivée de l'empreinte des données et
+  des paramètres du vectoriseur : changer uniquement les paramètres du
+  classifieur ne revectorise jamais.
+- Les plis sont évalués en parallèle (joblib) sur tous les cœurs.
+- Chaque résultat est ajouté à un fichier JSONL : relancer la même recherche
+  reprend là où elle s'est arrêtée.
+"""
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+from .benchmarks import quiet
+from .train_model import CVJobMatcher, HASHING_MODEL_TYPES, StreamingHashingVectorizer, TFIDF_MODEL_TYPES
+
+DEFAULT_CACHE_DIR = 'models/feature_cache'
+
+# Vectoriseur par défaut de CVJobMatcher.train ; la recherche surcharge ces valeurs
+TFIDF_DEFAULTS = {
+    'max_features': 5000,
+    'ngram_range': (1, 2),
+    'min_df': 2,
+    'max_df': 0.8,
+    'stop_words': 'english',
+}
+
+SBERT_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+# Espaces de recherche : (paramètres du vectoriseur, paramètres du classifieur)
+SEARCH_SPACES = {
+    'tfidf_rf': (
+        {'max_features': [5000, 20000], 'ngram_range': [(1, 1), (1, 2)], 'min_df': [1, 2]},
+        {'n_estimators': [100, 300], 'max_depth': [20, None]},
+    ),
+    'tfidf_linear': (
+        {'max_features': [5000, 20000], 'ngram_range': [(1, 1), (1, 2)], 'min_df': [1, 2]},
+        {'C': [1.0, 10.0, 100.0]},
+    ),
+    'tfidf_centroid': (
+        {'max_features': [2000, 5000, 20000], 'ngram_range': [(1, 1), (1, 2)], 'max_df': [0.5, 0.8]},
+        {},
+    ),
+    'hashing_sgd': (
+        {'n_features': [2 ** 16, 2 ** 18], 'ngram_range': [(1, 1), (1, 2)]},
+        {'alpha': [1e-6, 1e-5, 1e-4]},
+    ),
+    'sbert': (
+        {},
+        {'C': [0.1, 1.0, 10.0]},
+    ),
+}
+
+
+# ============================================
+# GRILLE
+# ============================================
+
+def expand(space):
+    """Toutes les combinaisons d'un dictionnaire {paramètre: [valeurs]}"""
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def candidate_params(model_type, search='grid', n_iter=10, random_state=42):
+    """Liste de (paramètres vectoriseur, paramètres classifieur)"""
+    vectorizer_space, classifier_space = SEARCH_SPACES[model_type]
+    candidates = list(itertools.product(expand(vectorizer_space), expand(classifier_space)))
+    if search == 'random' and n_iter < len(candidates):
+        candidates = random.Random(random_state).sample(candidates, n_iter)
+    return candidates
+
+
+def params_key(*parts):
+    """Empreinte stable de paramètres (ordre des clés et tuples/listes indifférents)"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def data_fingerprint(texts, labels):
+    """Empreinte du dataset nettoyé : invalide le cache si les données changent"""
+    digest = hashlib.sha256()
+    for text, label in zip(texts, labels):
+        digest.update(str(label).encode('utf-8'))
+        digest.update(b'\x1f')
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()[:16]
+
+
+# ============================================
+# CACHE DE FEATURES
+# ============================================
+
+class FeatureCache:
+    """Matrices de features par pli, stockées en .npz (creuses) ou .npy (denses)"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    def load(self, key):
+        for suffix, loader in (('npz', sparse.load_npz), ('npy', np.load)):
+            path = self._path(key, suffix)
+            if os.path.exists(path):
+                return loader(path)
+        return None
+
+    def save(self, key, matrix):
+        # Écriture atomique : un pli interrompu ne laisse jamais de fichier partiel
+        if sparse.issparse(matrix):
+            path, tmp = self._path(key, 'npz'), self._path(key, 'tmp.npz')
+            sparse.save_npz(tmp, matrix.tocsr(), compressed=False)
+        else:
+            path, tmp = self._path(key, 'npy'), self._path(key, 'tmp.npy')
+            np.save(tmp, matrix)
+        os.replace(tmp, path)
+
+
+def build_vectorizer(model_type, vectorizer_params):
+    if model_type in HASHING_MODEL_TYPES:
+        params = dict(vectorizer_params)
+        if 'ngram_range' in params:
+            params['ngram_range'] = tuple(params['ngram_range'])
+        return StreamingHashingVectorizer(**params)
+
+    params = {**TFIDF_DEFAULTS, **vectorizer_params}
+    params['ngram_range'] = tuple(params['ngram_range'])
+    return TfidfVectorizer(**params)
+
+
+def fold_features(model_type, vectorizer_params, texts, train_idx, test_idx, cache, key):
+    """Features (train, test) d'un pli, depuis le cache ou calculées puis mises en cache"""
+    train_key, test_key = f'{key}-train', f'{key}-test'
+    X_train, X_test = cache.load(train_key), cache.load(test_key)
+    if X_train is not None and X_test is not None:
+        return X_train, X_test
+
+    # Le vectoriseur n'est ajusté que sur le pli d'entraînement (pas de fuite)
+    vectorizer = build_vectorizer(model_type, vectorizer_params)
+    X_train = vectorizer.fit_transform([texts[i] for i in train_idx])
+    X_test = vectorizer.transform([texts[i] for i in test_idx])
+    cache.save(train_key, X_train)
+    cache.save(test_key, X_test)
+    return X_train, X_test
+
+
+def sbert_embeddings(texts, cache, data_hash):
+    """Embeddings SBERT du dataset complet (pas d'ajustement : un seul encodage pour tous les plis)"""
+    key = f'sbert-{params_key(data_hash, SBERT_MODEL_NAME)}'
+    embeddings = cache.load(key)
+    if embeddings is None:
+        from sentence_transformers import SentenceTransformer
+        embeddings = SentenceTransformer(SBERT_MODEL_NAME).encode(list(texts), show_progress_bar=True)
+        cache.save(key, embeddings)
+    return embeddings
+
+
+# ============================================
+# ÉVALUATION
+# ============================================
+
+def build_classifier(model_type, classifier_params, random_state):
+    if model_type == 'sbert':
+        return LogisticRegression(max_iter=500, random_state=random_state, **classifier_params)
+
+    with quiet():
+        matcher = CVJobMatcher(model_type=model_type)
+        if model_type in HASHING_MODEL_TYPES:
+            classifier = matcher._build_sgd_classifier(random_state)
+        else:
+            classifier = matcher._build_tfidf_classifier(random_state)
+    # Le parallélisme est au niveau des plis : pas de sur-souscription des cœurs
+    if 'n_jobs' in classifier.get_params():
+        classifier.set_params(n_jobs=1)
+    return classifier.set_params(**classifier_params)
+
+
+def evaluate(model_type, classifier_params, X_train, X_test, y_train, y_test, random_state):
+    start = time.perf_counter()
+    classifier = build_classifier(model_type, classifier_params, random_state)
+    classifier.fit(X_train, y_train)
+    accuracy = accuracy_score(y_test, classifier.predict(X_test))
+    return accuracy, time.perf_counter() - start
+
+
+def _feature_task(model_type, vectorizer_params, texts, train_idx, test_idx, cache_dir, key):
+    fold_features(model_type, vectorizer_params, texts, train_idx, test_idx, FeatureCache(cache_dir), key)
+    return key
+
+
+def _evaluation_task(task, model_type, y, folds, cache_dir, embeddings, random_state):
+    cache = FeatureCache(cache_dir)
+    train_idx, test_idx = folds[task['fold']]
+    if embeddings is not None:
+        X_train, X_test = embeddings[train_idx], embeddings[test_idx]
+    else:
+        X_train, X_test = cache.load(f"{task['feature_key']}-train"), cache.load(f"{task['feature_key']}-test")
+
+    accuracy, seconds = evaluate(
+        model_type, task['classifier_params'], X_train, X_test, y[train_idx], y[test_idx], random_state
+    )
+    return {**task, 'accuracy': round(float(accuracy), 4), 'fit_seconds': round(seconds, 3)}
+
+
+def load_results(path):
+    """Résultats déjà calculés (reprise), indexés par clé de tâche"""
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par une interruption
+                    continue
+                done[result['task_key']] = result
+    return done
+
+
+def search(
+    texts,
+    labels,
+    model_type='tfidf_linear',
+    search='grid',
+    n_iter=10,
+    folds=5,
+    n_jobs=-1,
+    cache_dir=DEFAULT_CACHE_DIR,
+    results_path=None,
+    random_state=42,
+):
+    """
+    Lance la recherche et retourne le classement des combinaisons
+    (précision moyenne sur les plis).
+    """
+    if model_type not in SEARCH_SPACES:
+        raise ValueError(f"model_type inconnu : {model_type}")
+
+    texts = list(texts)
+    y = np.asarray(labels)
+    data_hash = data_fingerprint(texts, y)
+    cache = FeatureCache(cache_dir)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    fold_indices = list(splitter.split(np.zeros(len(y)), y))
+
+    # Tâches (combinaison, pli) ; les combinaisons partagent les features d'un même vectoriseur,
+    # y compris entre types TF-IDF (rf / linear / centroid)
+    family = 'tfidf' if model_type in TFIDF_MODEL_TYPES else model_type
+    tasks = []
+    for vectorizer_params, classifier_params in candidate_params(model_type, search, n_iter, random_state):
+        effective = {**TFIDF_DEFAULTS, **vectorizer_params} if family == 'tfidf' else vectorizer_params
+        for fold in range(folds):
+            feature_key = f'{family}-' + params_key(data_hash, family, effective, folds, fold, random_state)
+            tasks.append({
+                'task_key': params_key(model_type, feature_key, classifier_params),
+                'feature_key': feature_key,
+                'fold': fold,
+                'vectorizer_params': vectorizer_params,
+                'classifier_params': classifier_params,
+            })
+
+    done = load_results(results_path)
+    pending = [task for task in tasks if task['task_key'] not in done]
+    print(f"🔎 {len(tasks)} évaluations ({len(tasks) - len(pending)} déjà faites), {folds} plis")
+
+    embeddings = None
+    if model_type == 'sbert':
+        embeddings = sbert_embeddings(texts, cache, data_hash)
+    else:
+        # Étape 1 : vectorisation de chaque (vectoriseur, pli) manquant, en parallèle
+        features = {}
+        for task in pending:
+            features.setdefault(task['feature_key'], task)
+        Parallel(n_jobs=n_jobs)(
+            delayed(_feature_task)(
+                model_type, task['vectorizer_params'], texts,
+                *fold_indices[task['fold']], cache_dir, key
+            )
+            for key, task in features.items()
+            if cache.load(f'{key}-test') is None
+        )
+
+    # Étape 2 : entraînement des classifieurs en parallèle, résultats écrits au fil de l'eau
+    results_file = open(results_path, 'a', encoding='utf-8') if results_path else None
+    try:
+        outputs = Parallel(n_jobs=n_jobs, return_as='generator_unordered')(
+            delayed(_evaluation_task)(task, model_type, y, fold_indices, cache_dir, embeddings, random_state)
+            for task in pending
+        )
+        for result in outputs:
+            done[result['task_key']] = result
+            if results_file:
+                results_file.write(json.dumps(result, default=str) + '\n')
+                results_file.flush()
+    finally:
+        if results_file:
+            results_file.close()
+
+    return rank(tasks, done)
+
+
+def rank(tasks, done):
+    """Agrège les plis par combinaison, meilleure précision moyenne en premier"""
+    grouped = {}
+    for task in tasks:
+        result = done.get(task['task_key'])
+        if result is None:
+            continue
+        key = params_key(task['vectorizer_params'], task['classifier_params'])
+        entry = grouped.setdefault(key, {
+            'vectorizer_params': task['vectorizer_params'],
+            'classifier_params': task['classifier_params'],
+            'scores': [],
+            'fit_seconds': [],
+        })
+        entry['scores'].append(result['accuracy'])
+        entry['fit_seconds'].append(result['fit_seconds'])
+
+    ranking = []
+    for entry in grouped.values():
+        scores = entry.pop('scores')
+        fit_seconds = entry.pop('fit_seconds')
+        ranking.append({
+            **entry,
+            'folds': len(scores),
+            'mean_accuracy': round(float(np.mean(scores)), 4),
+            'std_accuracy': round(float(np.std(scores)), 4),
+            'mean_fit_seconds': round(float(np.mean(fit_seconds)), 3),
+        })
+    return sorted(ranking, key=lambda r: (-r['mean_accuracy'], r['mean_fit_seconds']))